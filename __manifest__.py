@@ -26,6 +26,7 @@
         'security/access_rights.xml',
         'data/sequence.xml',
         'data/server_actions.xml',
+        'data/ir_cron.xml',
         'views/assets.xml',
         'views/project_views.xml',
         'views/building_views.xml',
@@ -34,13 +35,26 @@
         'views/sale_views.xml',
         'views/sale_actions.xml',
         'views/menu_views.xml',
+        'views/rpc_profile_views.xml',
+        'views/sql_trace_views.xml',
+        'wizard/price_revision_wizard_views.xml',
+        'views/price_revision_views.xml',
+        'views/state_event_views.xml',
+        'views/sales_report_views.xml',
+        'views/kpi_snapshot_views.xml',
+        'views/listing_feed_views.xml',
+        'views/payment_plan_views.xml',
+        'views/dunning_views.xml',
+        'views/bank_import_views.xml',
         'views/stock_menu_views.xml',
         'views/account_views.xml',  # Add invoice view customizations
         'views/partner_views.xml',  # Customize partner form (function field as CIN)
         'views/report_reservation_template.xml',  # New reservation report template
         'views/account_reports.xml',  # Report actions
     ],
-    'qweb': [],
+    'qweb': [
+        'static/src/xml/stacking_plan.xml',
+    ],
     'demo': [],
     'installable': True,
     'application': True,
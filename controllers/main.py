@@ -0,0 +1,26 @@
+from odoo import http, fields
+from odoo.http import request, content_disposition
+from werkzeug.wrappers import Response
+
+from ..models.dossier_export import stream_dossier_zip
+
+
+class RealEstateDossierController(http.Controller):
+
+    @http.route('/wm_real_estate/reservation_dossiers', type='http', auth='user')
+    def reservation_dossiers(self, ids='', **kwargs):
+        """Stream the reservation dossiers of the invoices ids (comma separated) as a ZIP archive"""
+        move_ids = [int(move_id) for move_id in ids.split(',') if move_id.strip().isdigit()]
+        moves = request.env['account.move'].browse(move_ids).exists()
+        moves.check_access_rights('read')
+        moves.check_access_rule('read')
+
+        # Everything using the ORM is done before the response: only the PDF
+        # conversion and the archive run while the archive is streamed
+        jobs = moves._prepare_reservation_dossier_jobs()
+        workers = moves._get_dossier_workers()
+        filename = 'Dossiers de Reservation - %s.zip' % fields.Date.context_today(moves)
+        return Response(stream_dossier_zip(jobs, workers), direct_passthrough=True, headers=[
+            ('Content-Type', 'application/zip'),
+            ('Content-Disposition', content_disposition(filename)),
+        ])
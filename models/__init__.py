@@ -1,8 +1,25 @@
+from . import rpc_profile
+from . import sql_trace
+from . import unit_state
+from . import state_event
+from . import bulk_mode
+from . import tombstone
 from . import project
 from . import building
 from . import apartment
 from . import product_template
+from . import price_revision
+from . import price_grid
+from . import sales_report
+from . import kpi_snapshot
+from . import availability
+from . import listing_feed
+from . import sync
 from . import sale_order
+from . import payment_plan
+from . import dunning
+from . import bank_import
+from . import dossier_export
 from . import account_move
 from . import stock_picking
 from . import apartment_actions
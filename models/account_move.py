@@ -20,36 +20,47 @@ class AccountMove(models.Model):
         # Call super to post the invoice
         res = super(AccountMove, self).action_post()
 
-        # Check if this is a customer invoice from a sale order
-        if self.move_type == 'out_invoice' and self.invoice_origin:
-            # Find the related sale order
-            sale_orders = self.env['sale.order'].search([('name', '=', self.invoice_origin)])
-
-            for sale_order in sale_orders:
-                # Check if this sale order has apartments and is a real estate order
-                if sale_order.has_apartment and sale_order.is_real_estate:
-                    _logger.info("Posted invoice %s for sale order %s with apartments", self.name, sale_order.name)
-                    
-                    # Set project and building from sale order
-                    if sale_order.project_id:
-                        self.project_id = sale_order.project_id.id
-                    # Get building from first line with apartment
-                    for line in sale_order.order_line:
-                        if line.building_id:
-                            self.building_id = line.building_id.id
-                            break
-                    
-                    # *** NEW LOGIC FOR AUTO WORKFLOW ***
-                    # Since auto workflow skips delivery and goes directly to invoice creation,
-                    # mark apartments/stores as sold immediately when invoice is posted
-                    # (regardless of payment status)
-                    self._mark_properties_as_sold_on_invoice_creation(sale_order)
+        # Check if these are customer invoices from sale orders
+        invoices = self.filtered(lambda m: m.move_type == 'out_invoice' and m.invoice_origin)
+        if not invoices:
+            return res
+
+        # Find the related real estate orders of all the invoices at once
+        sale_orders = self.env['sale.order'].search([
+            ('name', 'in', list(set(invoices.mapped('invoice_origin')))),
+            ('has_apartment', '=', True),
+            ('is_real_estate', '=', True),
+        ])
+        orders_by_name = {}
+        for sale_order in sale_orders:
+            orders_by_name.setdefault(sale_order.name, []).append(sale_order)
+
+        for invoice in invoices:
+            for sale_order in orders_by_name.get(invoice.invoice_origin, []):
+                _logger.info("Posted invoice %s for sale order %s with apartments", invoice.name, sale_order.name)
+
+                # Set project and building from sale order
+                if sale_order.project_id:
+                    invoice.project_id = sale_order.project_id.id
+                # Get building from first line with apartment
+                for line in sale_order.order_line:
+                    if line.building_id:
+                        invoice.building_id = line.building_id.id
+                        break
+
+                # *** NEW LOGIC FOR AUTO WORKFLOW ***
+                # Since auto workflow skips delivery and goes directly to invoice creation,
+                # mark apartments/stores as sold immediately when invoice is posted
+                # (regardless of payment status)
+                invoice._mark_properties_as_sold_on_invoice_creation(sale_order)
 
         return res
 
     def _mark_properties_as_sold_on_invoice_creation(self, sale_order):
         """Mark apartments/stores as sold when invoice is created (for auto workflow)"""
         properties_updated = 0
+        # The state history links the unit state changes below to the order
+        sale_order = sale_order.with_context(real_estate_order_id=sale_order.id)
 
         for line in sale_order.order_line:
             # Handle apartments
@@ -104,8 +115,8 @@ Status updated automatically due to invoice creation (auto workflow).
 """) % (self.name, sale_order.name, properties_updated)
 
             # Log the message to the sale order
-            sale_order.message_post(
-                body=message,
+            sale_order._real_estate_message_post(
+                message,
                 message_type='notification',
                 subtype_id=self.env.ref('mail.mt_note').id,
             )
@@ -117,33 +128,37 @@ Status updated automatically due to invoice creation (auto workflow).
         """Hook when invoice is paid - properties already marked as sold on invoice creation"""
         res = super(AccountMove, self)._invoice_paid_hook()
 
-        # Check if this is a customer invoice from a sale order
-        if self.move_type == 'out_invoice' and self.invoice_origin:
-            # Find the related sale order
-            sale_orders = self.env['sale.order'].search([('name', '=', self.invoice_origin)])
-
-            for sale_order in sale_orders:
-                # Check if this sale order has apartments and is a real estate order
-                if sale_order.has_apartment and sale_order.is_real_estate:
-                    _logger.info("Invoice %s for real estate order %s with apartments is paid", self.name, sale_order.name)
-
-                    # Properties are already marked as sold on invoice creation
-                    # Just log a payment confirmation message
-                    message = _("""
+        # Find the sale orders of all the paid customer invoices with one search
+        invoices = self.filtered(lambda m: m.move_type == 'out_invoice' and m.invoice_origin)
+        sale_orders = self.env['sale.order'].search([
+            ('name', 'in', invoices.mapped('invoice_origin')),
+            ('has_apartment', '=', True),
+            ('is_real_estate', '=', True),
+        ]) if invoices else self.env['sale.order']
+        orders_by_name = {order.name: order for order in sale_orders}
+
+        for invoice in invoices:
+            sale_order = orders_by_name.get(invoice.invoice_origin)
+            if sale_order:
+                _logger.info("Invoice %s for real estate order %s with apartments is paid", invoice.name, sale_order.name)
+
+                # Properties are already marked as sold on invoice creation
+                # Just log a payment confirmation message
+                message = _("""
 Payment Received
 
 Payment for invoice %s has been received.
 Properties were already marked as 'Sold' when the invoice was created.
 
 The real estate transaction is now complete with payment confirmed.
-""") % self.name
-
-                    # Log the message to the sale order
-                    sale_order.message_post(
-                        body=message,
-                        message_type='notification',
-                        subtype_id=self.env.ref('mail.mt_note').id,
-                    )
+""") % invoice.name
+
+                # Log the message to the sale order
+                sale_order._real_estate_message_post(
+                    message,
+                    message_type='notification',
+                    subtype_id=self.env.ref('mail.mt_note').id,
+                )
 
         return res
 
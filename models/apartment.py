@@ -3,13 +3,16 @@ from odoo.exceptions import UserError, ValidationError
 import logging
 import time
 
+from .rpc_profile import profiled
+from .trigram import create_trigram_indexes
+
 _logger = logging.getLogger(__name__)
 
 
 class RealEstateApartment(models.Model):
     _name = 'real.estate.apartment'
     _description = 'Real Estate Apartment'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'real.estate.unit.state.mixin', 'real.estate.tombstone.mixin']
     _order = 'name'
 
     @api.model
@@ -95,6 +98,25 @@ class RealEstateApartment(models.Model):
     reservation_count = fields.Integer(compute='_compute_reservation_count',
                                string='Reservation Count')
 
+    def init(self):
+        # Partial name/code lookups (sale line autocomplete) use trigram indexes, the
+        # building/project and state of the onchange domains a composite index
+        create_trigram_indexes(self.env.cr, self._table, ['name', 'code'])
+        self.env.cr.execute("""CREATE INDEX IF NOT EXISTS real_estate_apartment_building_state_idx
+                               ON real_estate_apartment (building_id, state)""")
+        self.env.cr.execute("""CREATE INDEX IF NOT EXISTS real_estate_apartment_project_state_idx
+                               ON real_estate_apartment (project_id, state)""")
+
+    @api.model
+    def _name_search(self, name, args=None, operator='ilike', limit=100, name_get_uid=None):
+        """Match the number or the code, in one query answered by the trigram indexes"""
+        args = list(args or [])
+        if name and operator in ('ilike', 'like', '=ilike', '=like'):
+            domain = ['|', ('name', operator, name), ('code', operator, name)] + args
+            return self._search(domain, limit=limit, access_rights_uid=name_get_uid)
+        return super(RealEstateApartment, self)._name_search(name, args=args, operator=operator, limit=limit,
+                                                             name_get_uid=name_get_uid)
+
     @api.depends('product_tmpl_ids')
     def _compute_product_count(self):
         for apartment in self:
@@ -174,6 +196,7 @@ class RealEstateApartment(models.Model):
             'target': 'current',
         }
 
+    @profiled
     def action_create_reservation(self):
         """Create a new reservation (quotation) for this apartment"""
         self.ensure_one()
@@ -576,6 +599,7 @@ Salles de bain: {bathrooms}
 
         return res
 
+    @profiled
     def cancel_reservation(self):
         """Cancel the prereservation and return the apartment to disponible state"""
         for apartment in self:
@@ -601,7 +625,7 @@ Salles de bain: {bathrooms}
 
             # Log the cancellation
             msg = _("Reservation cancelled: Apartment returned to disponible state")
-            apartment.message_post(body=msg, message_type='notification')
+            apartment._real_estate_message_post(msg, summary_field='building_id', message_type='notification')
 
         return True
 
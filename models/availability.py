@@ -0,0 +1,176 @@
+from odoo import models, api, _
+from odoo.exceptions import UserError
+from odoo.tools import LRU
+import hashlib
+import json
+import logging
+import time
+
+from .rpc_profile import profiled
+
+_logger = logging.getLogger(__name__)
+
+# Results per (database, user, companies, filters): a short TTL bounds staleness of
+# prices, the last state event id in the key invalidates them on any state change
+AVAILABILITY_CACHE = LRU(512)
+AVAILABILITY_CACHE_TTL = 60
+
+# Sort keys of the keyset pagination: column of product_template
+AVAILABILITY_ORDERS = {
+    'price': 'list_price',
+    'area': 'area',
+}
+
+DEFAULT_AREA_BAND = 25.0
+DEFAULT_PRICE_BAND = 100000.0
+
+
+class RealEstateAvailability(models.AbstractModel):
+    _name = 'real.estate.availability'
+    _description = 'Real Estate Availability Search'
+
+    @api.model
+    def _get_facet_filters(self, filters):
+        """Return {dimension: (sql condition, params)} for the filters set in filters"""
+        conditions = {}
+        if filters.get('property_type'):
+            flag = {'apartment': 'is_apartment', 'store': 'is_store', 'equipement': 'is_equipement'}.get(
+                filters['property_type'])
+            if not flag:
+                raise UserError(_("Type de bien inconnu : %s") % filters['property_type'])
+            conditions['property_type'] = (flag, [])
+        if filters.get('project_ids'):
+            conditions['project'] = ('project_id IN %s', [tuple(filters['project_ids'])])
+        if filters.get('building_ids'):
+            conditions['building'] = ('building_id IN %s', [tuple(filters['building_ids'])])
+        if filters.get('rooms'):
+            conditions['rooms'] = ('rooms IN %s', [tuple(filters['rooms'])])
+
+        # Ranges: [min, max], either bound may be None
+        for dimension, column in (('floor', 'floor'), ('area', 'area'), ('price', 'list_price')):
+            bounds = filters.get(dimension) or [None, None]
+            parts, params = [], []
+            if bounds[0] is not None:
+                parts.append('%s >= %%s' % column)
+                params.append(bounds[0])
+            if bounds[1] is not None:
+                parts.append('%s <= %%s' % column)
+                params.append(bounds[1])
+            if parts:
+                conditions[dimension] = (' AND '.join(parts), params)
+        return conditions
+
+    @api.model
+    def _get_cache_key(self, filters, order, limit, after):
+        # Any state change appends a state event: its last id versions the cached results
+        self.env.cr.execute("SELECT max(id) FROM real_estate_state_event")
+        version = self.env.cr.fetchone()[0]
+        payload = json.dumps([filters, order, limit, after], sort_keys=True, default=str)
+        return (self.env.cr.dbname, self.env.uid, tuple(self.env.companies.ids), version,
+                hashlib.sha1(payload.encode()).hexdigest())
+
+    @api.model
+    @profiled
+    def search_units(self, filters=None, order='price', limit=40, after=None):
+        """Search the available units and count every facet in one query
+
+        :param filters: dict with any of property_type ('apartment', 'store', 'equipement'),
+                        project_ids, building_ids, rooms (lists of values) and floor, area,
+                        price ([min, max], None for an open bound)
+        :param order: 'price' or 'area', add ' desc' for a descending order
+        :param after: the 'next' value of the previous page, for keyset pagination
+        :return: {'ids', 'total', 'next', 'facets': {dimension: {value: count}}}; the facet
+                 of a dimension counts the units matching all the other filters
+        """
+        filters = dict(filters or {})
+        column, _sep, direction = (order or 'price').partition(' ')
+        if column not in AVAILABILITY_ORDERS or direction.lower() not in ('', 'asc', 'desc'):
+            raise UserError(_("Tri non pris en charge : %s") % order)
+        descending = direction.lower() == 'desc'
+        limit = max(1, min(int(limit or 40), 200))
+
+        cache_key = self._get_cache_key(filters, order, limit, after)
+        cached = AVAILABILITY_CACHE.get(cache_key)
+        if cached and cached[0] > time.time():
+            return cached[1]
+
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        area_band = float(get_param('wm_real_estate.availability_area_band', DEFAULT_AREA_BAND)) or DEFAULT_AREA_BAND
+        price_band = float(get_param('wm_real_estate.availability_price_band', DEFAULT_PRICE_BAND)) or DEFAULT_PRICE_BAND
+
+        Product = self.env['product.template']
+        Product.check_access_rights('read')
+        Product.flush(['apartment_state', 'sale_ok', 'project_id', 'building_id', 'rooms', 'floor',
+                       'area', 'list_price', 'is_apartment', 'is_store', 'is_equipement'])
+        query = Product._where_calc([
+            ('apartment_state', '=', 'disponible'),
+            '|', '|', ('is_apartment', '=', True), ('is_store', '=', True), ('is_equipement', '=', True),
+        ])
+        Product._apply_ir_rules(query, 'read')
+        from_clause, where_clause, base_params = query.get_sql()
+
+        conditions = self._get_facet_filters(filters)
+
+        def where(exclude=None):
+            """Condition and params of all the filters but the one of dimension exclude"""
+            selected = [condition for dimension, condition in conditions.items() if dimension != exclude]
+            return (' AND '.join(sql for sql, params in selected) or 'TRUE',
+                    [param for sql, params in selected for param in params])
+
+        sort_column = AVAILABILITY_ORDERS[column]
+        comparison = '<' if descending else '>'
+        sort_direction = 'DESC' if descending else 'ASC'
+        page_where, page_params = where()
+        if after:
+            page_where += ' AND (COALESCE(%s, 0), id) %s (%%s, %%s)' % (sort_column, comparison)
+            page_params = page_params + [after[0], after[1]]
+
+        facet_sql, facet_params = [], []
+        facets = (
+            ('property_type', "CASE WHEN is_apartment THEN 'apartment' WHEN is_store THEN 'store' ELSE 'equipement' END"),
+            ('project', 'project_id'),
+            ('building', 'building_id'),
+            ('rooms', 'rooms'),
+            ('floor', 'floor'),
+            ('area', 'floor(area / %s) * %s' % (area_band, area_band)),
+            ('price', 'floor(list_price / %s) * %s' % (price_band, price_band)),
+        )
+        for dimension, expression in facets:
+            facet_where, params = where(exclude=dimension)
+            facet_sql.append("""'%s', (SELECT COALESCE(json_object_agg(COALESCE(value::text, ''), count), '{}')
+                                        FROM (SELECT %s AS value, count(*) AS count FROM units
+                                               WHERE %s GROUP BY 1) f)""" % (dimension, expression, facet_where))
+            facet_params += params
+
+        total_where, total_params = where()
+        self.env.cr.execute("""
+            WITH units AS (
+                SELECT "product_template".id, "product_template".project_id, "product_template".building_id,
+                       "product_template".rooms, "product_template".floor, "product_template".area,
+                       "product_template".list_price, "product_template".is_apartment,
+                       "product_template".is_store, "product_template".is_equipement
+                  FROM %s
+                 WHERE %s
+            )
+            SELECT (SELECT COALESCE(json_agg(json_build_array(id, sort_value)
+                                             ORDER BY sort_value %s, id %s), '[]')
+                      FROM (SELECT id, COALESCE(%s, 0) AS sort_value FROM units
+                             WHERE %s
+                          ORDER BY COALESCE(%s, 0) %s, id %s
+                             LIMIT %%s) page),
+                   (SELECT count(*) FROM units WHERE %s),
+                   json_build_object(%s)
+        """ % (from_clause, where_clause, sort_direction, sort_direction, sort_column, page_where,
+               sort_column, sort_direction, sort_direction, total_where, ', '.join(facet_sql)),
+            base_params + page_params + [limit + 1] + total_params + facet_params)
+        page, total, facet_counts = self.env.cr.fetchone()
+
+        rows = page[:limit]
+        result = {
+            'ids': [row[0] for row in rows],
+            'total': total,
+            'next': [rows[-1][1], rows[-1][0]] if len(page) > limit else None,
+            'facets': facet_counts,
+        }
+        AVAILABILITY_CACHE[cache_key] = (time.time() + AVAILABILITY_CACHE_TTL, result)
+        return result
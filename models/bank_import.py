@@ -0,0 +1,261 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+import base64
+import csv
+import datetime
+import io
+import logging
+import re
+import unicodedata
+
+from .rpc_profile import profiled
+
+_logger = logging.getLogger(__name__)
+
+# Accepted CSV headers, lowercased and without accents
+CSV_COLUMNS = {
+    'date': ('date', 'date operation', 'date valeur', 'value date', 'booking date'),
+    'label': ('libelle', 'label', 'reference', 'description', 'communication', 'motif'),
+    'amount': ('montant', 'amount', 'credit'),
+}
+
+CSV_DATE_FORMATS = ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y')
+
+
+def _strip_accents(text):
+    return unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+
+
+def normalize_reference(text):
+    """Uppercase text without accents, spaces nor punctuation: 'Deposit for S00012' -> 'DEPOSITFORS00012'"""
+    return re.sub(r'[^A-Z0-9]', '', _strip_accents(text).upper())
+
+
+def _parse_amount(value):
+    """Parse '1 234,56', '1234.56' or '1,234.56'"""
+    value = (value or '').replace('\xa0', '').replace(' ', '').strip()
+    if ',' in value and '.' in value:
+        value = value.replace(',', '') if value.rfind('.') > value.rfind(',') else value.replace('.', '').replace(',', '.')
+    else:
+        value = value.replace(',', '.')
+    return float(value)
+
+
+class RealEstateBankImport(models.Model):
+    _name = 'real.estate.bank.import'
+    _description = 'Real Estate Bank Statement Import'
+    _order = 'id desc'
+
+    name = fields.Char(string='Fichier')
+    data_file = fields.Binary(string='Relevé (CSV)', attachment=False)
+    journal_id = fields.Many2one('account.journal', string='Journal de banque', required=True,
+                                 domain="[('type', 'in', ('bank', 'cash')), ('company_id', '=', company_id)]")
+    company_id = fields.Many2one('res.company', string='Société', required=True,
+                                 default=lambda self: self.env.company)
+    state = fields.Selection([
+        ('draft', 'Brouillon'),
+        ('done', 'Importé'),
+    ], string='État', default='draft', required=True, readonly=True)
+    line_ids = fields.One2many('real.estate.bank.import.line', 'import_id', string='Lignes', readonly=True)
+    line_count = fields.Integer(string='Lignes', compute='_compute_counts')
+    matched_count = fields.Integer(string='Rapprochées', compute='_compute_counts')
+    review_count = fields.Integer(string='À vérifier', compute='_compute_counts')
+
+    @api.depends('line_ids.state')
+    def _compute_counts(self):
+        for statement in self:
+            states = statement.line_ids.mapped('state')
+            statement.line_count = len(states)
+            statement.matched_count = states.count('matched')
+            statement.review_count = states.count('to_review')
+
+    def _parse_csv(self):
+        """Return the statement rows as [(date, label, amount)]"""
+        self.ensure_one()
+        if not self.data_file:
+            raise UserError(_("Veuillez charger un relevé bancaire au format CSV."))
+        content = base64.b64decode(self.data_file)
+        try:
+            text = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            text = content.decode('latin-1')
+        try:
+            dialect = csv.Sniffer().sniff(text[:4096], delimiters=';,\t')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(io.StringIO(text), dialect)
+
+        header = [_strip_accents(column).strip().lower() for column in next(reader, [])]
+        indexes = {}
+        for key, names in CSV_COLUMNS.items():
+            index = next((i for i, column in enumerate(header) if column in names), None)
+            if index is None:
+                raise UserError(_("Colonne introuvable dans le relevé : %s (colonnes attendues : %s)")
+                                % (key, ', '.join(names)))
+            indexes[key] = index
+
+        rows = []
+        for number, row in enumerate(reader, start=2):
+            if not any(cell.strip() for cell in row):
+                continue
+            try:
+                date = self._parse_date(row[indexes['date']])
+                amount = _parse_amount(row[indexes['amount']])
+            except (IndexError, ValueError):
+                raise UserError(_("Ligne %s du relevé illisible : %s") % (number, ';'.join(row)))
+            rows.append((date, row[indexes['label']].strip(), amount))
+        return rows
+
+    @api.model
+    def _parse_date(self, value):
+        value = value.strip()
+        for date_format in CSV_DATE_FORMATS:
+            try:
+                return datetime.datetime.strptime(value, date_format).date()
+            except ValueError:
+                continue
+        raise ValueError(value)
+
+    def _get_open_invoice_index(self):
+        """Hash index of the open real estate invoices: {(reference key, amount in cents): [invoice ids]}
+
+        Each invoice is indexed under its normalised payment reference and under its
+        order name, so labels holding either one are matched.
+        """
+        self.ensure_one()
+        self.env['account.move'].flush(['payment_reference', 'invoice_origin', 'amount_residual',
+                                        'payment_state', 'state', 'move_type', 'company_id'])
+        self.env.cr.execute("""
+            SELECT am.id, am.payment_reference, am.invoice_origin, am.amount_residual
+              FROM account_move am
+             WHERE am.move_type = 'out_invoice' AND am.state = 'posted'
+               AND am.payment_state IN ('not_paid', 'partial')
+               AND am.company_id = %s
+               AND EXISTS (SELECT 1 FROM sale_order so
+                            WHERE so.name = am.invoice_origin AND so.is_real_estate)
+        """, [self.company_id.id])
+        index = {}
+        for move_id, payment_reference, origin, residual in self.env.cr.fetchall():
+            cents = int(round(residual * 100))
+            for key in {normalize_reference(payment_reference), normalize_reference(origin)}:
+                if key:
+                    index.setdefault((key, cents), []).append(move_id)
+        return index
+
+    @api.model
+    def _match_row(self, index, label, amount, used):
+        """Return (invoice id, None) or (False, reason) for a statement row"""
+        if amount <= 0:
+            return False, _('Débit : pas un paiement client')
+        cents = int(round(amount * 100))
+        # The whole label first, then each word: the order name within a longer label
+        keys = [normalize_reference(label)] + [normalize_reference(word) for word in label.split()]
+        for key in keys:
+            candidates = [move_id for move_id in index.get((key, cents), []) if move_id not in used]
+            if len(set(candidates)) == 1:
+                return candidates[0], None
+            if candidates:
+                return False, _('Plusieurs factures correspondent')
+        return False, _('Aucune facture ouverte avec cette référence et ce montant')
+
+    def _register_payments(self, invoice_dates):
+        """Pay the invoices in full, one payment register per value date: {invoice id: payment id}"""
+        self.ensure_one()
+        by_date = {}
+        for move_id, date in invoice_dates.items():
+            by_date.setdefault(date, []).append(move_id)
+
+        payments = {}
+        for date, move_ids in by_date.items():
+            register = self.env['account.payment.register'].with_context(
+                active_model='account.move', active_ids=move_ids).create({
+                    'payment_date': date,
+                    'journal_id': self.journal_id.id,
+                    'group_payment': False,
+                })
+            for payment in register._create_payments():
+                for invoice in payment.reconciled_invoice_ids:
+                    payments[invoice.id] = payment.id
+        return payments
+
+    @profiled
+    def action_import(self):
+        """Match the statement rows with the open real estate invoices and register the payments
+
+        Rows are matched with a hash index (normalised reference, amount) built with one
+        query; the matched invoices are paid in bulk, the other rows are left for review.
+        """
+        self.ensure_one()
+        if self.state != 'draft':
+            raise UserError(_("Ce relevé a déjà été importé."))
+        rows = self._parse_csv()
+        index = self._get_open_invoice_index()
+
+        matches, used = [], set()
+        for date, label, amount in rows:
+            move_id, reason = self._match_row(index, label, amount, used)
+            if move_id:
+                used.add(move_id)
+            matches.append((move_id, reason))
+
+        payments = self._register_payments({
+            move_id: date for (date, label, amount), (move_id, reason) in zip(rows, matches) if move_id})
+
+        self.env['real.estate.bank.import.line'].create([{
+            'import_id': self.id,
+            'date': date,
+            'label': label,
+            'amount': amount,
+            'move_id': move_id,
+            'payment_id': payments.get(move_id, False),
+            'state': 'matched' if move_id else 'to_review',
+            'note': reason,
+        } for (date, label, amount), (move_id, reason) in zip(rows, matches)])
+        self.write({'state': 'done', 'data_file': False})
+
+        _logger.info("Bank statement %s: %s rows, %s matched, %s to review",
+                     self.name, len(rows), len(payments), len(rows) - len(used))
+        return True
+
+
+class RealEstateBankImportLine(models.Model):
+    _name = 'real.estate.bank.import.line'
+    _description = 'Real Estate Bank Statement Line'
+    _order = 'import_id desc, id'
+
+    import_id = fields.Many2one('real.estate.bank.import', string='Relevé', required=True,
+                                ondelete='cascade', index=True)
+    company_id = fields.Many2one(related='import_id.company_id', store=True)
+    currency_id = fields.Many2one(related='import_id.company_id.currency_id')
+    date = fields.Date(string='Date', readonly=True)
+    label = fields.Char(string='Libellé', readonly=True)
+    amount = fields.Monetary(string='Montant', readonly=True, currency_field='currency_id')
+    move_id = fields.Many2one('account.move', string='Facture',
+                              domain="[('move_type', '=', 'out_invoice'), ('state', '=', 'posted'), "
+                                     "('payment_state', 'in', ('not_paid', 'partial'))]")
+    payment_id = fields.Many2one('account.payment', string='Paiement', readonly=True)
+    state = fields.Selection([
+        ('matched', 'Rapprochée'),
+        ('to_review', 'À vérifier'),
+        ('ignored', 'Ignorée'),
+    ], string='État', required=True, default='to_review', readonly=True, index=True)
+    note = fields.Char(string='Motif', readonly=True)
+
+    def action_register_payment(self):
+        """Pay the invoice chosen by hand with the amount of the line"""
+        for line in self.filtered(lambda l: l.state == 'to_review'):
+            if not line.move_id:
+                raise UserError(_("Veuillez choisir la facture de la ligne %s.") % line.label)
+            register = self.env['account.payment.register'].with_context(
+                active_model='account.move', active_ids=line.move_id.ids).create({
+                    'payment_date': line.date,
+                    'journal_id': line.import_id.journal_id.id,
+                    'amount': line.amount,
+                })
+            payment = register._create_payments()
+            line.write({'payment_id': payment[:1].id, 'state': 'matched', 'note': False})
+        return True
+
+    def action_ignore(self):
+        self.filtered(lambda l: l.state == 'to_review').write({'state': 'ignored'})
+        return True
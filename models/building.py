@@ -1,13 +1,18 @@
 from odoo import models, fields, api, _
 import logging
 
+from .rpc_profile import profiled
+
 _logger = logging.getLogger(__name__)
 
+# Order of the values of a unit in the stacking plan payload
+STACKING_PLAN_COLUMNS = ['id', 'code', 'state', 'price', 'area', 'type']
+
 
 class RealEstateBuilding(models.Model):
     _name = 'real.estate.building'
     _description = 'Real Estate Building'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'real.estate.tombstone.mixin']
     _order = 'name'
 
     @api.model
@@ -52,282 +57,172 @@ class RealEstateBuilding(models.Model):
     apartment_product_ids = fields.One2many('product.template', 'building_id',
                                          string='Apartment Products',
                                          domain=[('is_apartment', '=', True)])
-    apartment_count = fields.Integer(compute='_compute_apartment_count',
+    apartment_count = fields.Integer(compute='_compute_unit_counts',
                                     string='Apartment Count')
 
-    sold_apartment_count = fields.Integer(compute='_compute_sold_available_apartment_count',
+    sold_apartment_count = fields.Integer(compute='_compute_unit_counts',
                                      string='Sold Apartments')
 
-    available_apartment_count = fields.Integer(compute='_compute_sold_available_apartment_count',
+    available_apartment_count = fields.Integer(compute='_compute_unit_counts',
                                      string='Disponible Apartments')
 
-    reservation_count = fields.Integer(compute='_compute_reservation_count',
+    reservation_count = fields.Integer(compute='_compute_unit_counts',
                                 string='Reservation Count')
 
     # Store-related fields
     store_product_ids = fields.One2many('product.template', 'building_id',
                                      string='Store Products',
                                      domain=[('is_store', '=', True)])
-    store_count = fields.Integer(compute='_compute_store_count',
+    store_count = fields.Integer(compute='_compute_unit_counts',
                                 string='Store Count')
 
-    sold_store_count = fields.Integer(compute='_compute_sold_available_store_count',
+    sold_store_count = fields.Integer(compute='_compute_unit_counts',
                                 string='Sold Stores')
 
-    available_store_count = fields.Integer(compute='_compute_sold_available_store_count',
+    available_store_count = fields.Integer(compute='_compute_unit_counts',
                                 string='Available Stores')
 
-    reserved_store_count = fields.Integer(compute='_compute_sold_available_store_count',
+    reserved_store_count = fields.Integer(compute='_compute_unit_counts',
                                 string='Reserved Stores')
 
     # Équipement-related fields
     equipement_product_ids = fields.One2many('product.template', 'building_id',
                                           string='Équipement Products',
                                           domain=[('is_equipement', '=', True)])
-    equipement_count = fields.Integer(compute='_compute_equipement_count',
+    equipement_count = fields.Integer(compute='_compute_unit_counts',
                                    string='Équipement Count')
 
-    sold_equipement_count = fields.Integer(compute='_compute_sold_available_equipement_count',
+    sold_equipement_count = fields.Integer(compute='_compute_unit_counts',
                                         string='Sold Équipements')
 
-    available_equipement_count = fields.Integer(compute='_compute_sold_available_equipement_count',
+    available_equipement_count = fields.Integer(compute='_compute_unit_counts',
                                              string='Available Équipements')
 
-    reserved_equipement_count = fields.Integer(compute='_compute_sold_available_equipement_count',
+    reserved_equipement_count = fields.Integer(compute='_compute_unit_counts',
                                             string='Reserved Équipements')
 
-    @api.depends('apartment_ids', 'apartment_ids.product_tmpl_ids')
-    def _compute_apartment_count(self):
-        for building in self:
-            # Count all apartments in this building using product.template
-            # This ensures consistency with the other count methods
-            product_count = self.env['product.template'].search_count([
-                ('is_apartment', '=', True),
-                ('building_id', '=', building.id)
-            ])
-
-            # For reference, also get the direct count from apartment model
-            direct_count = self.env['real.estate.apartment'].search_count([
-                ('building_id', '=', building.id)
-            ])
-
-            # Log for debugging
-            _logger.info("Building %s: apartment_count=%s (product_count), direct_count=%s",
-                        building.name, product_count, direct_count)
-
-            # Use the product count to be consistent with other methods
-            building.apartment_count = product_count
-
-            # Force cache invalidation
-            self.env.add_to_compute(self._fields['apartment_count'], building)
-
-    @api.depends('apartment_ids', 'apartment_product_ids')
-    def _compute_sold_available_apartment_count(self):
-        for building in self:
-            # Count sold apartments for this building
-            sold_count = self.env['product.template'].search_count([
-                ('is_apartment', '=', True),
-                ('building_id', '=', building.id),
-                ('apartment_state', '=', 'sold')
-            ])
-
-            # Count available apartments for this building (exclude blocker status)
-            available_count = self.env['product.template'].search_count([
-                ('is_apartment', '=', True),
-                ('building_id', '=', building.id),
-                ('apartment_state', '=', 'disponible')
-            ])
-
-            # Count reserved apartments for this building
-            reserved_count = self.env['product.template'].search_count([
-                ('is_apartment', '=', True),
-                ('building_id', '=', building.id),
-                ('apartment_state', '=', 'prereserved')
-            ])
-
-            # Count blocked apartments for this building
-            blocked_count = self.env['product.template'].search_count([
-                ('is_apartment', '=', True),
-                ('building_id', '=', building.id),
-                ('apartment_state', '=', 'blocker')
-            ])
-
-            # Calculate total for verification
-            total_by_state = sold_count + available_count + reserved_count + blocked_count
-
-            # Get total count for comparison
-            total_count = self.env['product.template'].search_count([
-                ('is_apartment', '=', True),
-                ('building_id', '=', building.id)
-            ])
-
-            # Log for debugging
-            _logger.info("Building %s: sold=%s, available=%s, reserved=%s, blocked=%s, total_by_state=%s, total_count=%s",
-                        building.name, sold_count, available_count, reserved_count, blocked_count,
-                        total_by_state, total_count)
-
-            building.sold_apartment_count = sold_count
-            building.available_apartment_count = available_count
-
-            # Force cache invalidation
-            self.env.add_to_compute(self._fields['sold_apartment_count'], building)
-            self.env.add_to_compute(self._fields['available_apartment_count'], building)
-
-    @api.depends('store_product_ids')
-    def _compute_store_count(self):
-        for building in self:
-            # Count all stores in this building
-            store_count = self.env['product.template'].search_count([
-                ('is_store', '=', True),
-                ('building_id', '=', building.id)
-            ])
-
-            # Log for debugging
-            _logger.info("Building %s: store_count=%s", building.name, store_count)
-
-            building.store_count = store_count
-
-            # Force cache invalidation
-            self.env.add_to_compute(self._fields['store_count'], building)
-
-    @api.depends('store_product_ids')
-    def _compute_sold_available_store_count(self):
-        for building in self:
-            # Count sold stores for this building
-            sold_count = self.env['product.template'].search_count([
-                ('is_store', '=', True),
-                ('building_id', '=', building.id),
-                ('apartment_state', '=', 'sold')
-            ])
-
-            # Count available stores for this building (exclude blocker status)
-            available_count = self.env['product.template'].search_count([
-                ('is_store', '=', True),
-                ('building_id', '=', building.id),
-                ('apartment_state', '=', 'disponible')
-            ])
-
-            # Count reserved stores for this building
-            reserved_count = self.env['product.template'].search_count([
-                ('is_store', '=', True),
-                ('building_id', '=', building.id),
-                ('apartment_state', '=', 'prereserved')
-            ])
-
-            # Count blocked stores for this building
-            blocked_count = self.env['product.template'].search_count([
-                ('is_store', '=', True),
-                ('building_id', '=', building.id),
-                ('apartment_state', '=', 'blocker')
-            ])
-
-            # Log for debugging
-            _logger.info("Building %s: sold_store_count=%s, available_store_count=%s, reserved_store_count=%s, blocked_store_count=%s",
-                        building.name, sold_count, available_count, reserved_count, blocked_count)
-
-            building.sold_store_count = sold_count
-            building.available_store_count = available_count
-            building.reserved_store_count = reserved_count
-
-            # Force cache invalidation
-            self.env.add_to_compute(self._fields['sold_store_count'], building)
-            self.env.add_to_compute(self._fields['available_store_count'], building)
-            self.env.add_to_compute(self._fields['reserved_store_count'], building)
-
-    @api.depends('equipement_product_ids')
-    def _compute_equipement_count(self):
-        for building in self:
-            # Count all équipements in this building
-            equipement_count = self.env['product.template'].search_count([
-                ('is_equipement', '=', True),
-                ('building_id', '=', building.id)
-            ])
-
-            # Log for debugging
-            _logger.info("Building %s: equipement_count=%s", building.name, equipement_count)
-
-            building.equipement_count = equipement_count
-
-            # Force cache invalidation
-            self.env.add_to_compute(self._fields['equipement_count'], building)
-
-    @api.depends('equipement_product_ids')
-    def _compute_sold_available_equipement_count(self):
+    @api.model
+    def _get_unit_counts(self, building_ids):
+        """Count the units of the given buildings per type and state with a single read_group
+
+        Returns {building_id: {(type, state): count}} where type is one of
+        'apartment', 'store' or 'equipement' and state is the apartment_state
+        (None for the total of the type).
+        """
+        counts = {building_id: {} for building_id in building_ids}
+        if not building_ids:
+            return counts
+
+        groups = self.env['product.template'].read_group(
+            [('building_id', 'in', building_ids),
+             '|', '|', ('is_apartment', '=', True), ('is_store', '=', True), ('is_equipement', '=', True)],
+            ['building_id'],
+            ['building_id', 'is_apartment', 'is_store', 'is_equipement', 'apartment_state'],
+            lazy=False)
+
+        for group in groups:
+            building_counts = counts[group['building_id'][0]]
+            for unit_type in ('apartment', 'store', 'equipement'):
+                if not group['is_%s' % unit_type]:
+                    continue
+                building_counts[(unit_type, None)] = building_counts.get((unit_type, None), 0) + group['__count']
+                key = (unit_type, group['apartment_state'])
+                building_counts[key] = building_counts.get(key, 0) + group['__count']
+        return counts
+
+    @api.depends('apartment_product_ids.apartment_state', 'store_product_ids.apartment_state',
+                 'equipement_product_ids.apartment_state')
+    def _compute_unit_counts(self):
+        # Counts come from one aggregate query instead of one search_count per building and state
+        counts = self._get_unit_counts(self.filtered('id').ids)
         for building in self:
-            # Count sold équipements for this building
-            sold_count = self.env['product.template'].search_count([
-                ('is_equipement', '=', True),
-                ('building_id', '=', building.id),
-                ('apartment_state', '=', 'sold')
-            ])
-
-            # Count available équipements for this building (exclude blocker status)
-            available_count = self.env['product.template'].search_count([
-                ('is_equipement', '=', True),
-                ('building_id', '=', building.id),
-                ('apartment_state', '=', 'disponible')
-            ])
-
-            # Count reserved équipements for this building
-            reserved_count = self.env['product.template'].search_count([
-                ('is_equipement', '=', True),
-                ('building_id', '=', building.id),
-                ('apartment_state', '=', 'prereserved')
-            ])
-
-            # Count blocked équipements for this building
-            blocked_count = self.env['product.template'].search_count([
-                ('is_equipement', '=', True),
-                ('building_id', '=', building.id),
-                ('apartment_state', '=', 'blocker')
-            ])
-
-            # Log for debugging
-            _logger.info("Building %s: sold_equipement_count=%s, available_equipement_count=%s, reserved_equipement_count=%s, blocked_equipement_count=%s",
-                        building.name, sold_count, available_count, reserved_count, blocked_count)
-
-            building.sold_equipement_count = sold_count
-            building.available_equipement_count = available_count
-            building.reserved_equipement_count = reserved_count
-
-            # Force cache invalidation
-            self.env.add_to_compute(self._fields['sold_equipement_count'], building)
-            self.env.add_to_compute(self._fields['available_equipement_count'], building)
-            self.env.add_to_compute(self._fields['reserved_equipement_count'], building)
-
-    @api.depends('apartment_ids.state')
-    def _compute_reservation_count(self):
+            building_counts = counts.get(building.id, {})
+            building.apartment_count = building_counts.get(('apartment', None), 0)
+            building.sold_apartment_count = building_counts.get(('apartment', 'sold'), 0)
+            building.available_apartment_count = building_counts.get(('apartment', 'disponible'), 0)
+            building.reservation_count = building_counts.get(('apartment', 'prereserved'), 0)
+            building.store_count = building_counts.get(('store', None), 0)
+            building.sold_store_count = building_counts.get(('store', 'sold'), 0)
+            building.available_store_count = building_counts.get(('store', 'disponible'), 0)
+            building.reserved_store_count = building_counts.get(('store', 'prereserved'), 0)
+            building.equipement_count = building_counts.get(('equipement', None), 0)
+            building.sold_equipement_count = building_counts.get(('equipement', 'sold'), 0)
+            building.available_equipement_count = building_counts.get(('equipement', 'disponible'), 0)
+            building.reserved_equipement_count = building_counts.get(('equipement', 'prereserved'), 0)
+
+    def get_stacking_plan(self):
+        """Return the stacking plan of the buildings: a floors x units matrix per building
+
+        The units of all the buildings are read with one query; each unit is a compact
+        row following STACKING_PLAN_COLUMNS so the client renders a tower in one round trip.
+        """
+        self.check_access_rights('read')
+        Product = self.env['product.template']
+        Product.check_access_rights('read')
+
+        # Build the query through the ORM so that the record rules still apply
+        query = Product._where_calc([
+            ('building_id', 'in', self.ids),
+            '|', '|', ('is_apartment', '=', True), ('is_store', '=', True), ('is_equipement', '=', True),
+        ])
+        Product._apply_ir_rules(query, 'read')
+        from_clause, where_clause, params = query.get_sql()
+
+        self.env.cr.execute("""
+            SELECT "product_template".building_id,
+                   COALESCE("product_template".floor, 0),
+                   "product_template".id,
+                   COALESCE((SELECT pp.default_code FROM product_product pp
+                              WHERE pp.product_tmpl_id = "product_template".id
+                              ORDER BY pp.id LIMIT 1), "product_template".name),
+                   "product_template".apartment_state,
+                   "product_template".list_price,
+                   "product_template".area,
+                   CASE WHEN "product_template".is_apartment THEN 'apartment'
+                        WHEN "product_template".is_store THEN 'store'
+                        ELSE 'equipement' END
+              FROM %s
+             WHERE %s
+          ORDER BY "product_template".building_id, 2 DESC, "product_template".name, "product_template".id
+        """ % (from_clause, where_clause), params)
+
+        floors_by_building = {building.id: {} for building in self}
+        for building_id, floor, *unit in self.env.cr.fetchall():
+            floors_by_building[building_id].setdefault(floor, []).append(unit)
+
+        plans = []
         for building in self:
-            # Count only apartments with 'prereserved' state in this building
-            reservation_count = self.env['product.template'].search_count([
-                ('is_apartment', '=', True),
-                ('building_id', '=', building.id),
-                ('apartment_state', '=', 'prereserved')
-            ])
+            floors = floors_by_building[building.id]
+            plans.append({
+                'id': building.id,
+                'name': building.name,
+                'project': building.project_id.name,
+                'width': max([len(units) for units in floors.values()] or [0]),
+                'floors': [[floor, floors[floor]] for floor in sorted(floors, reverse=True)],
+            })
 
-            # Log for debugging
-            _logger.info("Building %s: reservation_count=%s", building.name, reservation_count)
+        return {
+            'columns': STACKING_PLAN_COLUMNS,
+            'states': dict(Product._fields['apartment_state']._description_selection(self.env)),
+            'buildings': plans,
+        }
 
-            # This should be consistent with the counts in _compute_sold_available_apartment_count
-            building.reservation_count = reservation_count
+    @profiled
+    def action_view_stacking_plan(self):
+        """Open the stacking plan client view for the buildings"""
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'wm_real_estate_stacking_plan',
+            'name': _('Stacking Plan - %s') % ', '.join(self.mapped('name')),
+            'params': {'building_ids': self.ids},
+        }
 
+    @profiled
     def action_view_apartments(self):
         self.ensure_one()
 
-        # Get all apartments for this building
-        apartments = self.env['real.estate.apartment'].search([
-            ('building_id', '=', self.id)
-        ])
-
-        # Get all apartment products for this building
-        products = self.env['product.template'].search([
-            ('is_apartment', '=', True),
-            ('building_id', '=', self.id)
-        ])
-
-        # Log for debugging
-        _logger.info("Building %s: Found %s apartments and %s products",
-                    self.name, len(apartments), len(products))
+        # Log for debugging, the count comes from the aggregate instead of loading the units
+        _logger.info("Building %s: Found %s apartment products", self.name, self.apartment_count)
 
         # Use the apartment actions model to get the action
         context = {
@@ -381,6 +276,7 @@ class RealEstateBuilding(models.Model):
 
         return action
 
+    @profiled
     def action_view_reservations(self):
         self.ensure_one()
         return {
@@ -414,6 +310,7 @@ class RealEstateBuilding(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_sold_apartments(self):
         self.ensure_one()
 
@@ -448,6 +345,7 @@ class RealEstateBuilding(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_available_apartments(self):
         self.ensure_one()
 
@@ -484,17 +382,12 @@ class RealEstateBuilding(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_stores(self):
         self.ensure_one()
 
-        # Get all store products for this building
-        products = self.env['product.template'].search([
-            ('is_store', '=', True),
-            ('building_id', '=', self.id)
-        ])
-
         # Log for debugging
-        _logger.info("Building %s: Found %s stores", self.name, len(products))
+        _logger.info("Building %s: Found %s stores", self.name, self.store_count)
 
         # Prepare context for the action
         context = {
@@ -546,6 +439,7 @@ class RealEstateBuilding(models.Model):
 
         return action
 
+    @profiled
     def action_view_sold_stores(self):
         self.ensure_one()
 
@@ -582,6 +476,7 @@ class RealEstateBuilding(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_available_stores(self):
         self.ensure_one()
 
@@ -618,6 +513,7 @@ class RealEstateBuilding(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_reserved_stores(self):
         self.ensure_one()
 
@@ -655,17 +551,12 @@ class RealEstateBuilding(models.Model):
         }
 
     # Équipement action methods
+    @profiled
     def action_view_equipements(self):
         self.ensure_one()
 
-        # Get all équipement products for this building
-        products = self.env['product.template'].search([
-            ('is_equipement', '=', True),
-            ('building_id', '=', self.id)
-        ])
-
         # Log for debugging
-        _logger.info("Building %s: Found %s équipements", self.name, len(products))
+        _logger.info("Building %s: Found %s équipements", self.name, self.equipement_count)
 
         # Prepare context for the action
         context = {
@@ -700,6 +591,7 @@ class RealEstateBuilding(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_available_equipements(self):
         self.ensure_one()
 
@@ -739,6 +631,7 @@ class RealEstateBuilding(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_sold_equipements(self):
         self.ensure_one()
 
@@ -778,6 +671,7 @@ class RealEstateBuilding(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_reserved_equipements(self):
         self.ensure_one()
 
@@ -0,0 +1,85 @@
+from odoo import models, api, _
+from odoo.tools import html_escape
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Context key of the bulk mode: no per-record tracking, followers or messages
+BULK_CONTEXT_KEY = 'real_estate_bulk'
+
+# mail.thread flags set for every create and write made in bulk mode
+BULK_MAIL_CONTEXT = {
+    'tracking_disable': True,
+    'mail_create_nolog': True,
+    'mail_create_nosubscribe': True,
+    'mail_notrack': True,
+}
+
+# Imports of these models always run in bulk mode
+BULK_IMPORT_MODELS = ('real.estate.project', 'real.estate.building', 'real.estate.apartment', 'product.template')
+
+
+class MailThread(models.AbstractModel):
+    _inherit = 'mail.thread'
+
+    def _is_real_estate_bulk(self):
+        return bool(self.env.context.get(BULK_CONTEXT_KEY))
+
+    def with_real_estate_bulk(self):
+        """Return self in bulk mode, see BULK_CONTEXT_KEY"""
+        return self.with_context(**dict(BULK_MAIL_CONTEXT, **{BULK_CONTEXT_KEY: True}))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        if self._is_real_estate_bulk() and not self.env.context.get('tracking_disable'):
+            self = self.with_context(**BULK_MAIL_CONTEXT)
+        return super(MailThread, self).create(vals_list)
+
+    def write(self, vals):
+        if self._is_real_estate_bulk() and not self.env.context.get('tracking_disable'):
+            self = self.with_context(**BULK_MAIL_CONTEXT)
+        return super(MailThread, self).write(vals)
+
+    @api.model
+    def load(self, fields, data):
+        if self._name in BULK_IMPORT_MODELS and not self._is_real_estate_bulk():
+            self = self.with_real_estate_bulk()
+        return super(MailThread, self).load(fields, data)
+
+    def _real_estate_message_post(self, body, summary_field=None, **kwargs):
+        """Post body on each record, or add it to one summary per record in bulk mode
+
+        :param summary_field: many2one holding the record the summary is posted on
+                              (e.g. building_id for units), the record itself otherwise
+        """
+        if not self._is_real_estate_bulk():
+            for record in self:
+                record.message_post(body=body, **kwargs)
+            return
+
+        queue = self.env.cr.precommit.data.setdefault('wm_real_estate.bulk_messages', {})
+        if not queue:
+            self.env.cr.precommit.add(self._post_bulk_summaries)
+        for record in self:
+            target = (summary_field and record[summary_field]) or record
+            queue.setdefault((target._name, target.id), []).append((record.display_name, body))
+
+    @api.model
+    def _post_bulk_summaries(self):
+        """Post the messages buffered in bulk mode, one per summary record"""
+        queue = self.env.cr.precommit.data.pop('wm_real_estate.bulk_messages', None)
+        if not queue:
+            return
+        for (model, res_id), entries in queue.items():
+            record = self.env[model].browse(res_id).exists()
+            if not record:
+                continue
+            items = ''.join('<li><b>%s</b> : %s</li>' % (html_escape(name), body) for name, body in entries)
+            record.with_context(**BULK_MAIL_CONTEXT).message_post(
+                body='<p>%s</p><ul>%s</ul>' % (_('%s opération(s) groupée(s)') % len(entries), items),
+                message_type='notification',
+                subtype_xmlid='mail.mt_note',
+            )
+        _logger.info("Posted %s bulk summaries", len(queue))
+        # Precommit callbacks run after the transaction flush
+        self.flush()
@@ -0,0 +1,199 @@
+from odoo import models, api, _
+from odoo.exceptions import UserError
+from odoo.tools import LRU, image_process
+from odoo.tools.image import image_data_uri
+from odoo.addons.base.models.ir_actions_report import _get_wkhtmltopdf_bin
+from concurrent.futures import ThreadPoolExecutor
+import io
+import logging
+import os
+import re
+import subprocess
+import tempfile
+import zipfile
+
+from .rpc_profile import profiled
+
+_logger = logging.getLogger(__name__)
+
+# Resized project logos as data URIs, per (database, project, last write)
+LOGO_CACHE = LRU(128)
+# Logos are printed 120px high: twice that stays sharp in the PDF
+LOGO_SIZE = (480, 240)
+
+DEFAULT_DOSSIER_WORKERS = 4
+
+
+def run_wkhtmltopdf_job(command_args, header, footer, body):
+    """Convert one rendered dossier to PDF in a wkhtmltopdf process, without using the ORM"""
+    temporary_files = []
+
+    def write_temporary(content, prefix, suffix):
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix=prefix)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        temporary_files.append(path)
+        return path
+
+    try:
+        files_command_args = []
+        if header:
+            files_command_args += ['--header-html', write_temporary(header, 'report.header.tmp.', '.html')]
+        if footer:
+            files_command_args += ['--footer-html', write_temporary(footer, 'report.footer.tmp.', '.html')]
+        body_path = write_temporary(body, 'report.body.tmp.', '.html')
+        pdf_path = write_temporary(b'', 'report.tmp.', '.pdf')
+
+        process = subprocess.Popen([_get_wkhtmltopdf_bin()] + command_args + files_command_args + [body_path, pdf_path],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        _out, err = process.communicate()
+        if process.returncode not in (0, 1):
+            raise UserError(_("Wkhtmltopdf failed (error code: %s). Message: %s")
+                            % (process.returncode, err.decode(errors='replace')[-1000:]))
+        with open(pdf_path, 'rb') as pdf_file:
+            return pdf_file.read()
+    finally:
+        for path in temporary_files:
+            try:
+                os.unlink(path)
+            except OSError:
+                _logger.error("Error when trying to remove file %s", path)
+
+
+class _ZipStream(io.RawIOBase):
+    """Unseekable output of a zipfile, emptied after every member so the archive is streamed"""
+
+    def __init__(self):
+        super(_ZipStream, self).__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_dossier_zip(jobs, workers):
+    """Yield a ZIP archive of the dossiers, converted by at most workers wkhtmltopdf processes
+
+    jobs: [(filename, command_args, header, footer, body)], rendered beforehand: the
+    conversion runs in threads while the archive is streamed, the ORM is not used.
+    """
+    def convert(job):
+        filename, command_args, header, footer, body = job
+        try:
+            return filename, run_wkhtmltopdf_job(command_args, header, footer, body), None
+        except Exception as e:
+            _logger.exception("Reservation dossier %s could not be converted", filename)
+            return filename, None, str(e)
+
+    stream = _ZipStream()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for filename, pdf, error in executor.map(convert, jobs):
+                if pdf is None:
+                    archive.writestr(filename[:-4] + '.error.txt', error)
+                else:
+                    archive.writestr(filename, pdf)
+                yield stream.pop()
+    yield stream.pop()
+
+
+class ReportReservation(models.AbstractModel):
+    _name = 'report.wm_real_estate.report_reservation'
+    _description = 'Reservation Dossier Report'
+
+    @api.model
+    def _get_project_logo(self, project):
+        """Data URI of the resized logo of the project, cached until the project is written"""
+        if not project or not project.logo:
+            return False
+        key = (self.env.cr.dbname, project.id, project.write_date)
+        logo = LOGO_CACHE.get(key)
+        if logo is None:
+            logo = LOGO_CACHE[key] = image_data_uri(image_process(project.logo, size=LOGO_SIZE))
+        return logo
+
+    @api.model
+    def _get_dossier_values(self, moves):
+        """Compute once per invoice what the template shows several times: {move id: values}"""
+        dossiers = {}
+        for move in moves:
+            products = move.invoice_line_ids.mapped('product_id')
+            project = products.mapped('project_id')[:1]
+            dossiers[move.id] = {
+                'project': project,
+                'building': products.mapped('building_id')[:1],
+                'product': products[:1],
+                'logo': self._get_project_logo(project),
+                'has_stores': any(products.mapped('is_store')),
+                'has_apartment': any(products.mapped('is_apartment')),
+                'payments_vals': move.sudo()._get_reconciled_info_JSON_values()
+                if move.payment_state != 'invoicing_legacy' else [],
+            }
+        return dossiers
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        docs = self.env['account.move'].browse(docids)
+        qr_code_urls = {}
+        for invoice in docs:
+            if invoice.display_qr_code:
+                qr_code_url = invoice.generate_qr_code()
+                if qr_code_url:
+                    qr_code_urls[invoice.id] = qr_code_url
+        return {
+            'doc_ids': docids,
+            'doc_model': 'account.move',
+            'docs': docs,
+            'dossiers': self._get_dossier_values(docs),
+            'qr_code_urls': qr_code_urls,
+        }
+
+
+class AccountMove(models.Model):
+    _inherit = 'account.move'
+
+    @profiled
+    def _prepare_reservation_dossier_jobs(self):
+        """Render the reservation dossiers of the invoices in one pass per company
+
+        Returns the wkhtmltopdf jobs of stream_dossier_zip, one per invoice.
+        """
+        report = self.env.ref('wm_real_estate.action_report_reservation')
+        jobs = []
+        for company in self.mapped('company_id'):
+            moves = self.filtered(lambda m: m.company_id == company)
+            company_report = report.with_company(company)
+            html = company_report._render_qweb_html(moves.ids)[0]
+            bodies, html_ids, header, footer, specific_paperformat_args = company_report._prepare_html(html)
+            command_args = company_report._build_wkhtmltopdf_args(
+                company_report.get_paperformat(), self.env.context.get('landscape'), specific_paperformat_args)
+            names = {move.id: move.name for move in moves}
+            for body, move_id in zip(bodies, html_ids):
+                name = re.sub(r'[^\w.-]+', '_', names.get(move_id) or str(move_id))
+                jobs.append(('Dossier de Reservation - %s.pdf' % name, command_args, header, footer, body))
+        return jobs
+
+    def action_export_reservation_dossiers(self):
+        """Download the reservation dossiers of the selected invoices as a ZIP archive"""
+        moves = self.filtered(lambda m: m.move_type == 'out_invoice')
+        if not moves:
+            raise UserError(_("Veuillez sélectionner des factures client."))
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/wm_real_estate/reservation_dossiers?ids=%s' % ','.join(str(move_id) for move_id in moves.ids),
+            'target': 'self',
+        }
+
+    @api.model
+    def _get_dossier_workers(self):
+        workers = self.env['ir.config_parameter'].sudo().get_param('wm_real_estate.dossier_workers')
+        return max(1, int(workers or DEFAULT_DOSSIER_WORKERS))
@@ -0,0 +1,172 @@
+from odoo import models, fields, api
+import logging
+
+from .rpc_profile import profiled
+
+_logger = logging.getLogger(__name__)
+
+DUNNING_KINDS = [
+    ('deposit', 'Acompte'),
+    ('installment', 'Échéance'),
+    ('final', 'Facture finale'),
+]
+
+DUNNING_BUCKETS = [
+    ('1_30', '1 à 30 jours'),
+    ('31_60', '31 à 60 jours'),
+    ('61_90', '61 à 90 jours'),
+    ('90_plus', 'Plus de 90 jours'),
+]
+
+
+class RealEstateDunning(models.Model):
+    _name = 'real.estate.dunning'
+    _description = 'Real Estate Dunning Queue'
+    _order = 'days_overdue desc, id'
+    _rec_name = 'move_id'
+    # Rebuilt every night in SQL from the overdue customer invoices
+    _log_access = False
+
+    dunning_date = fields.Date(string='Calculé le', required=True, readonly=True)
+    move_id = fields.Many2one('account.move', string='Facture', required=True, readonly=True, ondelete='cascade')
+    order_id = fields.Many2one('sale.order', string='Commande', readonly=True, ondelete='cascade')
+    partner_id = fields.Many2one('res.partner', string='Client', readonly=True)
+    project_id = fields.Many2one('real.estate.project', string='Projet', readonly=True, ondelete='cascade')
+    company_id = fields.Many2one('res.company', string='Société', readonly=True)
+    currency_id = fields.Many2one('res.currency', string='Devise', readonly=True)
+    kind = fields.Selection(DUNNING_KINDS, string='Type', readonly=True)
+    invoice_date_due = fields.Date(string="Date d'échéance", readonly=True)
+    days_overdue = fields.Integer(string='Jours de retard', readonly=True, group_operator='max')
+    bucket = fields.Selection(DUNNING_BUCKETS, string='Ancienneté', readonly=True)
+    amount_residual = fields.Monetary(string='Montant dû', readonly=True)
+
+    def init(self):
+        # Collections open the queue of a project
+        self.env.cr.execute("""CREATE INDEX IF NOT EXISTS real_estate_dunning_project_idx
+                               ON real_estate_dunning (project_id, days_overdue)""")
+
+    @api.model
+    @profiled
+    def _compute_dunning_queue(self, date=None):
+        """Rebuild the queue of overdue real estate invoices and the per-project totals of date
+
+        The deposit, installment and final invoices of real estate orders that are posted,
+        not fully paid and past their due date are found with one aggregate query.
+        """
+        date = fields.Date.to_date(date) if date else fields.Date.context_today(self)
+        self.env['account.move'].flush(['state', 'move_type', 'payment_state', 'invoice_date_due',
+                                        'amount_residual_signed', 'partner_id', 'company_id'])
+        self.env['sale.order'].flush(['deposit_invoice_id', 'project_id', 'is_real_estate'])
+        self.env['real.estate.payment.installment'].flush(['invoice_id', 'order_id'])
+        cr = self.env.cr
+        cr.execute("DELETE FROM real_estate_dunning")
+        cr.execute("""
+            WITH links AS (
+                SELECT deposit_invoice_id AS move_id, id AS order_id, 1 AS priority, 'deposit' AS kind
+                  FROM sale_order
+                 WHERE deposit_invoice_id IS NOT NULL
+                UNION ALL
+                SELECT invoice_id, order_id, 2, 'installment'
+                  FROM real_estate_payment_installment
+                 WHERE invoice_id IS NOT NULL
+                UNION ALL
+                SELECT DISTINCT aml.move_id, sol.order_id, 3, 'final'
+                  FROM sale_order_line_invoice_rel rel
+                  JOIN account_move_line aml ON aml.id = rel.invoice_line_id
+                  JOIN sale_order_line sol ON sol.id = rel.order_line_id
+            )
+            INSERT INTO real_estate_dunning
+                   (dunning_date, move_id, order_id, partner_id, project_id, company_id, currency_id,
+                    kind, invoice_date_due, days_overdue, bucket, amount_residual)
+            SELECT DISTINCT ON (am.id)
+                   %(date)s, am.id, so.id, am.partner_id, so.project_id, am.company_id, rc.currency_id,
+                   links.kind, am.invoice_date_due, %(date)s - am.invoice_date_due,
+                   CASE WHEN %(date)s - am.invoice_date_due <= 30 THEN '1_30'
+                        WHEN %(date)s - am.invoice_date_due <= 60 THEN '31_60'
+                        WHEN %(date)s - am.invoice_date_due <= 90 THEN '61_90'
+                        ELSE '90_plus' END,
+                   am.amount_residual_signed
+              FROM account_move am
+              JOIN links ON links.move_id = am.id
+              JOIN sale_order so ON so.id = links.order_id AND so.is_real_estate
+              JOIN res_company rc ON rc.id = am.company_id
+             WHERE am.move_type = 'out_invoice' AND am.state = 'posted'
+               AND am.payment_state IN ('not_paid', 'partial')
+               AND am.invoice_date_due < %(date)s
+          ORDER BY am.id, links.priority
+        """, {'date': date})
+        count = cr.rowcount
+
+        cr.execute("""
+            INSERT INTO real_estate_dunning_summary
+                   (summary_date, is_latest, project_id, company_id, currency_id, invoice_count,
+                    partner_count, amount_residual, amount_1_30, amount_31_60, amount_61_90,
+                    amount_90_plus, oldest_due_date)
+            SELECT %(date)s, TRUE, project_id, min(company_id), min(currency_id), count(*),
+                   count(DISTINCT partner_id), sum(amount_residual),
+                   COALESCE(sum(amount_residual) FILTER (WHERE bucket = '1_30'), 0),
+                   COALESCE(sum(amount_residual) FILTER (WHERE bucket = '31_60'), 0),
+                   COALESCE(sum(amount_residual) FILTER (WHERE bucket = '61_90'), 0),
+                   COALESCE(sum(amount_residual) FILTER (WHERE bucket = '90_plus'), 0),
+                   min(invoice_date_due)
+              FROM real_estate_dunning
+             WHERE project_id IS NOT NULL
+          GROUP BY project_id
+                ON CONFLICT (project_id, summary_date) DO UPDATE
+               SET is_latest = TRUE, company_id = EXCLUDED.company_id, currency_id = EXCLUDED.currency_id,
+                   invoice_count = EXCLUDED.invoice_count, partner_count = EXCLUDED.partner_count,
+                   amount_residual = EXCLUDED.amount_residual, amount_1_30 = EXCLUDED.amount_1_30,
+                   amount_31_60 = EXCLUDED.amount_31_60, amount_61_90 = EXCLUDED.amount_61_90,
+                   amount_90_plus = EXCLUDED.amount_90_plus, oldest_due_date = EXCLUDED.oldest_due_date
+        """, {'date': date})
+        # Projects without overdue invoice any more are not in today's totals
+        cr.execute("""UPDATE real_estate_dunning_summary SET is_latest = FALSE
+                       WHERE is_latest AND summary_date < %s""", [date])
+        cr.execute("DELETE FROM real_estate_dunning_summary WHERE summary_date = %s AND project_id NOT IN "
+                   "(SELECT project_id FROM real_estate_dunning WHERE project_id IS NOT NULL)", [date])
+        self.invalidate_cache()
+        self.env['real.estate.dunning.summary'].invalidate_cache()
+        _logger.info("Dunning queue of %s: %s overdue invoices", date, count)
+        return count
+
+    @api.model
+    def _cron_compute_dunning_queue(self):
+        return self._compute_dunning_queue()
+
+    def action_open_invoice(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'account.move',
+            'res_id': self.move_id.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+
+class RealEstateDunningSummary(models.Model):
+    _name = 'real.estate.dunning.summary'
+    _description = 'Real Estate Overdue Payments per Project'
+    _order = 'summary_date desc, project_id'
+    _rec_name = 'project_id'
+    # One row per project and day, appended by the cron in SQL
+    _log_access = False
+
+    summary_date = fields.Date(string='Date', required=True, readonly=True)
+    is_latest = fields.Boolean(string='Dernier calcul', readonly=True)
+    project_id = fields.Many2one('real.estate.project', string='Projet', required=True, readonly=True,
+                                 ondelete='cascade')
+    company_id = fields.Many2one('res.company', string='Société', readonly=True)
+    currency_id = fields.Many2one('res.currency', string='Devise', readonly=True)
+    invoice_count = fields.Integer(string='Factures en retard', readonly=True)
+    partner_count = fields.Integer(string='Clients en retard', readonly=True)
+    amount_residual = fields.Monetary(string='Montant dû', readonly=True)
+    amount_1_30 = fields.Monetary(string='1 à 30 jours', readonly=True)
+    amount_31_60 = fields.Monetary(string='31 à 60 jours', readonly=True)
+    amount_61_90 = fields.Monetary(string='61 à 90 jours', readonly=True)
+    amount_90_plus = fields.Monetary(string='Plus de 90 jours', readonly=True)
+    oldest_due_date = fields.Date(string='Plus ancienne échéance', readonly=True, group_operator='min')
+
+    _sql_constraints = [
+        ('project_date_uniq', 'unique(project_id, summary_date)', 'Only one summary per project and day.'),
+    ]
@@ -0,0 +1,108 @@
+from odoo import models, fields, api
+from datetime import timedelta
+import logging
+
+from .rpc_profile import profiled
+
+_logger = logging.getLogger(__name__)
+
+
+class RealEstateKpiSnapshot(models.Model):
+    _name = 'real.estate.kpi.snapshot'
+    _description = 'Real Estate Daily KPI Snapshot'
+    _order = 'snapshot_date desc, building_id'
+    _rec_name = 'building_id'
+    # One row per building and day, appended by the cron in SQL
+    _log_access = False
+
+    snapshot_date = fields.Date(string='Date', required=True, readonly=True)
+    is_latest = fields.Boolean(string='Dernier instantané', readonly=True,
+                               help="Instantané le plus récent du bâtiment")
+    project_id = fields.Many2one('real.estate.project', string='Projet', readonly=True, ondelete='cascade')
+    building_id = fields.Many2one('real.estate.building', string='Bâtiment', required=True, readonly=True,
+                                  ondelete='cascade')
+    unit_count = fields.Integer(string='Biens', readonly=True)
+    available_count = fields.Integer(string='Disponibles', readonly=True)
+    prereserved_count = fields.Integer(string='Préréservés', readonly=True)
+    sold_count = fields.Integer(string='Vendus', readonly=True)
+    blocked_count = fields.Integer(string='Bloqués', readonly=True)
+    stock_value = fields.Float(string='Valeur du stock restant', readonly=True,
+                               help="Prix de vente des biens non vendus")
+    sold_value = fields.Float(string='Valeur vendue', readonly=True)
+    units_sold = fields.Integer(string='Ventes du jour', readonly=True,
+                                help="Biens passés à l'état vendu ce jour-là : leur somme par mois est le taux d'écoulement")
+    avg_days_to_sale = fields.Float(string='Délai moyen préréservation → vente (jours)', readonly=True,
+                                    group_operator='avg')
+
+    _sql_constraints = [
+        ('building_date_uniq', 'unique(building_id, snapshot_date)', 'Only one snapshot per building and day.'),
+    ]
+
+    def init(self):
+        # Dashboards read the snapshots of a project over a date range
+        self.env.cr.execute("""CREATE INDEX IF NOT EXISTS real_estate_kpi_snapshot_project_date_idx
+                               ON real_estate_kpi_snapshot (project_id, snapshot_date)""")
+
+    @api.model
+    @profiled
+    def _take_snapshot(self, date=None):
+        """Append (or refresh) the snapshot of date (today by default) of every active building with one aggregate query
+
+        Unit counts and values are read from product_template, sales and the
+        prereservation to sale delays from the state journal (real.estate.state.event).
+        """
+        date = fields.Date.to_date(date) if date else fields.Date.context_today(self)
+        self.env['product.template'].flush(['apartment_state', 'list_price', 'building_id', 'active',
+                                            'is_apartment', 'is_store', 'is_equipement'])
+        cr = self.env.cr
+        cr.execute("""
+            WITH sales AS (
+                SELECT e.building_id, count(*) AS units_sold,
+                       avg(extract(epoch FROM e.event_date - pre.event_date) / 86400.0) AS avg_days
+                  FROM real_estate_state_event e
+                  LEFT JOIN LATERAL (
+                      SELECT p.event_date FROM real_estate_state_event p
+                       WHERE p.product_id = e.product_id AND p.to_state = 'prereserved'
+                         AND p.event_date <= e.event_date
+                    ORDER BY p.event_date DESC LIMIT 1
+                  ) pre ON TRUE
+                 WHERE e.to_state = 'sold' AND e.from_state IS NOT NULL
+                   AND e.event_date >= %(date)s AND e.event_date < %(date)s::date + 1
+              GROUP BY e.building_id
+            )
+            INSERT INTO real_estate_kpi_snapshot
+                   (snapshot_date, is_latest, project_id, building_id, unit_count, available_count,
+                    prereserved_count, sold_count, blocked_count, stock_value, sold_value,
+                    units_sold, avg_days_to_sale)
+            SELECT %(date)s, TRUE, b.project_id, b.id, count(pt.id),
+                   count(pt.id) FILTER (WHERE pt.apartment_state = 'disponible'),
+                   count(pt.id) FILTER (WHERE pt.apartment_state = 'prereserved'),
+                   count(pt.id) FILTER (WHERE pt.apartment_state = 'sold'),
+                   count(pt.id) FILTER (WHERE pt.apartment_state = 'blocker'),
+                   COALESCE(sum(pt.list_price) FILTER (WHERE pt.apartment_state != 'sold'), 0),
+                   COALESCE(sum(pt.list_price) FILTER (WHERE pt.apartment_state = 'sold'), 0),
+                   COALESCE(max(sales.units_sold), 0), max(sales.avg_days)
+              FROM real_estate_building b
+              LEFT JOIN product_template pt ON pt.building_id = b.id AND pt.active
+                   AND (pt.is_apartment OR pt.is_store OR pt.is_equipement)
+              LEFT JOIN sales ON sales.building_id = b.id
+             WHERE b.active
+          GROUP BY b.id, b.project_id
+                ON CONFLICT (building_id, snapshot_date) DO UPDATE
+               SET is_latest = TRUE, project_id = EXCLUDED.project_id, unit_count = EXCLUDED.unit_count,
+                   available_count = EXCLUDED.available_count, prereserved_count = EXCLUDED.prereserved_count,
+                   sold_count = EXCLUDED.sold_count, blocked_count = EXCLUDED.blocked_count,
+                   stock_value = EXCLUDED.stock_value, sold_value = EXCLUDED.sold_value,
+                   units_sold = EXCLUDED.units_sold, avg_days_to_sale = EXCLUDED.avg_days_to_sale
+        """, {'date': date})
+        count = cr.rowcount
+        cr.execute("""UPDATE real_estate_kpi_snapshot SET is_latest = FALSE
+                       WHERE is_latest AND snapshot_date < %s""", [date])
+        self.invalidate_cache()
+        _logger.info("KPI snapshot of %s: %s buildings", date, count)
+        return count
+
+    @api.model
+    def _cron_take_snapshot(self):
+        # Runs after midnight: the previous day is complete, its late sales included
+        return self._take_snapshot(fields.Date.context_today(self) - timedelta(days=1))
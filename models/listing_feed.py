@@ -0,0 +1,192 @@
+from odoo import models, fields, api, tools
+import csv
+import datetime
+import io
+import json
+import logging
+import os
+
+from .rpc_profile import profiled
+
+_logger = logging.getLogger(__name__)
+
+# Columns of a listing, in the order of the CSV files
+LISTING_COLUMNS = ['id', 'code', 'name', 'type', 'project_id', 'project', 'building_id', 'building',
+                   'floor', 'area', 'rooms', 'price']
+
+# Changes committed by transactions that started before the previous run are caught
+# by re-reading this margin before its watermark; consumers apply upserts idempotently
+FEED_OVERLAP = datetime.timedelta(minutes=5)
+
+
+class RealEstateListingFeed(models.Model):
+    _name = 'real.estate.listing.feed'
+    _description = 'Real Estate Listing Feed'
+    _order = 'id desc'
+
+    name = fields.Char(string='Fichier', readonly=True)
+    feed_type = fields.Selection([
+        ('full', 'Complet'),
+        ('delta', 'Incrémental'),
+    ], string='Type', required=True, readonly=True)
+    since = fields.Datetime(string='Depuis', readonly=True)
+    until = fields.Datetime(string="Jusqu'à", required=True, readonly=True)
+    upsert_count = fields.Integer(string='Biens publiés', readonly=True)
+    removed_count = fields.Integer(string='Biens retirés', readonly=True)
+
+    def init(self):
+        # Incremental runs select the units written since the last one
+        self.env.cr.execute("""CREATE INDEX IF NOT EXISTS product_template_write_date_idx
+                               ON product_template (write_date)""")
+        self.env.cr.execute("""CREATE INDEX IF NOT EXISTS real_estate_apartment_write_date_idx
+                               ON real_estate_apartment (write_date)""")
+
+    @api.model
+    def _get_feed_directory(self):
+        directory = self.env['ir.config_parameter'].sudo().get_param('wm_real_estate.listing_feed_directory') \
+            or os.path.join(tools.config['data_dir'], 'wm_real_estate_feed', self.env.cr.dbname)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    @api.model
+    def _get_changed_unit_ids(self, since):
+        """Ids of the units whose product or apartment was written after since"""
+        self.env.cr.execute("""
+            SELECT id FROM product_template
+             WHERE write_date > %(since)s
+               AND (is_apartment OR is_store OR is_equipement OR building_id IS NOT NULL)
+            UNION
+            SELECT pt.id FROM real_estate_apartment rea
+              JOIN product_template pt ON pt.apartment_id = rea.id
+             WHERE rea.write_date > %(since)s
+        """, {'since': since})
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _read_listings(self, product_ids=None):
+        """Return (listings, unpublished ids) for product_ids, or all published units when None
+
+        A unit is published while it is active, for sale and disponible.
+        """
+        where = "pt.id IN %s" if product_ids is not None else \
+            "(pt.is_apartment OR pt.is_store OR pt.is_equipement) AND pt.active AND pt.sale_ok " \
+            "AND pt.apartment_state = 'disponible'"
+        self.env.cr.execute("""
+            SELECT pt.id, pt.default_code, pt.name,
+                   CASE WHEN pt.is_apartment THEN 'apartment' WHEN pt.is_store THEN 'store'
+                        ELSE 'equipement' END,
+                   pt.project_id, rep.name, pt.building_id, reb.name,
+                   pt.floor, pt.area, pt.rooms, pt.list_price,
+                   (pt.is_apartment OR pt.is_store OR pt.is_equipement) AND pt.active AND pt.sale_ok
+                       AND pt.apartment_state = 'disponible'
+              FROM product_template pt
+              LEFT JOIN real_estate_project rep ON rep.id = pt.project_id
+              LEFT JOIN real_estate_building reb ON reb.id = pt.building_id
+             WHERE %s
+          ORDER BY pt.id
+        """ % where, [tuple(product_ids)] if product_ids is not None else [])
+        listings, unpublished = [], []
+        for row in self.env.cr.fetchall():
+            if row[-1]:
+                listings.append(dict(zip(LISTING_COLUMNS, row[:-1])))
+            else:
+                unpublished.append(row[0])
+        return listings, unpublished
+
+    @api.model
+    def _write_feed_files(self, directory, basename, payload):
+        """Write basename.json and basename.csv, each replaced atomically"""
+        def write(filename, content):
+            path = os.path.join(directory, filename)
+            with open(path + '.tmp', 'w', encoding='utf-8', newline='') as f:
+                f.write(content)
+            os.replace(path + '.tmp', path)
+
+        write(basename + '.json', json.dumps(payload, ensure_ascii=False, default=str))
+
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['action'] + LISTING_COLUMNS)
+        for listing in payload['listings']:
+            writer.writerow(['upsert'] + [listing[column] for column in LISTING_COLUMNS])
+        for product_id in payload.get('removed', []):
+            writer.writerow(['delete', product_id] + [''] * (len(LISTING_COLUMNS) - 1))
+        write(basename + '.csv', output.getvalue())
+
+    @api.model
+    def _write_feed_index(self, directory):
+        """Describe the last full feed and the deltas after it in index.json"""
+        last_full = self.search([('feed_type', '=', 'full')], limit=1)
+        deltas = self.search([('feed_type', '=', 'delta'), ('id', '>', last_full.id)], order='id')
+
+        def describe(feed):
+            return {
+                'sequence': feed.id,
+                'since': feed.since and fields.Datetime.to_string(feed.since),
+                'until': fields.Datetime.to_string(feed.until),
+                'json': feed.name + '.json',
+                'csv': feed.name + '.csv',
+                'listings': feed.upsert_count,
+                'removed': feed.removed_count,
+            }
+
+        index = {'full': describe(last_full) if last_full else None, 'deltas': [describe(d) for d in deltas]}
+        path = os.path.join(directory, 'index.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(path + '.tmp', path)
+
+    @api.model
+    @profiled
+    def generate_feed(self, full=False):
+        """Write the next listing feed file, incremental since the last run unless full
+
+        A delta holds the units changed since the previous feed: published ones as
+        listings, the others (sold, reserved, blocked, archived, deleted) as removed ids.
+        """
+        self.check_access_rights('create')
+        self.flush()
+        self.env.cr.execute("SELECT now() at time zone 'UTC'")
+        until = self.env.cr.fetchone()[0]
+
+        previous = self.search([], limit=1)
+        if full or not previous:
+            listings, removed = self._read_listings()[0], []
+            since = False
+            feed_type = 'full'
+        else:
+            since = previous.until - FEED_OVERLAP
+            changed_ids = self._get_changed_unit_ids(since)
+            listings, removed = self._read_listings(changed_ids) if changed_ids else ([], [])
+            # Units of deleted apartments are unlinked, not deleted: they show up as changed
+            deleted_ids = self.env['real.estate.tombstone']._get_deleted_ids('product.template', since)
+            if deleted_ids:
+                removed = sorted(set(removed) | set(deleted_ids))
+            feed_type = 'delta'
+
+        # Named before create: managers may create feeds but not write them
+        feed = self.create({
+            'name': '%s-%s' % (feed_type, self.env['ir.sequence'].next_by_code('real.estate.listing.feed')),
+            'feed_type': feed_type,
+            'since': since,
+            'until': until,
+            'upsert_count': len(listings),
+            'removed_count': len(removed),
+        })
+        directory = self._get_feed_directory()
+        self._write_feed_files(directory, feed.name, {
+            'sequence': feed.id,
+            'type': feed_type,
+            'since': since and fields.Datetime.to_string(since),
+            'until': fields.Datetime.to_string(until),
+            'listings': listings,
+            'removed': removed,
+        })
+        self._write_feed_index(directory)
+        _logger.info("Listing feed %s written to %s: %s listings, %s removed",
+                     feed.name, directory, len(listings), len(removed))
+        return feed
+
+    @api.model
+    def _cron_generate_feed(self):
+        return self.generate_feed()
@@ -0,0 +1,279 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import float_compare
+import logging
+
+from .rpc_profile import profiled
+
+_logger = logging.getLogger(__name__)
+
+
+class RealEstatePaymentPlan(models.Model):
+    _name = 'real.estate.payment.plan'
+    _description = 'Real Estate Payment Plan'
+    _order = 'project_id, sequence, id'
+
+    name = fields.Char(string='Échéancier', required=True)
+    sequence = fields.Integer(default=10)
+    active = fields.Boolean(default=True)
+    project_id = fields.Many2one('real.estate.project', string='Projet', required=True,
+                                 ondelete='cascade', index=True)
+    company_id = fields.Many2one(related='project_id.company_id', store=True)
+    line_ids = fields.One2many('real.estate.payment.plan.line', 'plan_id', string='Échéances', copy=True)
+    total_percentage = fields.Float(string='Total (%)', compute='_compute_total_percentage')
+
+    @api.depends('line_ids.percentage')
+    def _compute_total_percentage(self):
+        for plan in self:
+            plan.total_percentage = sum(plan.line_ids.mapped('percentage'))
+
+    @api.constrains('line_ids')
+    def _check_total_percentage(self):
+        for plan in self:
+            if plan.line_ids and float_compare(plan.total_percentage, 100.0, precision_digits=2):
+                raise ValidationError(_("Les échéances de l'échéancier %s doivent totaliser 100%% (%.2f%%).")
+                                      % (plan.name, plan.total_percentage))
+
+
+class RealEstatePaymentPlanLine(models.Model):
+    _name = 'real.estate.payment.plan.line'
+    _description = 'Real Estate Payment Plan Installment'
+    _order = 'plan_id, sequence, id'
+
+    plan_id = fields.Many2one('real.estate.payment.plan', string='Échéancier', required=True,
+                              ondelete='cascade', index=True)
+    sequence = fields.Integer(default=10)
+    name = fields.Char(string='Libellé', required=True)
+    percentage = fields.Float(string='Pourcentage', required=True)
+    trigger = fields.Selection([
+        ('reservation', 'À la réservation'),
+        ('milestone', 'À une étape du chantier'),
+        ('handover', 'À la livraison'),
+    ], string='Exigible', required=True, default='reservation')
+    milestone_date = fields.Date(string="Date de l'étape",
+                                 help="Date prévue de l'étape du chantier (ex. fin du gros œuvre)")
+    days = fields.Integer(string='Délai (jours)', default=0,
+                          help="Jours ajoutés à la date de réservation, de l'étape ou de livraison")
+
+    _sql_constraints = [
+        ('check_percentage', 'CHECK(percentage > 0 AND percentage <= 100)',
+         'The percentage of an installment must be between 0 and 100.'),
+    ]
+
+    @api.constrains('trigger', 'milestone_date')
+    def _check_milestone_date(self):
+        for line in self:
+            if line.trigger == 'milestone' and not line.milestone_date:
+                raise ValidationError(_("Veuillez saisir la date de l'étape %s.") % line.name)
+
+
+class RealEstatePaymentInstallment(models.Model):
+    _name = 'real.estate.payment.installment'
+    _description = 'Real Estate Order Installment'
+    _order = 'order_id, sequence, id'
+
+    order_id = fields.Many2one('sale.order', string='Commande', required=True, readonly=True,
+                               ondelete='cascade', index=True)
+    plan_line_id = fields.Many2one('real.estate.payment.plan.line', string='Échéance', required=True,
+                                   readonly=True, ondelete='restrict')
+    sequence = fields.Integer(readonly=True)
+    name = fields.Char(string='Libellé', readonly=True)
+    percentage = fields.Float(string='Pourcentage', readonly=True)
+    currency_id = fields.Many2one(related='order_id.currency_id')
+    company_id = fields.Many2one(related='order_id.company_id', store=True)
+    amount = fields.Monetary(string='Montant', readonly=True)
+    due_date = fields.Date(string="Date d'exigibilité", readonly=True,
+                           help="Vide tant que l'événement déclencheur (livraison) n'a pas eu lieu")
+    invoice_id = fields.Many2one('account.move', string='Facture', readonly=True, copy=False)
+    payment_state = fields.Selection(related='invoice_id.payment_state', string='État du paiement')
+
+    _sql_constraints = [
+        ('order_line_uniq', 'unique(order_id, plan_line_id)', 'An installment is generated once per order.'),
+    ]
+
+    def init(self):
+        # The cron looks for the due installments that are not invoiced yet
+        self.env.cr.execute("""CREATE INDEX IF NOT EXISTS real_estate_payment_installment_due_idx
+                               ON real_estate_payment_installment (due_date) WHERE invoice_id IS NULL""")
+
+    @api.model
+    def _sync_installments(self, order_ids=None):
+        """Generate or refresh the installments of the confirmed orders with one query
+
+        Due dates are computed from the order date, the milestone date or the date the
+        delivery order was validated; installments already invoiced are left untouched.
+        Uninvoiced installments of cancelled orders, or of a plan the order no longer
+        uses, are deleted first.
+        """
+        self.env['sale.order'].flush(['state', 'payment_plan_id', 'amount_total', 'date_order',
+                                      'delivery_picking_id'])
+        self.env['stock.picking'].flush(['state', 'date_done'])
+        self.env['real.estate.payment.plan.line'].flush()
+        self.flush()
+        params = {'uid': self.env.uid, 'all': order_ids is None, 'order_ids': list(order_ids or [])}
+        self.env.cr.execute("""
+            DELETE FROM real_estate_payment_installment rpi
+             USING sale_order so, real_estate_payment_plan_line pl
+             WHERE so.id = rpi.order_id AND pl.id = rpi.plan_line_id
+               AND rpi.invoice_id IS NULL
+               AND (%(all)s OR so.id = ANY(%(order_ids)s))
+               AND (so.state NOT IN ('sale', 'done') OR pl.plan_id IS DISTINCT FROM so.payment_plan_id)
+        """, params)
+        self.env.cr.execute("""
+            INSERT INTO real_estate_payment_installment
+                   (order_id, plan_line_id, sequence, name, percentage, company_id, amount, due_date,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT so.id, pl.id, pl.sequence, pl.name, pl.percentage, so.company_id,
+                   round((so.amount_total * pl.percentage / 100.0)::numeric, 2),
+                   CASE pl.trigger
+                        WHEN 'reservation' THEN so.date_order::date + COALESCE(pl.days, 0)
+                        WHEN 'milestone' THEN pl.milestone_date + COALESCE(pl.days, 0)
+                        WHEN 'handover' THEN (SELECT sp.date_done::date + COALESCE(pl.days, 0) FROM stock_picking sp
+                                               WHERE sp.id = so.delivery_picking_id AND sp.state = 'done')
+                   END,
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM sale_order so
+              JOIN real_estate_payment_plan_line pl ON pl.plan_id = so.payment_plan_id
+             WHERE so.state IN ('sale', 'done')
+               AND (%(all)s OR so.id = ANY(%(order_ids)s))
+            ON CONFLICT (order_id, plan_line_id) DO UPDATE
+               SET amount = EXCLUDED.amount, due_date = EXCLUDED.due_date,
+                   write_uid = EXCLUDED.write_uid, write_date = EXCLUDED.write_date
+             WHERE real_estate_payment_installment.invoice_id IS NULL
+               AND (real_estate_payment_installment.amount, real_estate_payment_installment.due_date)
+                   IS DISTINCT FROM (EXCLUDED.amount, EXCLUDED.due_date)
+        """, params)
+        count = self.env.cr.rowcount
+        self.invalidate_cache()
+        return count
+
+    def _prepare_installment_invoice_vals(self, journal):
+        """Prepare values for the invoice of the installment, its share of each order line"""
+        self.ensure_one()
+        order = self.order_id
+        ratio = self.percentage / 100.0
+        invoice_line_vals = []
+        for line in order.order_line.filtered(lambda l: not l.display_type):
+            invoice_line_vals.append((0, 0, {
+                'name': _('%(installment)s (%(percentage)s%%): %(line)s') % {
+                    'installment': self.name,
+                    'percentage': '%g' % self.percentage,
+                    'line': line.name,
+                },
+                'product_id': line.product_id.id,
+                'price_unit': line.price_unit * ratio,
+                'quantity': line.product_uom_qty,
+                'discount': line.discount,
+                'tax_ids': [(6, 0, line.tax_id.ids)],
+            }))
+
+        return {
+            'partner_id': order.partner_id.id,
+            'invoice_origin': order.name,
+            'move_type': 'out_invoice',
+            'journal_id': journal.id,
+            'invoice_line_ids': invoice_line_vals,
+            'invoice_date': fields.Date.today(),
+            'invoice_date_due': self.due_date,
+            'narration': _('Installment %s for Order %s') % (self.name, order.name),
+            'payment_reference': '%s - %s' % (order.name, self.name),
+        }
+
+    @api.model
+    @profiled
+    def _generate_due_invoices(self, date=None, post=False, order_ids=None):
+        """Invoice every installment due at date (today by default) that is not invoiced yet
+
+        The due installments of all the orders (or of order_ids) are selected with one
+        indexed query, their invoices created with one create() and linked back with one UPDATE.
+        """
+        date = fields.Date.to_date(date) if date else fields.Date.context_today(self)
+        self._sync_installments(order_ids)
+        # Only the installments of the current plan of confirmed orders are billed
+        self.env.cr.execute("""
+            SELECT rpi.id FROM real_estate_payment_installment rpi
+              JOIN sale_order so ON so.id = rpi.order_id
+              JOIN real_estate_payment_plan_line pl ON pl.id = rpi.plan_line_id
+             WHERE rpi.invoice_id IS NULL AND rpi.due_date <= %s
+               AND so.state IN ('sale', 'done') AND pl.plan_id = so.payment_plan_id
+               AND (%s OR rpi.order_id = ANY(%s))
+          ORDER BY rpi.order_id, rpi.sequence, rpi.id
+        """, [date, order_ids is None, list(order_ids or [])])
+        installments = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if not installments:
+            return self.env['account.move']
+
+        orders = installments.mapped('order_id').with_real_estate_bulk()
+        journals = orders._get_deposit_journals()
+        vals_list = [installment._prepare_installment_invoice_vals(journals[installment.company_id.id])
+                     for installment in installments]
+        invoices = orders.env['account.move'].create(vals_list)
+
+        self.env.cr.execute("""
+            UPDATE real_estate_payment_installment rpi
+               SET invoice_id = new.invoice_id,
+                   write_date = (now() at time zone 'UTC'), write_uid = %s
+              FROM unnest(%s::int[], %s::int[]) AS new(installment_id, invoice_id)
+             WHERE rpi.id = new.installment_id
+        """, [self.env.uid, installments.ids, invoices.ids])
+        installments.invalidate_cache(['invoice_id', 'payment_state'], installments.ids)
+
+        if post:
+            invoices.action_post()
+
+        _logger.info("Created %s installment invoices for %s orders%s",
+                     len(invoices), len(orders), ' (posted)' if post else '')
+        return invoices
+
+    @api.model
+    def _cron_generate_due_invoices(self):
+        post = self.env['ir.config_parameter'].sudo().get_param('wm_real_estate.post_installment_invoices')
+        return self._generate_due_invoices(post=bool(post))
+
+
+class RealEstateProject(models.Model):
+    _inherit = 'real.estate.project'
+
+    payment_plan_ids = fields.One2many('real.estate.payment.plan', 'project_id', string='Échéanciers')
+
+
+class SaleOrder(models.Model):
+    _inherit = 'sale.order'
+
+    payment_plan_id = fields.Many2one('real.estate.payment.plan', string='Échéancier',
+                                      domain="[('project_id', '=', project_id)]", copy=True,
+                                      help="Échéancier de paiement du bien : remplace l'acompte de 10% et la facture finale")
+    installment_ids = fields.One2many('real.estate.payment.installment', 'order_id', string='Échéances',
+                                      copy=False)
+
+    @api.onchange('project_id')
+    def _onchange_project_id_payment_plan(self):
+        """Propose the first payment plan of the project"""
+        if self.payment_plan_id.project_id != self.project_id:
+            self.payment_plan_id = self.project_id.payment_plan_ids[:1]
+
+    def action_cancel(self):
+        """Drop the installments of the cancelled orders that are not invoiced yet"""
+        res = super(SaleOrder, self).action_cancel()
+        self.env['real.estate.payment.installment']._sync_installments(self.ids)
+        return res
+
+    def action_compute_installments(self):
+        """Generate or refresh the installments of the orders"""
+        self.env['real.estate.payment.installment']._sync_installments(self.ids)
+        return True
+
+    @profiled
+    def action_create_installment_invoices(self):
+        """Invoice the due installments of the selected orders"""
+        invoices = self.env['real.estate.payment.installment']._generate_due_invoices(order_ids=self.ids)
+        if not invoices:
+            raise UserError(_("Aucune échéance exigible à facturer pour les commandes sélectionnées."))
+        return {
+            'name': _('Factures des échéances'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'account.move',
+            'view_mode': 'tree,form',
+            'domain': [('id', 'in', invoices.ids)],
+            'target': 'current',
+        }
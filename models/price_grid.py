@@ -0,0 +1,194 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+import logging
+
+from .price_revision import FROZEN_PRICE_STATES
+from .rpc_profile import profiled
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    _logger.info("numpy is not installed, price grids are evaluated in pure Python")
+
+
+class RealEstatePriceGridLine(models.Model):
+    _name = 'real.estate.price.grid.line'
+    _description = 'Real Estate Price Grid Premium'
+    _order = 'building_id, dimension, value_from'
+
+    building_id = fields.Many2one('real.estate.building', string='Bâtiment', required=True,
+                                  ondelete='cascade', index=True)
+    dimension = fields.Selection([
+        ('floor', 'Étage'),
+        ('area', 'Surface (m²)'),
+        ('rooms', 'Nombre de pièces'),
+    ], string='Critère', required=True, default='floor')
+    value_from = fields.Float(string='De', required=True)
+    value_to = fields.Float(string='À', required=True)
+    premium = fields.Float(string='Prime (%)', required=True,
+                           help="Pourcentage ajouté au prix de base (négatif pour une décote)")
+
+    _sql_constraints = [
+        ('check_range', 'CHECK(value_from <= value_to)', 'The lower bound of a premium must not exceed its upper bound.'),
+    ]
+
+
+class RealEstateBuilding(models.Model):
+    _inherit = 'real.estate.building'
+
+    price_per_sqm = fields.Float(string='Prix de base au m²')
+    price_rounding = fields.Float(string='Arrondi des prix', default=0.0,
+                                  help="Arrondir les prix calculés à ce montant (ex. 1000), 0 pour ne pas arrondir")
+    price_grid_line_ids = fields.One2many('real.estate.price.grid.line', 'building_id', string='Primes')
+    price_grid_preview = fields.Html(string='Aperçu de la grille', compute='_compute_price_grid_preview',
+                                     groups='wm_real_estate.group_real_estate_manager')
+
+    @api.model
+    def _get_grid_units(self, buildings):
+        """Read the units of the buildings with one query
+
+        Returns {building_id: [(product_id, apartment_id, list_price, area, floor, rooms, state)]},
+        the row format of real.estate.price.revision._get_revisable_units.
+        """
+        units = {building.id: [] for building in buildings}
+        if not buildings:
+            return units
+        self.env['product.template'].flush(['list_price', 'area', 'floor', 'rooms', 'apartment_state',
+                                            'apartment_id', 'building_id'])
+        self.env.cr.execute("""
+            SELECT building_id, id, apartment_id, COALESCE(list_price, 0), COALESCE(area, 0),
+                   COALESCE(floor, 0), COALESCE(rooms, 0), apartment_state
+              FROM product_template
+             WHERE building_id IN %s
+               AND (is_apartment OR is_store OR is_equipement)
+               AND active
+          ORDER BY id
+        """, [tuple(buildings.ids)])
+        for row in self.env.cr.fetchall():
+            units[row[0]].append(row[1:])
+        return units
+
+    def _evaluate_price_grid(self, units):
+        """Return the grid price of each unit row, in the same order
+
+        All the units are priced at once: base price x area x (1 + sum of the premiums
+        whose range contains the unit's floor, area or room count).
+        """
+        self.ensure_one()
+        premiums = [(line.dimension, line.value_from, line.value_to, line.premium / 100.0)
+                    for line in self.price_grid_line_ids]
+        columns = {'area': 3, 'floor': 4, 'rooms': 5}
+
+        if np is not None:
+            data = np.array([unit[3:6] for unit in units], dtype=float).reshape(-1, 3)
+            arrays = {'area': data[:, 0], 'floor': data[:, 1], 'rooms': data[:, 2]}
+            factor = np.ones(len(units))
+            for dimension, value_from, value_to, premium in premiums:
+                values = arrays[dimension]
+                factor += ((values >= value_from) & (values <= value_to)) * premium
+            prices = arrays['area'] * self.price_per_sqm * factor
+            if self.price_rounding:
+                prices = np.round(prices / self.price_rounding) * self.price_rounding
+            return np.maximum(prices, 0.0).tolist()
+
+        prices = []
+        for unit in units:
+            factor = 1.0 + sum(premium for dimension, value_from, value_to, premium in premiums
+                               if value_from <= unit[columns[dimension]] <= value_to)
+            price = unit[3] * self.price_per_sqm * factor
+            if self.price_rounding:
+                price = round(price / self.price_rounding) * self.price_rounding
+            prices.append(max(price, 0.0))
+        return prices
+
+    def _get_price_grid_results(self):
+        """Evaluate the grids of the buildings: [(building, units, grid prices)]"""
+        units_by_building = self._get_grid_units(self)
+        results = []
+        for building in self:
+            if building.price_per_sqm <= 0:
+                raise UserError(_("Veuillez saisir un prix de base au m² pour le bâtiment %s.") % building.name)
+            units = units_by_building[building.id]
+            results.append((building, units, building._evaluate_price_grid(units)))
+        return results
+
+    @api.depends('price_per_sqm', 'price_rounding', 'price_grid_line_ids.dimension',
+                 'price_grid_line_ids.value_from', 'price_grid_line_ids.value_to', 'price_grid_line_ids.premium')
+    def _compute_price_grid_preview(self):
+        """Current and grid revenue per state, computed on display and never stored"""
+        priced = self.filtered(lambda b: b.price_per_sqm > 0)
+        (self - priced).price_grid_preview = False
+        if not priced:
+            return
+        state_labels = dict(self.env['product.template']._fields['apartment_state']._description_selection(self.env))
+        # Records of an onchange are NewIds, the units belong to the saved buildings
+        units_by_building = self._get_grid_units(priced._origin)
+        for building in priced:
+            units = units_by_building.get(building._origin.id, [])
+            totals = {}
+            for unit, price in zip(units, building._evaluate_price_grid(units)):
+                state = unit[6]
+                # Frozen units keep their price, the preview shows what will really change
+                new_price = unit[2] if state in FROZEN_PRICE_STATES else price
+                count, before, after = totals.get(state, (0, 0.0, 0.0))
+                totals[state] = (count + 1, before + unit[2], after + new_price)
+
+            rows = ''.join(
+                '<tr><td>%s</td><td class="text-right">%s</td><td class="text-right">%.2f</td>'
+                '<td class="text-right">%.2f</td><td class="text-right">%+.2f</td></tr>'
+                % (state_labels.get(state, state), count, before, after, after - before)
+                for state, (count, before, after) in sorted(totals.items()))
+            total_before = sum(total[1] for total in totals.values())
+            total_after = sum(total[2] for total in totals.values())
+            building.price_grid_preview = (
+                '<table class="table table-sm"><thead><tr><th>%s</th><th class="text-right">%s</th>'
+                '<th class="text-right">%s</th><th class="text-right">%s</th><th class="text-right">%s</th>'
+                '</tr></thead><tbody>%s</tbody><tfoot><tr><th>%s</th><th class="text-right">%s</th>'
+                '<th class="text-right">%.2f</th><th class="text-right">%.2f</th><th class="text-right">%+.2f</th>'
+                '</tr></tfoot></table>'
+                % (_('Statut'), _('Biens'), _('CA actuel'), _('CA grille'), _('Écart'), rows,
+                   _('Total'), len(units), total_before, total_after, total_after - total_before))
+
+    @profiled
+    def action_apply_price_grid(self):
+        """Apply the grid prices to the units of the buildings as one price revision"""
+        Revision = self.env['real.estate.price.revision']
+        units = []
+        new_prices = {}
+        for building, building_units, prices in self._get_price_grid_results():
+            for unit, price in zip(building_units, prices):
+                if unit[6] not in FROZEN_PRICE_STATES:
+                    units.append(unit)
+                    new_prices[unit[0]] = price
+
+        revision = Revision._apply_prices(units, new_prices, {
+            'name': _('Grille de prix - %s') % ', '.join(self.mapped('name')),
+            'method': 'grid',
+            'parameters': ', '.join('%s: %s/m²' % (building.name, building.price_per_sqm) for building in self),
+        })
+        if not revision:
+            raise UserError(_("Aucun prix n'a changé : les prix des biens correspondent déjà à la grille."))
+
+        return {
+            'name': _('Révision de prix'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'real.estate.price.revision',
+            'res_id': revision.id,
+            'view_mode': 'form',
+            'views': [(False, 'form')],
+            'target': 'current',
+        }
+
+
+class RealEstateProject(models.Model):
+    _inherit = 'real.estate.project'
+
+    def action_apply_price_grids(self):
+        """Reprice all the buildings of the project that have a price grid"""
+        buildings = self.mapped('building_ids').filtered(lambda b: b.price_per_sqm > 0)
+        if not buildings:
+            raise UserError(_("Aucun bâtiment de ce projet n'a de prix de base au m²."))
+        return buildings.action_apply_price_grid()
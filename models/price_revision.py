@@ -0,0 +1,179 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import float_round
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Units in these states keep their price: it is already committed to a customer
+FROZEN_PRICE_STATES = ('sold', 'prereserved')
+
+
+class RealEstatePriceRevision(models.Model):
+    _name = 'real.estate.price.revision'
+    _description = 'Real Estate Price Revision'
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char(string='Motif', required=True, readonly=True)
+    method = fields.Selection([
+        ('percent', 'Pourcentage'),
+        ('amount', 'Montant fixe'),
+        ('per_sqm', 'Prix au m²'),
+        ('grid', 'Grille de prix'),
+    ], string='Méthode', required=True, readonly=True)
+    parameters = fields.Char(string='Paramètres', readonly=True)
+    user_id = fields.Many2one('res.users', string='User', readonly=True, default=lambda self: self.env.user)
+    unit_count = fields.Integer(string='Biens révisés', readonly=True)
+    total_before = fields.Float(string='Total avant', readonly=True)
+    total_after = fields.Float(string='Total après', readonly=True)
+    history_ids = fields.One2many('real.estate.price.history', 'revision_id', string='Prix', readonly=True)
+
+    @api.model
+    def _get_revisable_units(self, products):
+        """Read the units of products whose price may change, with one query
+
+        Returns a list of (product_id, apartment_id, list_price, area, floor, rooms, state).
+        """
+        # Records of an onchange are NewIds, the query needs the real ones
+        products = products._origin
+        if not products:
+            return []
+        products.flush(['list_price', 'area', 'floor', 'rooms', 'apartment_state', 'apartment_id',
+                        'is_apartment', 'is_store', 'is_equipement'])
+        self.env.cr.execute("""
+            SELECT id, apartment_id, COALESCE(list_price, 0), COALESCE(area, 0),
+                   COALESCE(floor, 0), COALESCE(rooms, 0), apartment_state
+              FROM product_template
+             WHERE id IN %s
+               AND (is_apartment OR is_store OR is_equipement)
+               AND apartment_state NOT IN %s
+          ORDER BY id
+        """, [tuple(products.ids), FROZEN_PRICE_STATES])
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _compute_revised_price(self, unit, method, value=0.0, price_per_sqm=0.0,
+                               floor_premium=0.0, base_floor=0):
+        """New price of a unit row returned by _get_revisable_units"""
+        price, area, floor = unit[2], unit[3], unit[4]
+        if method == 'percent':
+            return price * (1.0 + value / 100.0)
+        if method == 'amount':
+            return price + value
+        if method == 'per_sqm':
+            # Each floor above the base floor adds floor_premium percent
+            return area * price_per_sqm * (1.0 + floor_premium / 100.0 * (floor - base_floor))
+        raise UserError(_("Méthode de révision inconnue : %s") % method)
+
+    @api.model
+    def _get_new_prices(self, units, method, rounding=0.0, **kwargs):
+        """Return {product_id: new price} for the unit rows, without writing anything"""
+        new_prices = {}
+        for unit in units:
+            new_price = self._compute_revised_price(unit, method, **kwargs)
+            if rounding:
+                new_price = float_round(new_price, precision_rounding=rounding)
+            new_prices[unit[0]] = max(new_price, 0.0)
+        return new_prices
+
+    @api.model
+    def revise_prices(self, product_ids, method, value=0.0, price_per_sqm=0.0, floor_premium=0.0,
+                      base_floor=0, rounding=0.0, reason=False):
+        """Apply a price revision to the given units, sold and prereserved ones are skipped
+
+        :param method: 'percent', 'amount' or 'per_sqm'
+        :param rounding: round the new prices to this precision (e.g. 1000), 0 to keep them
+        :return: the real.estate.price.revision record, empty when nothing changed
+        """
+        products = self.env['product.template'].browse(product_ids)
+        units = self._get_revisable_units(products)
+        new_prices = self._get_new_prices(units, method, rounding, value=value, price_per_sqm=price_per_sqm,
+                                          floor_premium=floor_premium, base_floor=base_floor)
+
+        parameters = {
+            'percent': '%s %%' % value,
+            'amount': '%+.2f' % value,
+            'per_sqm': '%s/m², +%s %% par étage depuis %s' % (price_per_sqm, floor_premium, base_floor),
+        }.get(method, '')
+        return self._apply_prices(units, new_prices, {
+            'name': reason or _('Révision de prix'),
+            'method': method,
+            'parameters': parameters,
+        })
+
+    @api.model
+    def _apply_prices(self, units, new_prices, revision_vals):
+        """Write new_prices ({product_id: price}) with one statement per table and record them
+
+        The ORM write cascade (product -> apartment -> product) is bypassed on purpose:
+        the prices of both tables are set here and the caches invalidated afterwards.
+        Access rights and record rules are checked on the changed units beforehand.
+        """
+        self.env['product.template'].check_access_rights('write')
+        self.env['real.estate.apartment'].check_access_rights('write')
+
+        changed = [unit for unit in units
+                   if unit[0] in new_prices and float_round(new_prices[unit[0]] - unit[2], 2)]
+        if not changed:
+            return self.browse()
+
+        product_ids = [unit[0] for unit in changed]
+        old_prices = [unit[2] for unit in changed]
+        prices = [new_prices[unit[0]] for unit in changed]
+        apartment_rows = [(unit[1], new_prices[unit[0]]) for unit in changed if unit[1]]
+
+        # The raw UPDATEs skip the record rules (company isolation included): check them here
+        self.env['product.template'].browse(product_ids).check_access_rule('write')
+        self.env['real.estate.apartment'].browse([row[0] for row in apartment_rows]).check_access_rule('write')
+        # Pending ORM writes of these prices would otherwise be flushed over the new ones
+        self.env['product.template'].flush(['list_price'])
+        self.env['real.estate.apartment'].flush(['price'])
+
+        cr = self.env.cr
+        cr.execute("""
+            UPDATE product_template pt
+               SET list_price = new.price, write_date = (now() at time zone 'UTC'), write_uid = %s
+              FROM unnest(%s::int[], %s::numeric[]) AS new(id, price)
+             WHERE pt.id = new.id
+        """, [self.env.uid, product_ids, prices])
+        if apartment_rows:
+            cr.execute("""
+                UPDATE real_estate_apartment rea
+                   SET price = new.price, write_date = (now() at time zone 'UTC'), write_uid = %s
+                  FROM unnest(%s::int[], %s::numeric[]) AS new(id, price)
+                 WHERE rea.id = new.id
+            """, [self.env.uid, [row[0] for row in apartment_rows], [row[1] for row in apartment_rows]])
+
+        revision = self.create(dict(revision_vals,
+                                    unit_count=len(changed),
+                                    total_before=sum(old_prices),
+                                    total_after=sum(prices)))
+        cr.execute("""
+            INSERT INTO real_estate_price_history (revision_id, product_id, old_price, new_price)
+            SELECT %s, new.id, new.old_price, new.price
+              FROM unnest(%s::int[], %s::numeric[], %s::numeric[]) AS new(id, old_price, price)
+        """, [revision.id, product_ids, old_prices, prices])
+
+        self.env['product.template'].invalidate_cache(['list_price'], product_ids)
+        self.env['product.product'].invalidate_cache(['lst_price', 'list_price'])
+        if apartment_rows:
+            self.env['real.estate.apartment'].invalidate_cache(['price'], [row[0] for row in apartment_rows])
+
+        _logger.info("Price revision %s applied to %s units: %.2f -> %.2f",
+                    revision.name, len(changed), revision.total_before, revision.total_after)
+        return revision
+
+
+class RealEstatePriceHistory(models.Model):
+    _name = 'real.estate.price.history'
+    _description = 'Real Estate Price History'
+    _order = 'id desc'
+    # One row per unit and revision: the revision holds the date and the user
+    _log_access = False
+
+    revision_id = fields.Many2one('real.estate.price.revision', string='Révision', required=True,
+                                  ondelete='cascade', index=True, readonly=True)
+    product_id = fields.Many2one('product.template', string='Bien', required=True,
+                                 ondelete='cascade', index=True, readonly=True)
+    old_price = fields.Float(string='Ancien prix', readonly=True)
+    new_price = fields.Float(string='Nouveau prix', readonly=True)
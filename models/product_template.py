@@ -1,13 +1,23 @@
 from odoo import models, fields, api, _
-from odoo.exceptions import UserError
+from odoo.exceptions import UserError, ValidationError
 import logging
 import time
 
+from .rpc_profile import profiled
+from .trigram import create_trigram_indexes
+
 _logger = logging.getLogger(__name__)
 
+# A name search whose domain uses one of these fields looks for real estate units
+REAL_ESTATE_SEARCH_FIELDS = ('is_apartment', 'is_store', 'is_equipement', 'apartment_state',
+                             'building_id', 'project_id', 'apartment_id')
+
 
 class ProductTemplate(models.Model):
-    _inherit = 'product.template'
+    _name = 'product.template'
+    _inherit = ['product.template', 'real.estate.unit.state.mixin', 'real.estate.tombstone.mixin']
+    _unit_state_field = 'apartment_state'
+    _track_unit_state_events = True
 
     # Real Estate specific fields
     is_apartment = fields.Boolean(string='Appartement', default=False)
@@ -50,6 +60,34 @@ class ProductTemplate(models.Model):
     lock_date = fields.Datetime(string='Date de verrouillage', related='apartment_id.lock_date', readonly=True,
                               help="Date et heure du verrouillage de l'appartement")
 
+    def init(self):
+        # Unit lookups by partial name or code use trigram indexes instead of sequential scans
+        create_trigram_indexes(self.env.cr, self._table, ['name', 'default_code'])
+        self.env.cr.execute("""CREATE INDEX IF NOT EXISTS product_template_building_state_idx
+                               ON product_template (building_id, apartment_state)""")
+
+    def _get_tombstone_ids(self):
+        # Only the deletion of real estate units is published to feeds
+        return self.filtered(lambda p: p.is_apartment or p.is_store or p.is_equipement).ids
+
+    @api.model
+    def _name_search(self, name, args=None, operator='ilike', limit=100, name_get_uid=None):
+        """Search real estate units directly on the template name and code
+
+        The standard search goes through the variants with several queries; units have
+        a single variant and untranslated names, so one query on the trigram-indexed
+        columns is enough.
+        """
+        args = list(args or [])
+        is_unit_search = any(isinstance(leaf, (list, tuple)) and leaf[0] in REAL_ESTATE_SEARCH_FIELDS
+                             for leaf in args)
+        if name and is_unit_search and operator in ('ilike', 'like', '=ilike', '=like'):
+            domain = ['|', ('default_code', operator, name), ('name', operator, name)] + args
+            # Without a language the name is compared on the column itself, not on ir_translation
+            return self.with_context(lang=None)._search(domain, limit=limit, access_rights_uid=name_get_uid)
+        return super(ProductTemplate, self)._name_search(name, args=args, operator=operator, limit=limit,
+                                                         name_get_uid=name_get_uid)
+
     @api.depends('apartment_id.state', 'is_apartment', 'is_store', 'is_equipement', 'sale_ok')
     def _compute_apartment_state(self):
         """Compute apartment state from the linked apartment record"""
@@ -1131,30 +1169,36 @@ class ProductTemplate(models.Model):
         return apartment_vals
 
     def _update_stock_quantity(self):
-        """Update the stock quantity based on apartment/store/équipement state"""
-        for product in self:
-            if not (product.is_apartment or product.is_store):
-                continue
+        """Update the stock quantity based on apartment/store/équipement state
+
+        All the products are adjusted with one inventory adjustment batch.
+        """
+        products = self.filtered(lambda p: p.is_apartment or p.is_store)
+        if not products:
+            return
+
+        # Get the stock location - use the default stock location
+        stock_location = self.env.ref('stock.stock_location_stock', raise_if_not_found=False)
+        if not stock_location:
+            # Fallback to searching for a stock location
+            stock_location = self.env['stock.location'].search([
+                ('usage', '=', 'internal'),
+                ('company_id', '=', self.env.company.id)
+            ], limit=1)
+
+        if not stock_location:
+            _logger.error("No internal stock location found for company %s", self.env.company.name)
+            return
 
+        quant_vals_list = []
+        adjusted_products = self.browse()
+        for product in products:
             # Get the product variant
             product_variant = product.product_variant_id
             if not product_variant:
                 _logger.error("No product variant found for %s", product.name)
                 continue
 
-            # Get the stock location - use the default stock location
-            stock_location = self.env.ref('stock.stock_location_stock', raise_if_not_found=False)
-            if not stock_location:
-                # Fallback to searching for a stock location
-                stock_location = self.env['stock.location'].search([
-                    ('usage', '=', 'internal'),
-                    ('company_id', '=', self.env.company.id)
-                ], limit=1)
-
-            if not stock_location:
-                _logger.error("No internal stock location found for company %s", self.env.company.name)
-                continue
-
             # Determine the quantity based on state and product type
             quantity = 0.0
             if product.apartment_state == 'disponible':
@@ -1168,29 +1212,41 @@ class ProductTemplate(models.Model):
             _logger.info("Setting quantity for %s to %s (state: %s)",
                         product.name, quantity, product.apartment_state)
 
-            try:
-                # Create an inventory adjustment
-                inventory_adjustment = self.env['stock.quant'].with_context(inventory_mode=True).create({
-                    'product_id': product_variant.id,
-                    'location_id': stock_location.id,
-                    'inventory_quantity': quantity,
-                })
+            quant_vals_list.append({
+                'product_id': product_variant.id,
+                'location_id': stock_location.id,
+                'inventory_quantity': quantity,
+            })
+            adjusted_products |= product
 
-                # Apply the inventory adjustment
-                inventory_adjustment.action_apply_inventory()
+        if not quant_vals_list:
+            return
 
-                # Invalidate the cache to ensure qty_available is updated
-                product.invalidate_cache(['qty_available'])
-                product_variant.invalidate_cache(['qty_available'])
+        try:
+            # Create the inventory adjustments and apply them in one go
+            with self.env.cr.savepoint():
+                self._apply_inventory_quantities(quant_vals_list)
+        except (UserError, ValidationError) as e:
+            # A product was refused: adjust the others one by one so that only it is skipped
+            _logger.warning("Batch stock update refused (%s), adjusting the products one by one", str(e))
+            for product, quant_vals in zip(adjusted_products, quant_vals_list):
+                try:
+                    with self.env.cr.savepoint():
+                        self._apply_inventory_quantities([quant_vals])
+                except (UserError, ValidationError) as e:
+                    _logger.error("Error updating stock quantity for %s: %s", product.name, str(e))
 
-                # Log success
-                _logger.info("Successfully updated stock quantity for %s to %s", product.name, quantity)
+        # Invalidate the cache to ensure qty_available is updated
+        products.invalidate_cache(['qty_available'])
+        products.mapped('product_variant_id').invalidate_cache(['qty_available'])
 
-                # Force a refresh of the product
-                self.env.cr.commit()
+        _logger.info("Updated stock quantity for %s products", len(quant_vals_list))
 
-            except Exception as e:
-                _logger.error("Error updating stock quantity for %s: %s", product.name, str(e))
+    @api.model
+    def _apply_inventory_quantities(self, quant_vals_list):
+        """Create the inventory adjustments and apply them"""
+        inventory_adjustments = self.env['stock.quant'].with_context(inventory_mode=True).create(quant_vals_list)
+        inventory_adjustments.action_apply_inventory()
 
     def _prepare_apartment_update_vals(self, vals):
         """Prepare values for updating an existing apartment"""
@@ -1232,6 +1288,92 @@ class ProductTemplate(models.Model):
 
         return category
 
+    def get_property_actions(self):
+        """Return the actions allowed on each unit with its active quotation, order and invoice
+
+        Everything is resolved with one query for all the units, so the options
+        dialog opens without further lookups:
+        {product_id: {'state', 'actions', 'quotation_id', 'order_id', 'invoice_id'}}
+        """
+        self.check_access_rights('read')
+        if not self:
+            return {}
+
+        self.flush(['apartment_state', 'is_apartment', 'is_store', 'is_equipement'])
+        self.env['sale.order'].flush(['state', 'create_date', 'name'])
+        self.env['sale.order.line'].flush(['order_id', 'product_id'])
+        self.env['account.move'].flush(['invoice_origin', 'move_type', 'state'])
+        self.env.cr.execute("""
+            SELECT pt.id, pt.apartment_state,
+                   (pt.is_apartment OR pt.is_store OR pt.is_equipement),
+                   quotation.id, confirmed.id, invoice.id
+              FROM product_template pt
+         LEFT JOIN LATERAL (
+                   SELECT so.id FROM sale_order_line sol
+                     JOIN product_product pp ON pp.id = sol.product_id
+                     JOIN sale_order so ON so.id = sol.order_id
+                    WHERE pp.product_tmpl_id = pt.id AND so.state IN ('draft', 'sent')
+                 ORDER BY so.create_date DESC, so.id DESC LIMIT 1
+                   ) quotation ON TRUE
+         LEFT JOIN LATERAL (
+                   SELECT so.id, so.name FROM sale_order_line sol
+                     JOIN product_product pp ON pp.id = sol.product_id
+                     JOIN sale_order so ON so.id = sol.order_id
+                    WHERE pp.product_tmpl_id = pt.id AND so.state IN ('sale', 'done')
+                 ORDER BY so.create_date DESC, so.id DESC LIMIT 1
+                   ) confirmed ON TRUE
+         LEFT JOIN LATERAL (
+                   SELECT am.id FROM account_move am
+                    WHERE am.invoice_origin = confirmed.name AND am.move_type = 'out_invoice'
+                      AND am.state != 'cancel'
+                 ORDER BY am.create_date DESC, am.id DESC LIMIT 1
+                   ) invoice ON TRUE
+             WHERE pt.id IN %s
+        """, [tuple(self.ids)])
+        rows = self.env.cr.fetchall()
+
+        # The query bypasses the record rules: only expose the documents the user can read
+        order_ids = {row[3] for row in rows if row[3]} | {row[4] for row in rows if row[4]}
+        readable_orders = set(self.env['sale.order'].browse(order_ids)._filter_access_rules('read').ids)
+        invoice_ids = {row[5] for row in rows if row[5]}
+        readable_invoices = set(self.env['account.move'].browse(invoice_ids)._filter_access_rules('read').ids)
+
+        result = {}
+        for product_id, state, is_property, quotation_id, order_id, invoice_id in rows:
+            quotation_id = quotation_id if quotation_id in readable_orders else False
+            order_id = order_id if order_id in readable_orders else False
+            invoice_id = invoice_id if invoice_id in readable_invoices else False
+            result[product_id] = {
+                'state': state,
+                'actions': self._get_allowed_property_actions(state, is_property, quotation_id, order_id),
+                'quotation_id': quotation_id,
+                'order_id': order_id,
+                'invoice_id': invoice_id,
+            }
+        return result
+
+    @api.model
+    def _get_allowed_property_actions(self, state, is_property, quotation_id, order_id):
+        """Actions of the options dialog allowed for a unit, same rules as the action methods"""
+        if not is_property:
+            return []
+        if state == 'disponible':
+            return ['create_reservation', 'block', 'view']
+        if state == 'blocker':
+            return ['unblock', 'view']
+        if state == 'prereserved':
+            # A confirmed order must be cancelled before the reservation
+            actions = [] if order_id else ['cancel_reservation']
+            if quotation_id:
+                actions.append('confirm_reservation')
+            return actions
+        if state == 'sold':
+            actions = ['view_reservation_document'] if order_id else []
+            actions.append('cancel_sale')
+            return actions
+        return []
+
+    @profiled
     def action_create_reservation(self):
         """Créer une nouvelle réservation (devis) pour ce bien immobilier (appartement, commerce ou équipement)"""
         self.ensure_one()
@@ -1376,6 +1518,7 @@ Surface: {area} m²
             'context': {'form_view_initial_mode': 'edit'},
         }
 
+    @profiled
     def action_cancel_reservation(self):
         """Annuler la réservation et remettre le bien à l'état disponible"""
         self.ensure_one()
@@ -1426,7 +1569,7 @@ Surface: {area} m²
         # Log the action in the chatter
         property_type = "apartment" if self.is_apartment else "store"
         message = _("Reservation annulée : %s retourné à l'état disponible") % property_type
-        self.message_post(body=message, message_type='comment')
+        self._real_estate_message_post(message, summary_field='building_id', message_type='comment')
         
         # Show success notification
         return {
@@ -1440,6 +1583,7 @@ Surface: {area} m²
             }
         }
 
+    @profiled
     def action_cancel_sold_property(self):
         """Annuler un bien vendu et le remettre à l'état disponible, gestion des factures"""
         self.ensure_one()
@@ -1503,7 +1647,7 @@ Surface: {area} m²
         message = _("Bien vendu annulé : retourné à l'état disponible") % property_type
         if invoices_to_handle:
             message += _(" (Avertissement : Des factures liées existent : %s)") % ', '.join([inv.name for inv in invoices_to_handle])
-        self.message_post(body=message, message_type='comment')
+        self._real_estate_message_post(message, summary_field='building_id', message_type='comment')
         
         return self._show_cancel_success_notification(property_type, sold=True)
     
@@ -1544,24 +1688,31 @@ Surface: {area} m²
             }
         }
 
-    def action_confirm_reservation(self):
-        """Confirmer la réservation en ouvrant le devis associé"""
+    @profiled
+    def action_confirm_reservation(self, order_id=None):
+        """Confirmer la réservation en ouvrant le devis associé
+
+        order_id is the quotation returned by get_property_actions, it saves the lookup.
+        """
         self.ensure_one()
         
         if self.apartment_state != 'prereserved':
             raise UserError(_("Seules les réservations d'un bien préréservé peuvent être confirmées."))
             
-        # Find the active sale order for this property
-        sale_lines = self.env['sale.order.line'].search([
-            ('product_id.product_tmpl_id', '=', self.id),
-            ('order_id.state', 'in', ['draft', 'sent'])
-        ])
-        
-        if not sale_lines:
-            raise UserError(_("Aucun devis actif trouvé pour ce bien"))
-            
-        # Get the most recent quotation
-        active_order = sale_lines.mapped('order_id').sorted('create_date', reverse=True)[0]
+        if order_id:
+            active_order = self.env['sale.order'].browse(order_id)
+        else:
+            # Find the active sale order for this property
+            sale_lines = self.env['sale.order.line'].search([
+                ('product_id.product_tmpl_id', '=', self.id),
+                ('order_id.state', 'in', ['draft', 'sent'])
+            ])
+
+            if not sale_lines:
+                raise UserError(_("Aucun devis actif trouvé pour ce bien"))
+
+            # Get the most recent quotation
+            active_order = sale_lines.mapped('order_id').sorted('create_date', reverse=True)[0]
         
         # Return an action to open the quotation
         return {
@@ -1578,31 +1729,42 @@ Surface: {area} m²
             }
         }
 
-    def action_view_reservation_document(self):
-        """Voir le document de réservation (facture) pour les biens vendus"""
+    @profiled
+    def action_view_reservation_document(self, order_id=None, invoice_id=None):
+        """Voir le document de réservation (facture) pour les biens vendus
+
+        order_id and invoice_id are the ones returned by get_property_actions, they save the lookups.
+        """
         self.ensure_one()
         
         if self.apartment_state != 'sold':
             raise UserError(_("Seuls les biens vendus permettent de voir le document de réservation."))
             
-        # Find the confirmed sale order for this property
-        sale_lines = self.env['sale.order.line'].search([
-            ('product_id.product_tmpl_id', '=', self.id),
-            ('order_id.state', 'in', ['sale', 'done'])
-        ])
-        
-        if not sale_lines:
-            raise UserError(_("Aucune commande de vente confirmée trouvée pour ce bien"))
-            
-        # Get the most recent confirmed order
-        confirmed_order = sale_lines.mapped('order_id').sorted('create_date', reverse=True)[0]
+        if order_id:
+            confirmed_order = self.env['sale.order'].browse(order_id)
+        else:
+            # Find the confirmed sale order for this property
+            sale_lines = self.env['sale.order.line'].search([
+                ('product_id.product_tmpl_id', '=', self.id),
+                ('order_id.state', 'in', ['sale', 'done'])
+            ])
+
+            if not sale_lines:
+                raise UserError(_("Aucune commande de vente confirmée trouvée pour ce bien"))
+
+            # Get the most recent confirmed order
+            confirmed_order = sale_lines.mapped('order_id').sorted('create_date', reverse=True)[0]
         
-        # Look for invoices related to this order
-        invoices = self.env['account.move'].search([
-            ('invoice_origin', '=', confirmed_order.name),
-            ('move_type', '=', 'out_invoice'),
-            ('state', '!=', 'cancel')
-        ])
+        if order_id:
+            # The caller already resolved the invoice, if any
+            invoices = self.env['account.move'].browse(invoice_id or [])
+        else:
+            # Look for invoices related to this order
+            invoices = self.env['account.move'].search([
+                ('invoice_origin', '=', confirmed_order.name),
+                ('move_type', '=', 'out_invoice'),
+                ('state', '!=', 'cancel')
+            ])
         
         if invoices:
             # If there are multiple invoices, get the most recent one
@@ -1635,6 +1797,7 @@ Surface: {area} m²
             }
 
     @api.model
+    @profiled
     def action_update_all_quantities(self):
         """Update quantity for all apartments and stores"""
         # Find all apartment and store products
@@ -1646,16 +1809,142 @@ Surface: {area} m²
 
         _logger.info("Updating quantities for %s products (apartments and stores)", len(products))
 
-        # Update quantities for all products
-        for product in products:
-            try:
-                product._update_stock_quantity()
-            except Exception as e:
-                _logger.error("Error updating quantity for %s: %s", product.name, str(e))
+        # Update quantities for all products in one batch
+        products._update_stock_quantity()
 
         _logger.info("Finished updating quantities for all products")
         return True
 
+    # Bulk actions on a selection of units (list view Action menu)
+
+    def _check_bulk_states(self, allowed_states, action_label):
+        """Check with one query that all the selected units are in one of allowed_states"""
+        if not self:
+            raise UserError(_("Veuillez sélectionner au moins un bien."))
+
+        self.flush(['apartment_state', 'is_apartment', 'is_store', 'is_equipement'])
+        self.env.cr.execute("""
+            SELECT id, apartment_state, (is_apartment OR is_store OR is_equipement)
+              FROM product_template
+             WHERE id IN %s
+        """, [tuple(self.ids)])
+
+        invalid_ids = [product_id for product_id, state, is_property in self.env.cr.fetchall()
+                       if not is_property or state not in allowed_states]
+        if invalid_ids:
+            names = ', '.join(self.browse(invalid_ids[:10]).mapped('display_name'))
+            if len(invalid_ids) > 10:
+                names += _(' (+%s autres)') % (len(invalid_ids) - 10)
+            raise UserError(_("Action \"%s\" impossible pour les biens suivants (état non autorisé) : %s")
+                            % (action_label, names))
+
+    def _release_bulk_reservations(self):
+        """Cancel the quotations and the locks of the selected prereserved units"""
+        sale_lines = self.env['sale.order.line'].search([
+            ('product_id.product_tmpl_id', 'in', self.ids),
+            ('order_id.state', 'in', ['draft', 'sent', 'sale'])
+        ])
+
+        confirmed_orders = sale_lines.mapped('order_id').filtered(lambda o: o.state == 'sale')
+        if confirmed_orders:
+            raise UserError(_(
+                "Impossible d'annuler les réservations : des commandes confirmées existent (%s). "
+                "Veuillez d'abord annuler les commandes de vente."
+            ) % ', '.join(confirmed_orders.mapped('name')))
+
+        draft_orders = sale_lines.mapped('order_id')
+        if draft_orders:
+            draft_orders.action_cancel()
+            _logger.info("Cancelled sale orders %s when releasing %s reservations",
+                        draft_orders.mapped('name'), len(self))
+
+        # One write for all apartment records, the products follow through the compute
+        apartments = self.mapped('apartment_id')
+        if apartments:
+            apartments.with_context(from_product_update=True).write({
+                'state': 'disponible',
+                'is_locked': False,
+                'locked_by_order_id': False,
+                'lock_date': False,
+            })
+
+        stores = self.filtered(lambda p: not p.apartment_id)
+        if stores:
+            stores.with_context(from_apartment_update=True).write({'apartment_state': 'disponible'})
+
+    def _bulk_notification(self, title, message):
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': title,
+                'message': message,
+                'type': 'success',
+                'sticky': False,
+            }
+        }
+
+    @profiled
+    def action_bulk_block(self):
+        """Bloquer tous les biens disponibles sélectionnés"""
+        self._check_bulk_states(['disponible'], _('Bloquer'))
+        self = self.with_real_estate_bulk()
+
+        # Blocking is product-level only: one write, apartment_state is recomputed to blocker
+        self.with_context(from_apartment_update=True).write({'sale_ok': False})
+        self._update_stock_quantity()
+        self._real_estate_message_post(_("Bien bloqué"), summary_field='building_id')
+
+        _logger.info("Blocked %s properties", len(self))
+        return self._bulk_notification(_('Biens bloqués'), _('%s bien(s) bloqué(s).') % len(self))
+
+    @profiled
+    def action_bulk_unblock(self):
+        """Débloquer tous les biens bloqués sélectionnés"""
+        self._check_bulk_states(['blocker'], _('Débloquer'))
+        self = self.with_real_estate_bulk()
+
+        # The state goes back to the apartment state, or disponible for stores
+        self.with_context(from_apartment_update=True).write({'sale_ok': True})
+        self._update_stock_quantity()
+        self._real_estate_message_post(_("Bien débloqué"), summary_field='building_id')
+
+        _logger.info("Unblocked %s properties", len(self))
+        return self._bulk_notification(_('Biens débloqués'), _('%s bien(s) débloqué(s).') % len(self))
+
+    @profiled
+    def action_bulk_release_reservation(self):
+        """Annuler la réservation de tous les biens préréservés sélectionnés"""
+        self._check_bulk_states(['prereserved'], _('Annuler la réservation'))
+        self = self.with_real_estate_bulk()
+
+        self._release_bulk_reservations()
+        self._update_stock_quantity()
+        self._real_estate_message_post(_("Réservation annulée : bien remis à l'état disponible"),
+                                       summary_field='building_id')
+
+        _logger.info("Released %s reservations", len(self))
+        return self._bulk_notification(_('Réservations annulées'),
+                                       _('%s bien(s) remis à l\'état disponible.') % len(self))
+
+    @profiled
+    def action_bulk_mark_available(self):
+        """Remettre à l'état disponible tous les biens bloqués ou préréservés sélectionnés"""
+        self._check_bulk_states(['disponible', 'prereserved', 'blocker'], _('Marquer disponible'))
+        self = self.with_real_estate_bulk()
+
+        # Reservations are released first, the units are unblocked afterwards
+        self._release_bulk_reservations()
+        blocked = self.filtered(lambda p: not p.sale_ok)
+        if blocked:
+            blocked.with_context(from_apartment_update=True).write({'sale_ok': True})
+        self._update_stock_quantity()
+        self._real_estate_message_post(_("Bien remis à l'état disponible"), summary_field='building_id')
+
+        _logger.info("Marked %s properties as available", len(self))
+        return self._bulk_notification(_('Biens disponibles'),
+                                       _('%s bien(s) remis à l\'état disponible.') % len(self))
+
     def action_open_quants(self):
         """Ouvrir la vue des stocks pour ce bien (appartement ou commerce)"""
         self.ensure_one()
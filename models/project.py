@@ -1,13 +1,15 @@
 from odoo import models, fields, api, _
 import logging
 
+from .rpc_profile import profiled
+
 _logger = logging.getLogger(__name__)
 
 
 class RealEstateProject(models.Model):
     _name = 'real.estate.project'
     _description = 'Real Estate Project'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'real.estate.tombstone.mixin']
     _order = 'name'
 
     name = fields.Char(string='Project Name', required=True, tracking=True)
@@ -288,6 +290,7 @@ class RealEstateProject(models.Model):
             self.env.add_to_compute(self._fields['available_equipement_count'], project)
             self.env.add_to_compute(self._fields['reserved_equipement_count'], project)
 
+    @profiled
     def action_view_buildings(self):
         self.ensure_one()
         return {
@@ -302,6 +305,7 @@ class RealEstateProject(models.Model):
             }
         }
 
+    @profiled
     def action_view_apartments(self):
         self.ensure_one()
 
@@ -374,6 +378,7 @@ class RealEstateProject(models.Model):
 
         return action
 
+    @profiled
     def action_view_reservations(self):
         self.ensure_one()
         return {
@@ -407,6 +412,7 @@ class RealEstateProject(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_sold_apartments(self):
         self.ensure_one()
 
@@ -443,6 +449,7 @@ class RealEstateProject(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_available_apartments(self):
         self.ensure_one()
 
@@ -480,6 +487,7 @@ class RealEstateProject(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_stores(self):
         self.ensure_one()
 
@@ -543,6 +551,7 @@ class RealEstateProject(models.Model):
 
         return action
 
+    @profiled
     def action_view_sold_stores(self):
         self.ensure_one()
 
@@ -580,6 +589,7 @@ class RealEstateProject(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_available_stores(self):
         self.ensure_one()
 
@@ -617,6 +627,7 @@ class RealEstateProject(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_reserved_stores(self):
         self.ensure_one()
 
@@ -655,6 +666,7 @@ class RealEstateProject(models.Model):
         }
 
     # Équipement action methods
+    @profiled
     def action_view_equipements(self):
         self.ensure_one()
 
@@ -718,6 +730,7 @@ class RealEstateProject(models.Model):
 
         return action
 
+    @profiled
     def action_view_sold_equipements(self):
         self.ensure_one()
 
@@ -755,6 +768,7 @@ class RealEstateProject(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_available_equipements(self):
         self.ensure_one()
 
@@ -792,6 +806,7 @@ class RealEstateProject(models.Model):
                     </p>"""
         }
 
+    @profiled
     def action_view_reserved_equipements(self):
         self.ensure_one()
 
@@ -0,0 +1,182 @@
+from odoo import models, fields, api, tools, _
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Profiling is not re-entrant: only the outermost entry point is captured
+_profiling_state = threading.local()
+
+
+def profiled(method):
+    """Decorator for RPC entry points: profile or trace the call when enabled for the caller"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if getattr(_profiling_state, 'active', False):
+            return method(self, *args, **kwargs)
+        Profile = self.env['real.estate.rpc.profile']
+        settings = Profile._get_profiling_settings()
+        if settings:
+            return Profile._profile_call(settings, method, self, args, kwargs)
+        Trace = self.env['real.estate.sql.trace']
+        settings = Trace._get_tracing_settings()
+        if settings:
+            return Trace._trace_call(settings, method, self, args, kwargs)
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+class SqlLogCollector(object):
+    """Collect the SQL statements executed through one cursor
+
+    The execute method of that cursor instance is wrapped while collecting: queries of
+    other cursors and threads are not seen, and no logger is reconfigured.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self._cr = None
+
+    def _collect(self, cr, query, params):
+        """Record the statement with its parameters bound, as the server log would show it"""
+        try:
+            statement = cr._obj.mogrify(query, params).decode('utf-8', 'replace')
+        except Exception:
+            statement = '%s -- %r' % (query, params)
+        self.queries.append(statement)
+
+    def start(self, cr):
+        """Wrap cr.execute on this cursor instance only"""
+        self._cr = cr
+        self._previous_execute = cr.__dict__.get('execute')
+        execute = cr.execute
+
+        def collecting_execute(query, params=None, *args, **kwargs):
+            try:
+                return execute(query, params, *args, **kwargs)
+            finally:
+                self._collect(cr, query, params)
+
+        cr.execute = collecting_execute
+
+    def stop(self):
+        """Give cr back its own execute method"""
+        if self._cr is None:
+            return
+        if self._previous_execute is None:
+            del self._cr.execute
+        else:
+            self._cr.execute = self._previous_execute
+        self._cr = None
+
+
+class RealEstateRpcProfile(models.Model):
+    _name = 'real.estate.rpc.profile'
+    _description = 'Real Estate RPC Profile'
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char(string='Entry Point', required=True, readonly=True)
+    model = fields.Char(string='Model', readonly=True)
+    method = fields.Char(string='Method', readonly=True)
+    res_ids = fields.Char(string='Record IDs', readonly=True)
+    user_id = fields.Many2one('res.users', string='User', readonly=True)
+    duration_ms = fields.Float(string='Duration (ms)', readonly=True, digits=(16, 1))
+    query_count = fields.Integer(string='SQL Queries', readonly=True)
+    profile_path = fields.Char(string='Profile File', readonly=True,
+                               help="cProfile dump, open it with pstats or snakeviz")
+    sql_log_path = fields.Char(string='SQL Log File', readonly=True)
+    hot_functions = fields.Text(string='Hot Functions', readonly=True)
+    error = fields.Char(string='Error', readonly=True)
+
+    @api.model
+    def _get_profiling_settings(self):
+        """Return the profiling settings for the current user, or None when disabled"""
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        user_ids = get_param('wm_real_estate.profiling_user_ids', '')
+        threshold = get_param('wm_real_estate.profiling_threshold_ms', '')
+        enabled_users = [int(uid) for uid in user_ids.split(',') if uid.strip().isdigit()]
+
+        if self.env.uid not in enabled_users and not threshold:
+            return None
+
+        return {
+            'threshold_ms': float(threshold or 0.0),
+            'directory': get_param('wm_real_estate.profiling_directory') or os.path.join(
+                tools.config['data_dir'], 'wm_real_estate_profiles', self.env.cr.dbname),
+            'top': int(get_param('wm_real_estate.profiling_top_functions', '25')),
+        }
+
+    @api.model
+    def _profile_call(self, settings, method, records, args, kwargs):
+        """Run method under cProfile and keep the capture when it is slow enough"""
+        profiler = cProfile.Profile()
+        collector = SqlLogCollector()
+        error = None
+
+        _profiling_state.active = True
+        collector.start(records.env.cr)
+        start = time.perf_counter()
+        try:
+            return profiler.runcall(method, records, *args, **kwargs)
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000.0
+            collector.stop()
+            _profiling_state.active = False
+            if duration_ms >= settings['threshold_ms']:
+                try:
+                    self._save_profile(settings, method, records, profiler, collector.queries,
+                                       duration_ms, error)
+                except Exception as e:
+                    _logger.error("Could not save profile of %s.%s: %s",
+                                  records._name, method.__name__, str(e))
+
+    @api.model
+    def _save_profile(self, settings, method, records, profiler, queries, duration_ms, error=None):
+        """Dump the profile and the SQL log, then record them"""
+        directory = settings['directory']
+        os.makedirs(directory, exist_ok=True)
+
+        basename = '%s_%s_%s_uid%s' % (
+            time.strftime('%Y%m%d-%H%M%S'), records._name.replace('.', '_'),
+            method.__name__, records.env.uid)
+        profile_path = os.path.join(directory, basename + '.prof')
+        sql_log_path = os.path.join(directory, basename + '.sql')
+
+        profiler.dump_stats(profile_path)
+        with open(sql_log_path, 'w') as sql_log:
+            for query in queries:
+                sql_log.write(query.rstrip() + ';\n')
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats('cumulative').print_stats(settings['top'])
+
+        vals = {
+            'name': '%s.%s' % (records._name, method.__name__),
+            'model': records._name,
+            'method': method.__name__,
+            'res_ids': ','.join(str(rid) for rid in records.ids),
+            'user_id': records.env.uid,
+            'duration_ms': duration_ms,
+            'query_count': len(queries),
+            'profile_path': profile_path,
+            'sql_log_path': sql_log_path,
+            'hot_functions': stream.getvalue(),
+            'error': error,
+        }
+
+        # Own cursor: the capture must survive a rollback of the profiled call
+        with self.pool.cursor() as cr:
+            self.with_env(self.env(cr=cr, su=True)).create(vals)
+
+        _logger.info("Captured profile of %s (%.1f ms, %s queries) in %s",
+                    vals['name'], duration_ms, len(queries), profile_path)
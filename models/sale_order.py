@@ -3,6 +3,8 @@ from odoo.exceptions import UserError, ValidationError
 import logging
 from datetime import datetime
 
+from .rpc_profile import profiled
+
 _logger = logging.getLogger(__name__)
 
 
@@ -211,6 +213,8 @@ Surface: {area} m²
 
         # Create the sale order line
         res = super(SaleOrderLine, self).create(vals)
+        # The state history links the unit state changes below to this order
+        self = self.with_context(real_estate_order_id=res.order_id.id)
 
         # If this is an apartment product, mark it as prereserved
         if res.product_id and res.product_id.product_tmpl_id.is_apartment:
@@ -257,7 +261,7 @@ Surface: {area} m²
 
             if store_product.apartment_state == 'disponible':
                 # Update the store to prereserved state when added to quotation
-                store_product.with_context(from_sale_order=True).write({
+                store_product.with_context(from_sale_order=True, real_estate_order_id=res.order_id.id).write({
                     'apartment_state': 'prereserved',
                     'is_locked': True,
                     'locked_by_order_id': res.order_id.id,
@@ -273,7 +277,7 @@ Surface: {area} m²
 
             if equipement_product.apartment_state == 'disponible':
                 # Update the équipement to prereserved state when added to quotation
-                equipement_product.with_context(from_sale_order=True).write({
+                equipement_product.with_context(from_sale_order=True, real_estate_order_id=res.order_id.id).write({
                     'apartment_state': 'prereserved',
                     'is_locked': True,
                     'locked_by_order_id': res.order_id.id,
@@ -288,6 +292,8 @@ Surface: {area} m²
     def unlink(self):
         """Override unlink to handle apartment/store/équipement unlocking"""
         for line in self:
+            # The state history links the unit state changes below to the order
+            line = line.with_context(real_estate_order_id=line.order_id.id)
             # Handle apartments
             if line.apartment_id and line.apartment_id.is_locked and line.apartment_id.locked_by_order_id.id == line.order_id.id:
                 # Unlock apartment when removed from sale order and set state back to disponible
@@ -343,6 +349,14 @@ Surface: {area} m²
 
         return super(SaleOrderLine, self).unlink()
 
+    def _prepare_invoice_line(self, **optional_values):
+        """Final invoices of real estate orders bill 90%: the deposit (10%) was invoiced before"""
+        res = super(SaleOrderLine, self)._prepare_invoice_line(**optional_values)
+        if not self.display_type and self.order_id.id in self.env.context.get('real_estate_final_invoice_order_ids', ()):
+            res['price_unit'] = res.get('price_unit', self.price_unit) * 0.9
+            res['name'] = _('Final Payment (90%%): %s') % res.get('name', self.name)
+        return res
+
 
 class SaleOrder(models.Model):
     _inherit = 'sale.order'
@@ -511,6 +525,7 @@ class SaleOrder(models.Model):
         for order in self:
             order.deposit_amount = order.amount_total * 0.1
 
+    @profiled
     def action_create_deposit_invoice(self):
         """Create a deposit invoice for 10% of the total amount"""
         self.ensure_one()
@@ -613,18 +628,68 @@ Please register the payment when received to proceed with the order confirmation
             }
         }
 
-    def _prepare_deposit_invoice_vals(self):
+    @profiled
+    def action_create_deposit_invoices(self, post=False):
+        """Create the deposit invoices of all the selected reservations at once
+
+        Confirmed real estate orders without a deposit invoice are invoiced, the
+        others are skipped. The moves are created with one create(), linked to their
+        orders through the ORM (flushed together) and, with post=True, posted together.
+        """
+        orders = self.filtered(lambda o: o.state == 'sale' and o.has_apartment and not o.is_deposit_invoiced
+                               and not o.payment_plan_id)
+        if not orders:
+            raise UserError(_("Aucune réservation sélectionnée n'attend de facture d'acompte."))
+        orders = orders.with_real_estate_bulk()
+        # Fail before creating any move when an order cannot be linked to its invoice
+        orders.check_access_rights('write')
+        orders.check_access_rule('write')
+
+        journals = orders._get_deposit_journals()
+        vals_list = [order._prepare_deposit_invoice_vals(journal=journals[order.company_id.id])
+                     for order in orders]
+        invoices = orders.env['account.move'].create(vals_list)
+
+        # ORM writes keep record rules, tracking and write overrides; the deferred
+        # updates are flushed together with the invoices
+        for order, invoice in zip(orders, invoices):
+            order.write({'deposit_invoice_id': invoice.id, 'is_deposit_invoiced': True})
+
+        if post:
+            invoices.action_post()
+
+        _logger.info("Created %s deposit invoices for %s reservations%s",
+                     len(invoices), len(orders), ' (posted)' if post else '')
+        return {
+            'name': _("Factures d'acompte"),
+            'type': 'ir.actions.act_window',
+            'res_model': 'account.move',
+            'view_mode': 'tree,form',
+            'domain': [('id', 'in', invoices.ids)],
+            'target': 'current',
+        }
+
+    def _get_deposit_journals(self):
+        """Return {company_id: sale journal} for the companies of the orders, with one search"""
+        companies = self.mapped('company_id')
+        journals = {}
+        for journal in self.env['account.journal'].search([('type', '=', 'sale'),
+                                                           ('company_id', 'in', companies.ids)]):
+            # The search order is the journal sequence: keep the first one per company
+            journals.setdefault(journal.company_id.id, journal)
+
+        missing = companies.filtered(lambda c: c.id not in journals)
+        if missing:
+            raise UserError(_("No sale journal found for the company %s") % ', '.join(missing.mapped('name')))
+        return journals
+
+    def _prepare_deposit_invoice_vals(self, journal=None):
         """Prepare values for the deposit invoice (10% of total)"""
         self.ensure_one()
 
-        # Get the journal
-        journal = self.env['account.journal'].search([
-            ('type', '=', 'sale'),
-            ('company_id', '=', self.company_id.id)
-        ], limit=1)
-
-        if not journal:
-            raise UserError(_("No sale journal found for the company %s") % self.company_id.name)
+        # Get the journal, batches resolve it once per company
+        if journal is None:
+            journal = self._get_deposit_journals()[self.company_id.id]
 
         # Prepare invoice lines
         invoice_line_vals = []
@@ -674,6 +739,7 @@ Price: %(currency)s %(price).2f
             'payment_reference': _('Deposit for %s') % self.name,
         }
 
+    @profiled
     def action_confirm_reservation(self):
         """Confirm the quotation to create a reservation"""
         self.ensure_one()
@@ -716,6 +782,7 @@ Price: %(currency)s %(price).2f
             }
         }
 
+    @profiled
     def action_confirm(self):
         """Override confirm to handle apartment and store state"""
         # Check if all order lines have a name set
@@ -739,6 +806,8 @@ Price: %(currency)s %(price).2f
 
         # Call super to confirm the order
         res = super(SaleOrder, self).action_confirm()
+        # The state history links the unit state changes below to this order
+        self = self.with_context(real_estate_order_id=self.id)
 
         # For real estate orders with apartments or stores
         if self.is_real_estate:
@@ -841,53 +910,75 @@ Order %s has been confirmed successfully.
 Properties will be marked as 'Sold' when the invoice is created by the auto workflow.
 """) % self.name
 
-        self.message_post(
-            body=message,
+        self._real_estate_message_post(
+            message,
             message_type='notification',
             subtype_id=self.env.ref('mail.mt_note').id,
         )
 
+    def _prepare_invoice(self):
+        res = super(SaleOrder, self)._prepare_invoice()
+        if self.id in self.env.context.get('real_estate_final_invoice_order_ids', ()):
+            res['narration'] = _('Final Invoice (90%%) for Order %s') % self.name
+        return res
+
     def _create_invoices(self, grouped=False, final=False, date=None):
         """Override to handle apartment state when invoice is created"""
         # For real estate orders with apartments
-        if self.is_real_estate and self.has_apartment:
-            # Case 1: Creating final invoice after handover
-            if self.state == 'sale' and self.is_deposit_invoiced and self.handover_picking_id:
-                # Check if the handover picking is done
-                if self.handover_picking_id.state == 'done':
-                    # Create the final invoice (90%)
-                    invoices = super(SaleOrder, self)._create_invoices(grouped=grouped, final=final, date=date)
-
-                    # Adjust the invoice amounts to account for the deposit (10%)
-                    for invoice in invoices:
-                        # Mark as final invoice
-                        invoice.narration = _('Final Invoice (90%) for Order %s') % self.name
-
-                        for line in invoice.invoice_line_ids:
-                            # Reduce the price by 10% to account for the deposit
-                            line.price_unit = line.price_unit * 0.9
-                            line.name = _('Final Payment (90%%): %s') % line.name
-
-                    # Log the creation
-                    _logger.info("Created final invoices %s for order %s", invoices.mapped('name'), self.name)
-
-                    return invoices
-                else:
-                    raise UserError(_("Cannot create final invoice until the handover is completed. Please validate the delivery order first."))
-
-            # Case 2: Creating deposit invoice
-            elif self.state == 'reservation' and not self.is_deposit_invoiced:
-                # This should be handled by action_create_deposit_invoice
-                raise UserError(_("Please use the 'Create Deposit Invoice' button to create a deposit invoice."))
-
-        # Default case: normal invoice creation
+        real_estate_orders = self.filtered(lambda o: o.is_real_estate and o.has_apartment)
+
+        # Orders with a payment plan are invoiced installment by installment
+        plan_orders = real_estate_orders.filtered('payment_plan_id')
+        if plan_orders:
+            raise UserError(_("Les commandes %s sont facturées selon leur échéancier de paiement.")
+                            % ', '.join(plan_orders.mapped('name')))
+
+        # Case 1: Creating final invoices after handover
+        final_orders = real_estate_orders.filtered(
+            lambda o: o.state == 'sale' and o.is_deposit_invoiced and o.delivery_picking_id)
+        not_handed_over = final_orders.filtered(lambda o: o.delivery_picking_id.state != 'done')
+        if not_handed_over:
+            raise UserError(_("Cannot create final invoice until the handover is completed. Please validate the delivery order first. (%s)")
+                            % ', '.join(not_handed_over.mapped('name')))
+
+        # Case 2: Creating deposit invoice
+        if real_estate_orders.filtered(lambda o: o.state == 'reservation' and not o.is_deposit_invoiced):
+            # This should be handled by action_create_deposit_invoice
+            raise UserError(_("Please use the 'Create Deposit Invoice' button to create a deposit invoice."))
+
+        # The deposit deduction (90%) is applied while the lines are prepared, so each
+        # invoice is computed once instead of being rewritten after its creation
+        if final_orders:
+            self = self.with_context(real_estate_final_invoice_order_ids=final_orders.ids)
         invoices = super(SaleOrder, self)._create_invoices(grouped=grouped, final=final, date=date)
 
         # Log invoice creation
-        _logger.info("Created invoices %s for sale order %s", invoices.mapped('name'), self.name)
+        if final_orders:
+            _logger.info("Created final invoices %s for orders %s", invoices.mapped('name'), final_orders.mapped('name'))
+        _logger.info("Created invoices %s for sale orders %s", invoices.mapped('name'), self.mapped('name'))
 
         return invoices
 
+    @profiled
+    def action_create_final_invoices(self):
+        """Create the final invoices (90%) of all the selected handed-over orders at once"""
+        orders = self.filtered(lambda o: o.is_real_estate and o.has_apartment and o.state == 'sale'
+                               and not o.payment_plan_id and o.is_deposit_invoiced and o.delivery_picking_id.state == 'done'
+                               and o.invoice_status == 'to invoice')
+        if not orders:
+            raise UserError(_("Aucune commande sélectionnée n'est livrée et en attente de sa facture finale."))
+
+        invoices = orders.with_real_estate_bulk()._create_invoices()
+        _logger.info("Created %s final invoices for %s orders", len(invoices), len(orders))
+        return {
+            'name': _('Factures finales'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'account.move',
+            'view_mode': 'tree,form',
+            'domain': [('id', 'in', invoices.ids)],
+            'target': 'current',
+        }
+
     def _create_delivery_picking(self):
         """Create a delivery order for the apartment/store/équipement"""
         self.ensure_one()
@@ -1175,104 +1266,109 @@ Please review and validate the delivery when complete.
 
         return all_paid
 
+    @profiled
     def action_cancel(self):
         """Override cancel to handle apartment/store/équipement state and locking"""
         res = super(SaleOrder, self).action_cancel()
 
-        # Update apartment/store/équipement states when order is cancelled
-        for line in self.order_line:
-            # Handle apartments
-            if line.apartment_id:
-                # If the apartment is locked by this order, unlock it
-                if line.apartment_id.is_locked and line.apartment_id.locked_by_order_id.id == self.id:
-                    line.apartment_id.write({
-                        'is_locked': False,
-                        'locked_by_order_id': False,
-                        'lock_date': False
-                    })
-                    _logger.info("Apartment %s unlocked when order %s was cancelled",
-                                line.apartment_id.name, self.name)
-
-                # If the apartment is prereserved by this order, make it disponible again
-                # Only do this for prereserved apartments, not sold ones
-                if line.apartment_id.state == 'prereserved':
-                    # Check if this is the only active order for this apartment
-                    other_orders = self.env['sale.order.line'].search([
-                        ('apartment_id', '=', line.apartment_id.id),
-                        ('order_id', '!=', self.id),
-                        ('order_id.state', 'in', ['sale', 'done'])
-                    ])
-
-                    if not other_orders:
-                        # Mark apartment as disponible when order is cancelled
-                        line.apartment_id.with_context(from_sale_order=True).state = 'disponible'
-                        # Update the product state with context to prevent infinite recursion
-                        if line.product_id and line.product_id.product_tmpl_id.is_apartment:
-                            line.product_id.product_tmpl_id.with_context(from_apartment_update=True).apartment_state = 'disponible'
-
-                        _logger.info("Apartment %s state changed to disponible when order %s was cancelled",
-                                    line.apartment_id.name, self.name)
+        # Update apartment/store/équipement states when order is cancelled, order by order:
+        # bulk releases cancel the quotations of many units at once
+        for order in self:
+            # The state history links the unit state changes below to this order
+            order = order.with_context(real_estate_order_id=order.id)
+            for line in order.order_line:
+                # Handle apartments
+                if line.apartment_id:
+                    # If the apartment is locked by this order, unlock it
+                    if line.apartment_id.is_locked and line.apartment_id.locked_by_order_id.id == order.id:
+                        line.apartment_id.write({
+                            'is_locked': False,
+                            'locked_by_order_id': False,
+                            'lock_date': False
+                        })
+                        _logger.info("Apartment %s unlocked when order %s was cancelled",
+                                    line.apartment_id.name, order.name)
+
+                    # If the apartment is prereserved by this order, make it disponible again
+                    # Only do this for prereserved apartments, not sold ones
+                    if line.apartment_id.state == 'prereserved':
+                        # Check if this is the only active order for this apartment
+                        other_orders = self.env['sale.order.line'].search([
+                            ('apartment_id', '=', line.apartment_id.id),
+                            ('order_id', '!=', order.id),
+                            ('order_id.state', 'in', ['sale', 'done'])
+                        ])
+
+                        if not other_orders:
+                            # Mark apartment as disponible when order is cancelled
+                            line.apartment_id.with_context(from_sale_order=True).state = 'disponible'
+                            # Update the product state with context to prevent infinite recursion
+                            if line.product_id and line.product_id.product_tmpl_id.is_apartment:
+                                line.product_id.product_tmpl_id.with_context(from_apartment_update=True).apartment_state = 'disponible'
+
+                            _logger.info("Apartment %s state changed to disponible when order %s was cancelled",
+                                        line.apartment_id.name, order.name)
 
-            # Handle stores
-            elif line.product_id and line.product_id.product_tmpl_id.is_store:
-                store_product = line.product_id.product_tmpl_id
+                # Handle stores
+                elif line.product_id and line.product_id.product_tmpl_id.is_store:
+                    store_product = line.product_id.product_tmpl_id
 
-                # If the store is locked by this order, unlock it
-                if store_product.is_locked and store_product.locked_by_order_id.id == self.id:
-                    store_product.with_context(from_sale_order=True).write({
-                        'is_locked': False,
-                        'locked_by_order_id': False,
-                    })
-                    _logger.info("Store %s unlocked when order %s was cancelled",
-                                store_product.name, self.name)
-
-                # If the store is prereserved, make it disponible again
-                # Only do this for prereserved stores, not sold ones
-                if store_product.apartment_state == 'prereserved':
-                    # Check if this is the only active order for this store
-                    other_orders = self.env['sale.order.line'].search([
-                        ('product_id.product_tmpl_id', '=', store_product.id),
-                        ('order_id', '!=', self.id),
-                        ('order_id.state', 'in', ['sale', 'done'])
-                    ])
-
-                    if not other_orders:
-                        # Mark store as disponible when order is cancelled
-                        store_product.with_context(from_sale_order=True).apartment_state = 'disponible'
-                        # Quantity management is now handled by Odoo's standard inventory management
+                    # If the store is locked by this order, unlock it
+                    if store_product.is_locked and store_product.locked_by_order_id.id == order.id:
+                        store_product.with_context(from_sale_order=True).write({
+                            'is_locked': False,
+                            'locked_by_order_id': False,
+                        })
+                        _logger.info("Store %s unlocked when order %s was cancelled",
+                                    store_product.name, order.name)
+
+                    # If the store is prereserved, make it disponible again
+                    # Only do this for prereserved stores, not sold ones
+                    if store_product.apartment_state == 'prereserved':
+                        # Check if this is the only active order for this store
+                        other_orders = self.env['sale.order.line'].search([
+                            ('product_id.product_tmpl_id', '=', store_product.id),
+                            ('order_id', '!=', order.id),
+                            ('order_id.state', 'in', ['sale', 'done'])
+                        ])
+
+                        if not other_orders:
+                            # Mark store as disponible when order is cancelled
+                            store_product.with_context(from_sale_order=True).apartment_state = 'disponible'
+                            # Quantity management is now handled by Odoo's standard inventory management
 
-                        _logger.info("Store %s state changed to disponible when order %s was cancelled",
-                                    store_product.name, self.name)
+                            _logger.info("Store %s state changed to disponible when order %s was cancelled",
+                                        store_product.name, order.name)
 
-            # Handle équipements
-            elif line.product_id and line.product_id.product_tmpl_id.is_equipement:
-                equipement_product = line.product_id.product_tmpl_id
+                # Handle équipements
+                elif line.product_id and line.product_id.product_tmpl_id.is_equipement:
+                    equipement_product = line.product_id.product_tmpl_id
 
-                # If the équipement is locked by this order, unlock it
-                if equipement_product.is_locked and equipement_product.locked_by_order_id.id == self.id:
-                    equipement_product.with_context(from_sale_order=True).write({
-                        'is_locked': False,
-                        'locked_by_order_id': False,
-                    })
-                    _logger.info("Équipement %s unlocked when order %s was cancelled",
-                                equipement_product.name, self.name)
-
-                # If the équipement is prereserved, make it disponible again
-                # Only do this for prereserved équipements, not sold ones
-                if equipement_product.apartment_state == 'prereserved':
-                    # Check if this is the only active order for this équipement
-                    other_orders = self.env['sale.order.line'].search([
-                        ('product_id.product_tmpl_id', '=', equipement_product.id),
-                        ('order_id', '!=', self.id),
-                        ('order_id.state', 'in', ['sale', 'done'])
-                    ])
-
-                    if not other_orders:
-                        # Mark équipement as disponible when order is cancelled
-                        equipement_product.with_context(from_sale_order=True).apartment_state = 'disponible'
-                        # Quantity management is now handled by Odoo's standard inventory management
+                    # If the équipement is locked by this order, unlock it
+                    if equipement_product.is_locked and equipement_product.locked_by_order_id.id == order.id:
+                        equipement_product.with_context(from_sale_order=True).write({
+                            'is_locked': False,
+                            'locked_by_order_id': False,
+                        })
+                        _logger.info("Équipement %s unlocked when order %s was cancelled",
+                                    equipement_product.name, order.name)
+
+                    # If the équipement is prereserved, make it disponible again
+                    # Only do this for prereserved équipements, not sold ones
+                    if equipement_product.apartment_state == 'prereserved':
+                        # Check if this is the only active order for this équipement
+                        other_orders = self.env['sale.order.line'].search([
+                            ('product_id.product_tmpl_id', '=', equipement_product.id),
+                            ('order_id', '!=', order.id),
+                            ('order_id.state', 'in', ['sale', 'done'])
+                        ])
+
+                        if not other_orders:
+                            # Mark équipement as disponible when order is cancelled
+                            equipement_product.with_context(from_sale_order=True).apartment_state = 'disponible'
+                            # Quantity management is now handled by Odoo's standard inventory management
 
-                        _logger.info("Équipement %s state changed to disponible when order %s was cancelled",
-                                    equipement_product.name, self.name)
+                            _logger.info("Équipement %s state changed to disponible when order %s was cancelled",
+                                        equipement_product.name, order.name)
 
         return res
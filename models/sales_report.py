@@ -0,0 +1,107 @@
+from odoo import models, fields, api, tools
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class RealEstateSalesReport(models.Model):
+    _name = 'real.estate.sales.report'
+    _description = 'Real Estate Sales Analysis'
+    _auto = False
+    _order = 'date desc'
+    _rec_name = 'order_id'
+
+    date = fields.Datetime(string='Date', readonly=True)
+    order_id = fields.Many2one('sale.order', string='Commande', readonly=True)
+    order_state = fields.Selection([
+        ('draft', 'Devis'),
+        ('sent', 'Devis envoyé'),
+        ('sale', 'Bon de commande'),
+        ('done', 'Verrouillé'),
+    ], string='Statut de la commande', readonly=True)
+    user_id = fields.Many2one('res.users', string='Agent', readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Client', readonly=True)
+    company_id = fields.Many2one('res.company', string='Company', readonly=True)
+    product_tmpl_id = fields.Many2one('product.template', string='Bien', readonly=True)
+    project_id = fields.Many2one('real.estate.project', string='Projet', readonly=True)
+    building_id = fields.Many2one('real.estate.building', string='Bâtiment', readonly=True)
+    property_type = fields.Selection([
+        ('apartment', 'Appartement'),
+        ('store', 'Magasin'),
+        ('equipement', 'Équipement'),
+    ], string='Type de bien', readonly=True)
+    unit_state = fields.Selection([
+        ('disponible', 'Disponible'),
+        ('prereserved', 'Préréservé'),
+        ('sold', 'Vendu'),
+        ('blocker', 'Bloqué'),
+    ], string='Statut du bien', readonly=True)
+    payment_state = fields.Selection([
+        ('not_invoiced', 'Non facturé'),
+        ('not_paid', 'Non payé'),
+        ('partial', 'Partiellement payé'),
+        ('paid', 'Payé'),
+    ], string='Statut du paiement', readonly=True)
+    floor = fields.Integer(string='Étage', readonly=True, group_operator='max')
+    unit_count = fields.Integer(string='Biens', readonly=True)
+    area = fields.Float(string='Surface (m²)', readonly=True)
+    area_sold = fields.Float(string='Surface vendue (m²)', readonly=True)
+    revenue = fields.Float(string='Chiffre d\'affaires', readonly=True)
+    amount_invoiced = fields.Float(string='Montant facturé', readonly=True)
+    amount_paid = fields.Float(string='Montant encaissé', readonly=True)
+
+    @api.model
+    def init(self):
+        """Create the SQL view: one row per order line of a real estate unit"""
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""
+            CREATE OR REPLACE VIEW %s AS (
+                SELECT sol.id AS id,
+                       so.date_order AS date,
+                       so.id AS order_id,
+                       so.state AS order_state,
+                       so.user_id AS user_id,
+                       so.partner_id AS partner_id,
+                       so.company_id AS company_id,
+                       pt.id AS product_tmpl_id,
+                       pt.project_id AS project_id,
+                       pt.building_id AS building_id,
+                       CASE WHEN pt.is_apartment THEN 'apartment'
+                            WHEN pt.is_store THEN 'store'
+                            ELSE 'equipement' END AS property_type,
+                       pt.apartment_state AS unit_state,
+                       CASE WHEN inv.invoiced IS NULL THEN 'not_invoiced'
+                            WHEN inv.all_paid THEN 'paid'
+                            WHEN inv.any_paid THEN 'partial'
+                            ELSE 'not_paid' END AS payment_state,
+                       pt.floor AS floor,
+                       1 AS unit_count,
+                       COALESCE(pt.area, 0) AS area,
+                       CASE WHEN pt.apartment_state = 'sold' THEN COALESCE(pt.area, 0) ELSE 0 END AS area_sold,
+                       sol.price_subtotal AS revenue,
+                       COALESCE(inv.invoiced, 0) AS amount_invoiced,
+                       COALESCE(inv.paid, 0) AS amount_paid
+                  FROM sale_order_line sol
+                  JOIN sale_order so ON so.id = sol.order_id
+                  JOIN product_product pp ON pp.id = sol.product_id
+                  JOIN product_template pt ON pt.id = pp.product_tmpl_id
+                  -- Posted invoice lines of the order line, refunds counted negatively;
+                  -- the paid part of an invoice is spread over its lines pro rata
+                  LEFT JOIN LATERAL (
+                      SELECT sum(aml.price_subtotal * direction.value) AS invoiced,
+                             sum(aml.price_subtotal * direction.value
+                                 * (1 - am.amount_residual / NULLIF(am.amount_total, 0))) AS paid,
+                             bool_and(am.payment_state IN ('paid', 'in_payment')) AS all_paid,
+                             bool_or(am.payment_state IN ('paid', 'in_payment', 'partial')) AS any_paid
+                        FROM sale_order_line_invoice_rel rel
+                        JOIN account_move_line aml ON aml.id = rel.invoice_line_id
+                        JOIN account_move am ON am.id = aml.move_id
+                        CROSS JOIN LATERAL (SELECT CASE WHEN am.move_type = 'out_refund' THEN -1 ELSE 1 END AS value) direction
+                       WHERE rel.order_line_id = sol.id
+                         AND am.state = 'posted'
+                  ) inv ON TRUE
+                 WHERE (pt.is_apartment OR pt.is_store OR pt.is_equipement)
+                   AND so.state != 'cancel'
+                   AND sol.display_type IS NULL
+            )
+        """ % self._table)
@@ -0,0 +1,154 @@
+from odoo import models, fields, api, tools, _
+from collections import Counter
+import logging
+import os
+import re
+import sys
+import time
+
+from .rpc_profile import SqlLogCollector, _profiling_state
+
+_logger = logging.getLogger(__name__)
+
+# Literal values are replaced so that per-record variants of a statement group together
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ARRAY_RE = re.compile(r"ARRAY\[[^\]]*\]", re.IGNORECASE)
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_statement(query):
+    """Strip the literals of a logged statement so that repeated statements compare equal"""
+    query = _STRING_RE.sub('?', query)
+    query = _NUMBER_RE.sub('?', query)
+    query = _ARRAY_RE.sub('ARRAY[?]', query)
+    query = _IN_LIST_RE.sub('(?...)', query)
+    return _SPACES_RE.sub(' ', query).strip()
+
+
+class SqlCallSiteCollector(SqlLogCollector):
+    """Collect the statements of the traced cursor along with the module code that ran them"""
+
+    # Frames of this module are skipped when looking for the call site
+    module_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+    helper_paths = (os.path.abspath(__file__), os.path.join(module_path, 'models', 'rpc_profile.py'))
+
+    def __init__(self):
+        super(SqlCallSiteCollector, self).__init__()
+        self.call_sites = []
+
+    def _collect(self, cr, query, params):
+        super(SqlCallSiteCollector, self)._collect(cr, query, params)
+        self.call_sites.append(self._get_call_site())
+
+    def _get_call_site(self):
+        """Return the innermost frame of this module that led to the query"""
+        frame = sys._getframe(1)
+        while frame:
+            filename = frame.f_code.co_filename
+            if filename.startswith(self.module_path) and filename not in self.helper_paths:
+                return '%s:%s %s' % (filename[len(self.module_path):], frame.f_lineno, frame.f_code.co_name)
+            frame = frame.f_back
+        return 'odoo'
+
+
+class RealEstateSqlTrace(models.Model):
+    _name = 'real.estate.sql.trace'
+    _description = 'Real Estate SQL Trace'
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char(string='Entry Point', required=True, readonly=True)
+    res_ids = fields.Char(string='Record IDs', readonly=True)
+    user_id = fields.Many2one('res.users', string='User', readonly=True)
+    duration_ms = fields.Float(string='Duration (ms)', readonly=True, digits=(16, 1))
+    query_count = fields.Integer(string='SQL Queries', readonly=True)
+    candidate_count = fields.Integer(string='N+1 Candidates', readonly=True)
+    line_ids = fields.One2many('real.estate.sql.trace.line', 'trace_id', string='Statements', readonly=True)
+
+    @api.model
+    def _get_tracing_settings(self):
+        """Return the tracing settings, or None when tracing is off
+
+        Tracing is on in --dev mode or when wm_real_estate.sql_trace is set.
+        """
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        if not tools.config.get('dev_mode') and not get_param('wm_real_estate.sql_trace'):
+            return None
+        return {
+            'threshold': int(get_param('wm_real_estate.sql_trace_threshold', '5')),
+        }
+
+    @api.model
+    def _trace_call(self, settings, method, records, args, kwargs):
+        """Run method while grouping its queries by statement and call site"""
+        collector = SqlCallSiteCollector()
+
+        _profiling_state.active = True
+        start = time.perf_counter()
+        try:
+            collector.start(records.env.cr)
+            return method(records, *args, **kwargs)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000.0
+            collector.stop()
+            _profiling_state.active = False
+            try:
+                self._report_trace(settings, method, records, collector, duration_ms)
+            except Exception as e:
+                _logger.error("Could not report SQL trace of %s.%s: %s",
+                              records._name, method.__name__, str(e))
+
+    @api.model
+    def _report_trace(self, settings, method, records, collector, duration_ms):
+        """Log the N+1 candidates of a traced call and store them"""
+        groups = Counter(
+            (normalize_statement(query), call_site)
+            for query, call_site in zip(collector.queries, collector.call_sites)
+        )
+        name = '%s.%s' % (records._name, method.__name__)
+        threshold = settings['threshold']
+        candidates = [(key, count) for key, count in groups.most_common() if count >= threshold]
+
+        _logger.info("SQL trace of %s: %s queries, %s distinct statements, %s N+1 candidates (%.1f ms)",
+                    name, len(collector.queries), len(groups), len(candidates), duration_ms)
+        for (statement, call_site), count in candidates:
+            _logger.warning("N+1 candidate in %s: %sx at %s: %s", name, count, call_site, statement[:300])
+
+        if not candidates:
+            return
+
+        # Repeated statements only, single ones are noise for this report
+        line_vals = [(0, 0, {
+            'statement': statement,
+            'call_site': call_site,
+            'count': count,
+            'is_candidate': count >= threshold,
+        }) for (statement, call_site), count in groups.most_common() if count > 1]
+
+        vals = {
+            'name': name,
+            'res_ids': ','.join(str(rid) for rid in records.ids),
+            'user_id': records.env.uid,
+            'duration_ms': duration_ms,
+            'query_count': len(collector.queries),
+            'candidate_count': len(candidates),
+            'line_ids': line_vals,
+        }
+
+        # Own cursor: the report must survive a rollback of the traced call
+        with self.pool.cursor() as cr:
+            self.with_env(self.env(cr=cr, su=True)).create(vals)
+
+
+class RealEstateSqlTraceLine(models.Model):
+    _name = 'real.estate.sql.trace.line'
+    _description = 'Real Estate SQL Trace Statement'
+    _order = 'count desc, id'
+
+    trace_id = fields.Many2one('real.estate.sql.trace', string='Trace', required=True,
+                               ondelete='cascade', index=True)
+    statement = fields.Text(string='Normalized Statement', readonly=True)
+    call_site = fields.Char(string='Call Site', readonly=True)
+    count = fields.Integer(string='Executions', readonly=True)
+    is_candidate = fields.Boolean(string='N+1 Candidate', readonly=True)
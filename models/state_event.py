@@ -0,0 +1,152 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class RealEstateStateEvent(models.Model):
+    _name = 'real.estate.state.event'
+    _description = 'Real Estate Unit State Transition'
+    _order = 'event_date desc, id desc'
+    # Append-only journal written in SQL by the state hooks, the event date is the timestamp
+    _log_access = False
+
+    product_id = fields.Many2one('product.template', string='Bien', readonly=True, ondelete='set null')
+    project_id = fields.Many2one('real.estate.project', string='Project', readonly=True, ondelete='set null')
+    building_id = fields.Many2one('real.estate.building', string='Bâtiment', readonly=True, ondelete='set null')
+    from_state = fields.Selection(selection='_get_state_selection', string='Ancien statut', readonly=True)
+    to_state = fields.Selection(selection='_get_state_selection', string='Nouveau statut', readonly=True)
+    order_id = fields.Many2one('sale.order', string='Commande', readonly=True, ondelete='set null')
+    user_id = fields.Many2one('res.users', string='User', readonly=True, ondelete='set null')
+    event_date = fields.Datetime(string='Date', readonly=True)
+
+    @api.model
+    def _get_state_selection(self):
+        return self.env['product.template']._fields['apartment_state'].selection
+
+    def init(self):
+        cr = self.env.cr
+        # "Inventory as of" and "time in state" scan the events of one project or unit by date
+        cr.execute("""CREATE INDEX IF NOT EXISTS real_estate_state_event_project_date_idx
+                      ON real_estate_state_event (project_id, event_date)""")
+        cr.execute("""CREATE INDEX IF NOT EXISTS real_estate_state_event_product_date_idx
+                      ON real_estate_state_event (product_id, event_date)""")
+
+        # First install: start the journal with the current state of every unit
+        cr.execute("SELECT 1 FROM real_estate_state_event LIMIT 1")
+        if not cr.fetchone():
+            cr.execute("""
+                INSERT INTO real_estate_state_event
+                       (product_id, project_id, building_id, from_state, to_state, user_id, event_date)
+                SELECT id, project_id, building_id, NULL, apartment_state, create_uid, create_date
+                  FROM product_template
+                 WHERE is_apartment OR is_store OR is_equipement
+            """)
+            _logger.info("Initialized the state journal with %s units", cr.rowcount)
+
+    @api.model
+    def _record_transitions(self, products, to_state=None):
+        """Journal the state change of products with one statement, before it is written
+
+        The current state read from the table is the from_state; without to_state the
+        current state is journaled as the initial one (from_state NULL) of new units.
+        Units whose state does not change are skipped.
+        """
+        if not products.ids:
+            return
+        initial = to_state is None
+        self.env.cr.execute("""
+            INSERT INTO real_estate_state_event
+                   (product_id, project_id, building_id, from_state, to_state, order_id, user_id, event_date)
+            SELECT pt.id, pt.project_id, pt.building_id,
+                   CASE WHEN %(initial)s THEN NULL ELSE pt.apartment_state END,
+                   CASE WHEN %(initial)s THEN pt.apartment_state ELSE %(to_state)s END,
+                   COALESCE(%(order_id)s, (
+                       SELECT sol.order_id FROM sale_order_line sol
+                         JOIN product_product pp ON pp.id = sol.product_id
+                        WHERE pp.product_tmpl_id = pt.id
+                     ORDER BY sol.id DESC LIMIT 1)),
+                   %(uid)s, clock_timestamp() at time zone 'UTC'
+              FROM product_template pt
+             WHERE pt.id IN %(ids)s
+               AND (pt.is_apartment OR pt.is_store OR pt.is_equipement)
+               AND (%(initial)s OR pt.apartment_state IS DISTINCT FROM %(to_state)s::varchar)
+        """, {
+            'initial': initial,
+            'to_state': to_state or None,
+            # Flows that know the order behind the change can pass it, otherwise the last one is used
+            'order_id': self.env.context.get('real_estate_order_id'),
+            'uid': self.env.uid,
+            'ids': tuple(products.ids),
+        })
+
+    def write(self, vals):
+        raise UserError(_("L'historique des statuts ne peut pas être modifié."))
+
+    def unlink(self):
+        raise UserError(_("L'historique des statuts ne peut pas être supprimé."))
+
+    @api.model
+    def get_inventory_as_of(self, date, project_ids=None):
+        """Count the units per state as of date: {project_id: {state: count}}
+
+        The state of a unit at date is the to_state of its last event up to that date;
+        units created after date are not counted.
+        """
+        where = "event_date <= %s"
+        params = [fields.Datetime.to_datetime(date)]
+        if project_ids:
+            where += " AND project_id IN %s"
+            params.append(tuple(project_ids))
+        self.env.cr.execute("""
+            SELECT project_id, to_state, count(*)
+              FROM (SELECT DISTINCT ON (product_id) product_id, project_id, to_state
+                      FROM real_estate_state_event
+                     WHERE product_id IS NOT NULL AND %s
+                  ORDER BY product_id, event_date DESC, id DESC) last_event
+          GROUP BY project_id, to_state
+        """ % where, params)
+        inventory = {}
+        for project_id, state, count in self.env.cr.fetchall():
+            inventory.setdefault(project_id, {})[state] = count
+        return inventory
+
+    @api.model
+    def get_time_in_state(self, state='prereserved', project_ids=None, date_from=None, date_to=None):
+        """Time the units spent in state: {project_id: {'count', 'total_days', 'average_days'}}
+
+        Each stay runs from the event entering state to the next event of the unit (or now),
+        stays are selected by the date they started.
+        """
+        where = ["product_id IS NOT NULL"]
+        params = []
+        if project_ids:
+            where.append("project_id IN %s")
+            params.append(tuple(project_ids))
+        conditions = ["to_state = %s"]
+        params_outer = [state]
+        if date_from:
+            conditions.append("event_date >= %s")
+            params_outer.append(fields.Datetime.to_datetime(date_from))
+        if date_to:
+            conditions.append("event_date <= %s")
+            params_outer.append(fields.Datetime.to_datetime(date_to))
+        self.env.cr.execute("""
+            SELECT project_id, count(*),
+                   sum(extract(epoch FROM COALESCE(left_at, now() at time zone 'UTC') - event_date)) / 86400.0
+              FROM (SELECT project_id, to_state, event_date,
+                           lead(event_date) OVER (PARTITION BY product_id ORDER BY event_date, id) AS left_at
+                      FROM real_estate_state_event
+                     WHERE %s) stays
+             WHERE %s
+          GROUP BY project_id
+        """ % (' AND '.join(where), ' AND '.join(conditions)), params + params_outer)
+        return {
+            project_id: {
+                'count': count,
+                'total_days': total_days,
+                'average_days': total_days / count if count else 0.0,
+            }
+            for project_id, count, total_days in self.env.cr.fetchall()
+        }
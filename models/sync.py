@@ -0,0 +1,107 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+import datetime
+import logging
+
+from .listing_feed import FEED_OVERLAP
+from .rpc_profile import profiled
+
+_logger = logging.getLogger(__name__)
+
+# Version prefix of the sync tokens, bumped when the payload format changes
+SYNC_TOKEN_VERSION = 'v1'
+
+# Columns sent per model: (payload key, model, domain of the synced records, columns)
+SYNC_MODELS = [
+    ('projects', 'real.estate.project', [], ['id', 'name', 'city']),
+    ('buildings', 'real.estate.building', [], ['id', 'project_id', 'name', 'floors']),
+    ('units', 'product.template',
+     ['|', '|', ('is_apartment', '=', True), ('is_store', '=', True), ('is_equipement', '=', True)],
+     ['id', 'default_code', 'name', 'project_id', 'building_id', 'floor', 'area', 'rooms',
+      'list_price', 'apartment_state', 'is_apartment', 'is_store', 'is_equipement']),
+]
+
+
+class RealEstateSync(models.AbstractModel):
+    _name = 'real.estate.sync'
+    _description = 'Real Estate Offline Sync'
+
+    @api.model
+    def _parse_sync_token(self, token):
+        """Return the datetime a token was issued at, None for a first sync"""
+        if not token:
+            return None
+        version, _sep, timestamp = token.partition(':')
+        try:
+            if version != SYNC_TOKEN_VERSION:
+                raise ValueError(version)
+            return datetime.datetime.strptime(timestamp, '%Y%m%d%H%M%S%f')
+        except ValueError:
+            raise UserError(_("Jeton de synchronisation invalide : %s") % token)
+
+    @api.model
+    def _read_sync_rows(self, model_name, domain, columns, since):
+        """Read columns of the records written after since, record rules applied
+
+        Returns (rows, ids of the archived records): archived records are sent as deleted.
+        """
+        Model = self.env[model_name].with_context(active_test=False)
+        Model.check_access_rights('read')
+        Model.flush(columns + ['active'])
+        if since is not None:
+            domain = [('write_date', '>', since)] + domain
+            if model_name == 'product.template':
+                # Units also change with their apartment record (state, lock)
+                changed_ids = self.env['real.estate.listing.feed']._get_changed_unit_ids(since)
+                domain = [('id', 'in', changed_ids)] + domain[1:]
+        query = Model._where_calc(domain)
+        Model._apply_ir_rules(query, 'read')
+        from_clause, where_clause, params = query.get_sql()
+        self.env.cr.execute('SELECT %s, "%s".active FROM %s WHERE %s ORDER BY "%s".id' % (
+            ', '.join('"%s"."%s"' % (Model._table, column) for column in columns),
+            Model._table, from_clause, where_clause or 'TRUE', Model._table), params)
+
+        rows, archived = [], []
+        for row in self.env.cr.fetchall():
+            if row[-1]:
+                rows.append(list(row[:-1]))
+            else:
+                archived.append(row[0])
+        return rows, archived
+
+    @api.model
+    @profiled
+    def sync(self, since_token=None):
+        """Return the projects, buildings and units changed since since_token
+
+        The payload is columnar, to stay small once gzipped:
+        {'token': next token, 'full': True when since_token was empty,
+         '<key>': {'columns': [...], 'rows': [[...], ...]} for projects, buildings and units,
+         'deleted': {'<key>': [ids]}}
+        Deleted ids include archived and removed records; deleting a project or a building
+        also removes its children on the device. Pass the returned token to the next call.
+        """
+        since = self._parse_sync_token(since_token)
+        self.env.cr.execute("SELECT now() at time zone 'UTC'")
+        issued_at = self.env.cr.fetchone()[0]
+        if since is not None:
+            # Changes of transactions still running at the previous sync are read again
+            since -= FEED_OVERLAP
+
+        Tombstone = self.env['real.estate.tombstone']
+        payload = {
+            'token': '%s:%s' % (SYNC_TOKEN_VERSION, issued_at.strftime('%Y%m%d%H%M%S%f')),
+            'full': since is None,
+            'deleted': {},
+        }
+        for key, model_name, domain, columns in SYNC_MODELS:
+            rows, archived = self._read_sync_rows(model_name, domain, columns, since)
+            deleted = archived
+            if since is not None:
+                deleted = sorted(set(archived) | set(Tombstone._get_deleted_ids(model_name, since)))
+            payload[key] = {'columns': columns, 'rows': rows}
+            payload['deleted'][key] = deleted
+
+        _logger.info("Sync since %s: %s", since_token or 'start', ', '.join(
+            '%s %s' % (len(payload[key]['rows']), key) for key, _model, _domain, _columns in SYNC_MODELS))
+        return payload
@@ -0,0 +1,48 @@
+from odoo import models, fields, api
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class RealEstateTombstone(models.Model):
+    _name = 'real.estate.tombstone'
+    _description = 'Real Estate Deleted Record'
+    _order = 'unlink_date desc, id desc'
+    # One row per deleted record, written in SQL by the unlink hook
+    _log_access = False
+
+    res_model = fields.Char(string='Model', required=True, readonly=True)
+    res_id = fields.Integer(string='Record ID', required=True, readonly=True)
+    unlink_date = fields.Datetime(string='Deleted on', required=True, readonly=True)
+
+    def init(self):
+        # Feeds read the deletions of a model since a date
+        self.env.cr.execute("""CREATE INDEX IF NOT EXISTS real_estate_tombstone_model_date_idx
+                               ON real_estate_tombstone (res_model, unlink_date)""")
+
+    @api.model
+    def _get_deleted_ids(self, res_model, since):
+        """Ids of the records of res_model deleted after since"""
+        self.env.cr.execute("""
+            SELECT DISTINCT res_id FROM real_estate_tombstone
+             WHERE res_model = %s AND unlink_date > %s
+        """, [res_model, since])
+        return [row[0] for row in self.env.cr.fetchall()]
+
+
+class RealEstateTombstoneMixin(models.AbstractModel):
+    _name = 'real.estate.tombstone.mixin'
+    _description = 'Real Estate Deletion Tracking'
+
+    def _get_tombstone_ids(self):
+        """Ids of the records whose deletion must be recorded"""
+        return self.ids
+
+    def unlink(self):
+        ids = self._get_tombstone_ids()
+        if ids:
+            self.env.cr.execute("""
+                INSERT INTO real_estate_tombstone (res_model, res_id, unlink_date)
+                SELECT %s, id, now() at time zone 'UTC' FROM unnest(%s::int[]) AS id
+            """, [self._name, list(ids)])
+        return super(RealEstateTombstoneMixin, self).unlink()
@@ -0,0 +1,31 @@
+import logging
+
+import psycopg2
+
+_logger = logging.getLogger(__name__)
+
+
+def has_pg_trgm(cr):
+    """Install the pg_trgm extension if needed, return whether it is available"""
+    cr.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    if cr.fetchone():
+        return True
+    try:
+        with cr.savepoint():
+            cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        return True
+    except psycopg2.Error as e:
+        # The database user may not be allowed to create extensions
+        _logger.warning("pg_trgm is not available, unit searches will not use trigram indexes: %s", e)
+        return False
+
+
+def create_trigram_indexes(cr, table, columns):
+    """Create a GIN trigram index on each column of table, for ilike searches"""
+    if not has_pg_trgm(cr):
+        return False
+    for column in columns:
+        cr.execute('CREATE INDEX IF NOT EXISTS "%s_%s_trgm_idx" ON "%s" USING gin ("%s" gin_trgm_ops)'
+                   % (table, column, table, column))
+    return True
+
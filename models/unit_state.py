@@ -0,0 +1,64 @@
+from odoo import models, api
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Bus channel the list, kanban and stacking plan views listen to
+UNIT_STATE_CHANNEL = 'wm_real_estate.unit_state'
+
+
+class RealEstateUnitStateMixin(models.AbstractModel):
+    _name = 'real.estate.unit.state.mixin'
+    _description = 'Real Estate Unit State Notifier'
+
+    # Stored selection field holding the sale state of the unit
+    _unit_state_field = 'state'
+    # Journal the transitions in real.estate.state.event (product.template only)
+    _track_unit_state_events = False
+
+    @api.model
+    def _create(self, data_list):
+        records = super(RealEstateUnitStateMixin, self)._create(data_list)
+        if self._track_unit_state_events:
+            self.env['real.estate.state.event']._record_transitions(records)
+        return records
+
+    def write(self, vals):
+        res = super(RealEstateUnitStateMixin, self).write(vals)
+        if self._unit_state_field in vals and self.env.context.get('real_estate_order_id'):
+            # Writes reach _write on flush, in the env of whoever flushes: flush now, while the
+            # order behind the change is still in the context of the state journal
+            self.flush()
+        return res
+
+    def _write(self, vals):
+        # _write sees both explicit writes and recomputed stored fields on flush
+        if self._track_unit_state_events and self._unit_state_field in vals:
+            # Before the update: the journal reads the previous state from the table
+            self.env['real.estate.state.event']._record_transitions(self, vals[self._unit_state_field])
+        res = super(RealEstateUnitStateMixin, self)._write(vals)
+        if self._unit_state_field in vals:
+            self._queue_unit_states(vals[self._unit_state_field])
+        return res
+
+    def _queue_unit_states(self, state):
+        """Buffer a state change; the transaction sends all of them in one bus message"""
+        if not self.ids:
+            return
+        queue = self.env.cr.precommit.data.setdefault('wm_real_estate.unit_states', {})
+        if not queue:
+            self.env.cr.precommit.add(self._send_unit_states)
+        # The last state written in the transaction wins
+        queue.setdefault(self._name, {}).update(dict.fromkeys(self.ids, state))
+
+    @api.model
+    def _send_unit_states(self):
+        queue = self.env.cr.precommit.data.pop('wm_real_estate.unit_states', None)
+        if not queue:
+            return
+        _logger.info("Publishing unit state changes: %s",
+                     ', '.join('%s %s' % (len(states), model) for model, states in queue.items()))
+        self.env['bus.bus'].sudo().sendone(UNIT_STATE_CHANNEL, {
+            'type': 'unit_state',
+            'states': queue,
+        })
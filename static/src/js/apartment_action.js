@@ -44,7 +44,7 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
                 }
 
                 // Show property options dialog
-                this._showPropertyOptions(record.data);
+                this._openPropertyOptions(record.data);
 
                 return;
             }
@@ -53,12 +53,68 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
             this._super.apply(this, arguments);
         },
 
+        /**
+         * Fetch the allowed actions of the property, then show the options dialog
+         *
+         * The actions of all the properties displayed in the list are fetched with the
+         * first click, so the following dialogs open without any server call.
+         */
+        _openPropertyOptions: function (propertyData) {
+            var self = this;
+            var cached = this._propertyActions && this._propertyActions[propertyData.id];
+            // The cache is stale as soon as the displayed state differs
+            if (cached && cached.state === propertyData.apartment_state) {
+                this._showPropertyOptions(propertyData, cached);
+                return;
+            }
+            var resIds = _.union([propertyData.id], this._getDisplayedPropertyIds());
+            this._rpc({
+                model: 'product.template',
+                method: 'get_property_actions',
+                args: [resIds],
+            }).then(function (propertyActions) {
+                self._propertyActions = propertyActions;
+                self._showPropertyOptions(propertyData, propertyActions[propertyData.id]);
+            }).guardedCatch(function (error) {
+                debug("Error fetching property actions: " + JSON.stringify(error));
+                self.displayNotification({
+                    title: _t('Erreur'),
+                    message: _t('Impossible de charger les options du bien. Veuillez réessayer.'),
+                    type: 'danger'
+                });
+            });
+        },
+
+        /**
+         * Return the ids of the real estate products displayed in the list
+         */
+        _getDisplayedPropertyIds: function () {
+            var resIds = [];
+            var visit = function (element) {
+                if (element.type === 'record') {
+                    var data = element.data;
+                    if (data.is_apartment || data.is_store || data.is_equipement) {
+                        resIds.push(element.res_id);
+                    }
+                } else {
+                    _.each(element.data, visit);
+                }
+            };
+            visit(this.model.get(this.handle, {raw: true}));
+            return resIds;
+        },
+
         /**
          * Show property options in a dialog (for apartments, stores, and équipements)
+         *
+         * @param {Object} propertyData record data of the property
+         * @param {Object} propertyActions its entry from get_property_actions
          */
-        _showPropertyOptions: function (propertyData) {
+        _showPropertyOptions: function (propertyData, propertyActions) {
             var self = this;
             var buttons = [];
+            // The server state is the reference, the list may not be refreshed yet
+            propertyData = _.extend({}, propertyData, {apartment_state: propertyActions.state});
             var isApartment = propertyData.is_apartment === true;
             var isStore = propertyData.is_store === true;
             var isEquipement = propertyData.is_equipement === true;
@@ -71,6 +127,7 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
             if (propertyData.apartment_state === 'disponible') {
                 // For disponible properties: Reserve, Bloquer and View Details buttons
                 buttons.push({
+                    action: 'create_reservation',
                     text: _t('Réserver'),
                     classes: 'btn-primary',
                     click: function () {
@@ -105,6 +162,7 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
 
                 // Add Bloquer button for disponible properties
                 buttons.push({
+                    action: 'block',
                     text: 'Bloquer',
                     classes: 'btn-warning',
                     click: function () {
@@ -116,8 +174,8 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
                             dialog.close();
                             if (result) {
                                 debug(propertyType + " blocked successfully");
-                                // Reload the view to reflect the changes
-                                self.reload();
+                                // Patch the row, other sessions get the change from the bus
+                                self.refreshUnits([propertyData.id]);
                                 self.displayNotification({
                                     title: 'Succès',
                                     message: 'La propriété a été bloquée avec succès.',
@@ -145,6 +203,7 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
             } else if (propertyData.apartment_state === 'blocker') {
                 // For blocker properties: Add Débloquer button
                 buttons.push({
+                    action: 'unblock',
                     text: 'Débloquer',
                     classes: 'btn-success',
                     click: function () {
@@ -156,8 +215,8 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
                             dialog.close();
                             if (result) {
                                 debug(propertyType + " unblocked successfully");
-                                // Reload the view to reflect the changes
-                                self.reload();
+                                // Patch the row, other sessions get the change from the bus
+                                self.refreshUnits([propertyData.id]);
                                 self.displayNotification({
                                     title: 'Succès',
                                     message: 'La propriété a été débloquée avec succès.',
@@ -186,6 +245,7 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
             } else if (propertyData.apartment_state === 'prereserved') {
                 // For prereserved properties: Cancel Reservation and Confirm Reservation buttons
                 buttons.push({
+                    action: 'cancel_reservation',
                     text: _t('Annuler la réservation'),
                     classes: 'btn-warning',
                     click: function () {
@@ -197,8 +257,8 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
                             dialog.close();
                             if (result) {
                                 debug("Reservation cancelled successfully");
-                                // Reload the view to reflect the changes
-                                self.reload();
+                                // Patch the row, other sessions get the change from the bus
+                                self.refreshUnits([propertyData.id]);
                             } else {
                                 debug("Error cancelling reservation");
                                 self.displayNotification({
@@ -220,6 +280,7 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
                 });
 
                 buttons.push({
+                    action: 'confirm_reservation',
                     text: _t('Voire la réservation'),
                     classes: 'btn-success',
                     click: function () {
@@ -227,6 +288,7 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
                             model: 'product.template',
                             method: 'action_confirm_reservation',
                             args: [[propertyData.id]],
+                            kwargs: {order_id: propertyActions.quotation_id},
                         }).then(function (action) {
                             dialog.close();
                             if (action && action.type) {
@@ -254,6 +316,7 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
             } else if (propertyData.apartment_state === 'sold') {
                 // For sold properties: Fiche Reservation button and Cancel Sale button
                 buttons.push({
+                    action: 'view_reservation_document',
                     text: _t('Fiche de Réservation'),
                     classes: 'btn-info',
                     click: function () {
@@ -261,6 +324,7 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
                             model: 'product.template',
                             method: 'action_view_reservation_document',
                             args: [[propertyData.id]],
+                            kwargs: {order_id: propertyActions.order_id, invoice_id: propertyActions.invoice_id},
                         }).then(function (action) {
                             dialog.close();
                             if (action && action.type) {
@@ -288,6 +352,7 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
 
                 // Add Cancel Sale button for sold properties
                 buttons.push({
+                    action: 'cancel_sale',
                     text: _t('Annuler la vente'),
                     classes: 'btn-danger',
                     click: function () {
@@ -325,8 +390,8 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
                                         }).then(function (result) {
                                             if (result) {
                                                 debug("Sold property cancelled successfully");
-                                                // Reload the view to reflect the changes
-                                                self.reload();
+                                                // Patch the row, other sessions get the change from the bus
+                                                self.refreshUnits([propertyData.id]);
                                                 // The success notification is handled by the backend method
                                             } else {
                                                 debug("Error cancelling sold property");
@@ -356,6 +421,7 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
             // Add view details button for disponible and blocker properties
             if (propertyData.apartment_state === 'disponible' || propertyData.apartment_state === 'blocker') {
                 buttons.push({
+                    action: 'view',
                     text: isApartment ? _t('Voir l\'appartement') : (isStore ? _t('Voir le magasin') : _t('Voir l\'équipement')),
                     classes: 'btn-secondary',
                     click: function () {
@@ -383,6 +449,11 @@ odoo.define('wm_real_estate.apartment_action', function (require) {
                 });
             }
 
+            // Only keep the buttons the server allows for this property
+            buttons = _.filter(buttons, function (button) {
+                return _.contains(propertyActions.actions, button.action);
+            });
+
             // Create and display the dialog
             var dialog = new Dialog(this, {
                 title: isApartment ? _t('Options Appartement : ') + propertyData.name : 
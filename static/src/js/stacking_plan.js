@@ -0,0 +1,142 @@
+odoo.define('wm_real_estate.stacking_plan', function (require) {
+    "use strict";
+
+    var AbstractAction = require('web.AbstractAction');
+    var core = require('web.core');
+    var unitStateLive = require('wm_real_estate.unit_state_live');
+    var QWeb = core.qweb;
+    var _t = core._t;
+
+    /**
+     * Stacking plan of one or several buildings: one row per floor, one cell per unit.
+     * The whole plan comes from a single call to real.estate.building.get_stacking_plan.
+     */
+    var StackingPlan = AbstractAction.extend({
+        contentTemplate: 'wm_real_estate.StackingPlan',
+        events: {
+            'click .o_stacking_plan_unit': '_onUnitClick',
+        },
+
+        init: function (parent, action) {
+            this._super.apply(this, arguments);
+            var params = action.params || {};
+            this.buildingIds = params.building_ids || (action.context && action.context.active_ids) || [];
+            this.plan = {columns: [], states: {}, buildings: []};
+        },
+
+        willStart: function () {
+            var self = this;
+            var def = this._rpc({
+                model: 'real.estate.building',
+                method: 'get_stacking_plan',
+                args: [this.buildingIds],
+            }).then(function (plan) {
+                self.plan = plan;
+            });
+            return Promise.all([this._super.apply(this, arguments), def]);
+        },
+
+        start: function () {
+            var self = this;
+            this.call('bus_service', 'addChannel', unitStateLive.UNIT_STATE_CHANNEL);
+            this.call('bus_service', 'onNotification', this, this._onUnitStateNotification);
+            this.call('bus_service', 'startPolling');
+            return this._super.apply(this, arguments).then(function () {
+                self._renderPlan();
+            });
+        },
+
+        destroy: function () {
+            this.call('bus_service', 'off', 'notification', this, this._onUnitStateNotification);
+            this._super.apply(this, arguments);
+        },
+
+        //--------------------------------------------------------------------------
+        // Private
+        //--------------------------------------------------------------------------
+
+        /**
+         * Turn the compact unit rows into objects keyed by column name
+         */
+        _unitFromRow: function (row) {
+            var unit = {};
+            _.each(this.plan.columns, function (column, index) {
+                unit[column] = row[index];
+            });
+            return unit;
+        },
+
+        _renderPlan: function () {
+            var self = this;
+            var buildings = _.map(this.plan.buildings, function (building) {
+                return {
+                    id: building.id,
+                    name: building.name,
+                    project: building.project,
+                    width: building.width,
+                    floors: _.map(building.floors, function (floor) {
+                        return {
+                            number: floor[0],
+                            units: _.map(floor[1], self._unitFromRow.bind(self)),
+                        };
+                    }),
+                };
+            });
+            this.$('.o_stacking_plan_content').html(QWeb.render('wm_real_estate.StackingPlanBuildings', {
+                buildings: buildings,
+                states: this.plan.states,
+                _t: _t,
+            }));
+        },
+
+        //--------------------------------------------------------------------------
+        // Handlers
+        //--------------------------------------------------------------------------
+
+        /**
+         * Recolour the cells of the units whose state changed, without any server call
+         */
+        _onUnitStateNotification: function (notifications) {
+            var self = this;
+            var idIndex = this.plan.columns.indexOf('id');
+            var stateIndex = this.plan.columns.indexOf('state');
+            _.each(notifications, function (notification) {
+                var message = notification[1];
+                if (notification[0] !== unitStateLive.UNIT_STATE_CHANNEL || !message || message.type !== 'unit_state') {
+                    return;
+                }
+                var states = message.states['product.template'] || {};
+                _.each(self.plan.buildings, function (building) {
+                    _.each(building.floors, function (floor) {
+                        _.each(floor[1], function (row) {
+                            var state = states[row[idIndex]];
+                            if (!state || state === row[stateIndex]) {
+                                return;
+                            }
+                            self.$('.o_stacking_plan_unit[data-id=' + row[idIndex] + ']')
+                                .removeClass('o_stacking_plan_unit_' + row[stateIndex])
+                                .addClass('o_stacking_plan_unit_' + state)
+                                .attr('title', self.plan.states[state]);
+                            row[stateIndex] = state;
+                        });
+                    });
+                });
+            });
+        },
+
+        _onUnitClick: function (ev) {
+            var unitId = $(ev.currentTarget).data('id');
+            this.do_action({
+                type: 'ir.actions.act_window',
+                res_model: 'product.template',
+                res_id: unitId,
+                views: [[false, 'form']],
+                target: 'current',
+            });
+        },
+    });
+
+    core.action_registry.add('wm_real_estate_stacking_plan', StackingPlan);
+
+    return StackingPlan;
+});
@@ -0,0 +1,122 @@
+odoo.define('wm_real_estate.unit_state_live', function (require) {
+    "use strict";
+
+    var KanbanController = require('web.KanbanController');
+    var ListController = require('web.ListController');
+
+    // Must match UNIT_STATE_CHANNEL in models/unit_state.py
+    var UNIT_STATE_CHANNEL = 'wm_real_estate.unit_state';
+    var STATE_FIELDS = {
+        'product.template': 'apartment_state',
+        'real.estate.apartment': 'state',
+    };
+    // Above this many changed rows a single reload is cheaper than one read per row
+    var MAX_PATCHED_RECORDS = 40;
+
+    /**
+     * Keep unit lists and kanbans up to date from the state changes published on the bus:
+     * only the visible records that changed are read again.
+     */
+    var UnitStateLiveMixin = {
+        /**
+         * Patch the given records of the view, if they are displayed
+         *
+         * @param {integer[]} resIds
+         * @returns {Promise}
+         */
+        refreshUnits: function (resIds) {
+            var self = this;
+            var handles = this._findRecordHandles(resIds);
+            if (!handles.length) {
+                return Promise.resolve();
+            }
+            // A state change moves the record to another group: only a reload can do that
+            var stateField = STATE_FIELDS[this.modelName];
+            var groupedBy = this.model.get(this.handle, {raw: true}).groupedBy || [];
+            var groupedByState = _.some(groupedBy, function (groupBy) {
+                return groupBy.split(':')[0] === stateField;
+            });
+            if (groupedByState || handles.length > MAX_PATCHED_RECORDS) {
+                return this.reload();
+            }
+            return Promise.all(_.map(handles, function (handle) {
+                return self.model.reload(handle);
+            })).then(function () {
+                return self.update({}, {reload: false});
+            });
+        },
+
+        _isUnitView: function () {
+            return _.has(STATE_FIELDS, this.modelName);
+        },
+
+        _startUnitStateListener: function () {
+            if (!this._isUnitView()) {
+                return;
+            }
+            this.call('bus_service', 'addChannel', UNIT_STATE_CHANNEL);
+            this.call('bus_service', 'onNotification', this, this._onUnitStateNotification);
+            this.call('bus_service', 'startPolling');
+        },
+
+        _stopUnitStateListener: function () {
+            if (this._isUnitView()) {
+                this.call('bus_service', 'off', 'notification', this, this._onUnitStateNotification);
+            }
+        },
+
+        /**
+         * Return the datapoint ids of the displayed records among resIds
+         */
+        _findRecordHandles: function (resIds) {
+            var handles = [];
+            var visit = function (element) {
+                if (element.type === 'record') {
+                    if (_.contains(resIds, element.res_id)) {
+                        handles.push(element.id);
+                    }
+                } else {
+                    _.each(element.data, visit);
+                }
+            };
+            visit(this.model.get(this.handle, {raw: true}));
+            return handles;
+        },
+
+        _onUnitStateNotification: function (notifications) {
+            var self = this;
+            var resIds = [];
+            _.each(notifications, function (notification) {
+                var channel = notification[0];
+                var message = notification[1];
+                if (channel !== UNIT_STATE_CHANNEL || !message || message.type !== 'unit_state') {
+                    return;
+                }
+                var states = message.states[self.modelName] || {};
+                resIds = resIds.concat(_.map(_.keys(states), Number));
+            });
+            if (resIds.length) {
+                this.refreshUnits(_.uniq(resIds));
+            }
+        },
+    };
+
+    var liveControllerOverrides = _.extend({}, UnitStateLiveMixin, {
+        start: function () {
+            this._startUnitStateListener();
+            return this._super.apply(this, arguments);
+        },
+        destroy: function () {
+            this._stopUnitStateListener();
+            this._super.apply(this, arguments);
+        },
+    });
+
+    ListController.include(liveControllerOverrides);
+    KanbanController.include(liveControllerOverrides);
+
+    return {
+        UNIT_STATE_CHANNEL: UNIT_STATE_CHANNEL,
+        UnitStateLiveMixin: UnitStateLiveMixin,
+    };
+});
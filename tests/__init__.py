@@ -0,0 +1,7 @@
+from . import test_benchmark
+from . import test_query_counts
+from . import test_listing_feed
+from . import test_bulk_actions
+from . import test_payment_plan
+from . import test_dunning
+from . import test_bank_import
@@ -0,0 +1,167 @@
+from odoo import fields, release
+import json
+import logging
+import time
+
+from .common import RealEstateDataGenerator
+
+_logger = logging.getLogger(__name__)
+
+
+class RealEstateBenchmark(object):
+    """Time and count queries for the real estate hot paths on a generated portfolio"""
+
+    # Scenarios run in this order, later ones reuse the orders of earlier ones
+    SCENARIOS = [
+        'building_creation',
+        'project_dashboard',
+        'building_dashboard',
+        'reservation_creation',
+        'quotation_confirmation',
+        'deposit_invoicing',
+        'invoice_posting',
+        'handover_validation',
+        'cancellation',
+        'update_all_quantities',
+    ]
+
+    def __init__(self, env, projects=2, buildings=3, units=20, seed=42):
+        self.env = env
+        self.projects = projects
+        self.buildings = buildings
+        self.units = units
+        self.seed = seed
+        self.generator = RealEstateDataGenerator(env, seed=seed)
+        self.data = {}
+        self.results = []
+
+    def run(self, scenarios=None):
+        """Generate the portfolio, run the scenarios and return the report"""
+        start = time.perf_counter()
+        self.data = self.generator.generate(self.projects, self.buildings, self.units)
+        self.data['customer'] = self.generator.create_customer()
+        setup_ms = (time.perf_counter() - start) * 1000.0
+
+        for name in scenarios or self.SCENARIOS:
+            try:
+                with self.env.cr.savepoint():
+                    getattr(self, '_bench_%s' % name)()
+            except Exception as e:
+                _logger.exception("Benchmark scenario %s failed", name)
+                self.results.append({'name': name, 'error': str(e)})
+
+        return {
+            'module': 'wm_real_estate',
+            'odoo_version': release.version,
+            'database': self.env.cr.dbname,
+            'timestamp': fields.Datetime.to_string(fields.Datetime.now()),
+            'dataset': {
+                'projects': self.projects,
+                'buildings_per_project': self.buildings,
+                'units_per_building': self.units,
+                'units': len(self.data['units']),
+                'seed': self.seed,
+                'setup_ms': round(setup_ms, 2),
+            },
+            'results': self.results,
+        }
+
+    def write_json(self, report, path):
+        """Dump a report produced by run()"""
+        with open(path, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+        _logger.info("Benchmark results written to %s", path)
+
+    def _measure(self, name, func):
+        """Run func with cold caches and record its duration and query count"""
+        env = self.env
+        env['base'].flush()
+        env['base'].invalidate_cache()
+
+        queries_before = env.cr.sql_log_count
+        start = time.perf_counter()
+        result = func()
+        env['base'].flush()
+        duration = time.perf_counter() - start
+
+        self.results.append({
+            'name': name,
+            'duration_ms': round(duration * 1000.0, 2),
+            'queries': env.cr.sql_log_count - queries_before,
+        })
+        _logger.info("Benchmark %s: %.2f ms, %s queries",
+                    name, duration * 1000.0, self.results[-1]['queries'])
+        return result
+
+    def _take_unit(self):
+        """Return an available apartment not used by a previous scenario"""
+        used = self.data.setdefault('used_units', self.env['product.template'].browse())
+        unit = self.data['units'].filtered(
+            lambda p: p.is_apartment and p.apartment_state == 'disponible' and p not in used)[:1]
+        if not unit:
+            raise ValueError("No available apartment left in the generated portfolio")
+        self.data['used_units'] = used | unit
+
+        # Two units on hand: one for the sale_stock delivery, one for the handover picking
+        warehouse = self.env['stock.warehouse'].search([('company_id', '=', self.env.company.id)], limit=1)
+        if warehouse:
+            self.env['stock.quant']._update_available_quantity(
+                unit.product_variant_id, warehouse.lot_stock_id, 2.0)
+        return unit
+
+    def _bench_building_creation(self):
+        project = self.data['projects'][:1]
+        self._measure('building_creation', lambda: self.generator.create_building(
+            project, self.buildings, self.units))
+
+    def _bench_project_dashboard(self):
+        projects = self.data['projects']
+        field_names = ['name', 'city'] + [name for name in projects._fields if name.endswith('_count')]
+        self._measure('project_dashboard', lambda: projects.read(field_names))
+
+    def _bench_building_dashboard(self):
+        buildings = self.data['buildings']
+        field_names = ['name', 'project_id', 'floors'] + [name for name in buildings._fields if name.endswith('_count')]
+        self._measure('building_dashboard', lambda: buildings.read(field_names))
+
+    def _bench_reservation_creation(self):
+        unit = self._take_unit()
+        action = self._measure('reservation_creation', unit.action_create_reservation)
+        self.data['order'] = self.env['sale.order'].browse(action['res_id'])
+
+    def _bench_quotation_confirmation(self):
+        order = self.data['order']
+        order.partner_id = self.data['customer']
+        self._measure('quotation_confirmation', order.action_confirm)
+
+    def _bench_deposit_invoicing(self):
+        order = self.data['order']
+
+        # action_create_deposit_invoice gates on the legacy 'reservation' state,
+        # drive the same steps directly
+        def create_deposit():
+            invoice = self.env['account.move'].create(order._prepare_deposit_invoice_vals())
+            order.write({'deposit_invoice_id': invoice.id, 'is_deposit_invoiced': True})
+            return invoice
+
+        self.data['invoice'] = self._measure('deposit_invoicing', create_deposit)
+
+    def _bench_invoice_posting(self):
+        invoice = self.data['invoice']
+        self._measure('invoice_posting', invoice.action_post)
+
+    def _bench_handover_validation(self):
+        picking = self.data['order'].delivery_picking_id
+        if not picking:
+            raise ValueError("The confirmed order has no handover picking")
+        picking = picking.with_context(skip_immediate=True, skip_backorder=True)
+        self._measure('handover_validation', picking.button_validate)
+
+    def _bench_cancellation(self):
+        unit = self._take_unit()
+        unit.action_create_reservation()
+        self._measure('cancellation', unit.action_cancel_reservation)
+
+    def _bench_update_all_quantities(self):
+        Product = self.env['product.template']
+        self._measure('update_all_quantities', Product.action_update_all_quantities)
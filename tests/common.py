@@ -0,0 +1,154 @@
+from odoo import fields
+import logging
+import random
+
+_logger = logging.getLogger(__name__)
+
+# Share of units per state in a generated portfolio
+STATE_MIX = [
+    ('disponible', 0.55),
+    ('prereserved', 0.15),
+    ('sold', 0.25),
+    ('blocker', 0.05),
+]
+
+
+class RealEstateDataGenerator(object):
+    """Build a synthetic real estate portfolio through the module's own models"""
+
+    def __init__(self, env, seed=42, store_ratio=0.1):
+        self.env = env
+        self.seed = seed
+        self.store_ratio = store_ratio
+        self.random = random.Random(seed)
+        self._sequence = 0
+
+    def generate(self, projects=1, buildings=1, units=10):
+        """Create projects x buildings x units and apply the state mix"""
+        Project = self.env['real.estate.project']
+        all_projects = Project.browse()
+        all_buildings = self.env['real.estate.building'].browse()
+        all_units = self.env['product.template'].browse()
+
+        for project_index in range(projects):
+            project = self.create_project(project_index)
+            all_projects |= project
+            for building_index in range(buildings):
+                building, building_units = self.create_building(project, building_index, units)
+                all_buildings |= building
+                all_units |= building_units
+
+        self.apply_state_mix(all_units)
+
+        _logger.info("Generated %s projects, %s buildings and %s units (seed %s)",
+                    len(all_projects), len(all_buildings), len(all_units), self.seed)
+
+        return {
+            'projects': all_projects,
+            'buildings': all_buildings,
+            'units': all_units,
+        }
+
+    def create_project(self, index):
+        """Create one project"""
+        return self.env['real.estate.project'].create({
+            'name': 'Bench Project %03d' % index,
+            'city': self.random.choice(['Casablanca', 'Rabat', 'Marrakech', 'Tanger']),
+        })
+
+    def create_building(self, project, index, units):
+        """Create one building with its units, stores on the ground floor"""
+        building = self.env['real.estate.building'].create({
+            'name': '%s - Bâtiment %02d' % (project.name, index),
+            'project_id': project.id,
+            'floors': max(1, units // 4),
+        })
+
+        store_count = int(units * self.store_ratio)
+        apartment_count = units - store_count
+        products = self.env['product.template'].browse()
+
+        # Apartments go through real.estate.apartment, which creates the product
+        apartment_vals = []
+        for position in range(apartment_count):
+            self._sequence += 1
+            floor = 1 + position // 4
+            apartment_vals.append({
+                'name': 'Apartment %s-%04d' % (building.id, self._sequence),
+                'code': 'BENCH-%06d' % self._sequence,
+                'building_id': building.id,
+                'floor': floor,
+                'price': self.random.randrange(600, 3000) * 1000.0,
+                'area': float(self.random.randrange(45, 180)),
+                'rooms': self.random.randint(1, 5),
+                'bathrooms': self.random.randint(1, 3),
+            })
+        if apartment_vals:
+            products |= self.env['real.estate.apartment'].create(apartment_vals).mapped('product_tmpl_ids')
+
+        # Stores are plain real estate products
+        store_vals = []
+        for position in range(store_count):
+            self._sequence += 1
+            store_vals.append({
+                'name': 'Store %s-%04d' % (building.id, self._sequence),
+                'default_code': 'BENCH-%06d' % self._sequence,
+                'type': 'product',
+                'is_store': True,
+                'building_id': building.id,
+                'project_id': project.id,
+                'floor': 0,
+                'area': float(self.random.randrange(30, 250)),
+                'list_price': self.random.randrange(5, 30) * 1000.0,
+            })
+        if store_vals:
+            products |= self.env['product.template'].create(store_vals)
+
+        return building, products
+
+    def apply_state_mix(self, units):
+        """Distribute units over STATE_MIX with one grouped write per state"""
+        by_state = {state: units.browse() for state, _share in STATE_MIX}
+        states = [state for state, _share in STATE_MIX]
+        weights = [share for _state, share in STATE_MIX]
+        for unit in units:
+            by_state[self.random.choices(states, weights)[0]] |= unit
+
+        for state, records in by_state.items():
+            if not records or state == 'disponible':
+                continue
+            if state == 'blocker':
+                # Blocking is product-level only
+                records.with_context(from_apartment_update=True).write({'sale_ok': False})
+                continue
+            apartments = records.mapped('apartment_id')
+            if apartments:
+                apartments.with_context(from_product_update=True).write({'state': state})
+            stores = records.filtered(lambda p: not p.apartment_id)
+            if stores:
+                stores.with_context(from_apartment_update=True).write({'apartment_state': state})
+
+        return by_state
+
+    def create_reservation(self, products, customer):
+        """Create a quotation reserving products (prereserved by their order lines)"""
+        order = self.env['sale.order'].create({
+            'partner_id': customer.id,
+            'is_real_estate': True,
+            'project_id': products[:1].project_id.id,
+        })
+        self.env['sale.order.line'].create([{
+            'order_id': order.id,
+            'product_id': product.product_variant_id.id,
+            'product_uom': product.uom_id.id,
+            'product_uom_qty': 1,
+            'price_unit': product.list_price,
+        } for product in products])
+        return order
+
+    def create_customer(self):
+        """Create the customer used by generated orders"""
+        return self.env['res.partner'].create({
+            'name': 'Bench Customer %s' % fields.Datetime.now(),
+            'function': 'BENCH%06d' % self.seed,
+        })
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Standalone runner for the real estate benchmark suite.
+
+Runs every scenario of RealEstateBenchmark against an existing database
+where wm_real_estate is installed, writes the JSON report and rolls the
+transaction back, so the database is left untouched:
+
+    python3 run_benchmark.py -c /etc/odoo/odoo.conf -d bench_db \\
+        --projects 5 --buildings 4 --units 50 --output bench.json
+"""
+import argparse
+import logging
+
+import odoo
+from odoo import api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the wm_real_estate hot paths")
+    parser.add_argument('-c', '--config', help="Odoo configuration file")
+    parser.add_argument('-d', '--database', required=True, help="Database with wm_real_estate installed")
+    parser.add_argument('--projects', type=int, default=2)
+    parser.add_argument('--buildings', type=int, default=3, help="Buildings per project")
+    parser.add_argument('--units', type=int, default=20, help="Units per building")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scenario', action='append', dest='scenarios',
+                        help="Run only this scenario, may be repeated")
+    parser.add_argument('--output', default='wm_real_estate_benchmark.json')
+    args = parser.parse_args()
+
+    odoo_args = ['-d', args.database]
+    if args.config:
+        odoo_args = ['-c', args.config] + odoo_args
+    odoo.tools.config.parse_config(odoo_args)
+
+    registry = odoo.registry(args.database)
+
+    # Loading the registry sets up the addons path
+    from odoo.addons.wm_real_estate.tests.benchmark import RealEstateBenchmark
+
+    cr = registry.cursor()
+    try:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        benchmark = RealEstateBenchmark(env, projects=args.projects, buildings=args.buildings,
+                                        units=args.units, seed=args.seed)
+        report = benchmark.run(args.scenarios)
+        benchmark.write_json(report, args.output)
+    finally:
+        cr.rollback()
+        cr.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tests.common import SavepointCase
+import base64
+
+from .common import RealEstateDataGenerator
+
+
+@tagged('post_install', '-at_install')
+class TestBankImport(SavepointCase):
+    """Statement rows are matched with the open real estate invoices by reference and amount"""
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestBankImport, cls).setUpClass()
+        if not cls.env.company.chart_template_id:
+            cls.skipTest(cls, "No chart of accounts found")
+        generator = RealEstateDataGenerator(cls.env)
+        data = generator.generate(projects=1, buildings=1, units=10)
+        plan = cls.env['real.estate.payment.plan'].create({
+            'name': 'Comptant',
+            'project_id': data['projects'].id,
+            'line_ids': [(0, 0, {'name': 'Comptant', 'percentage': 100.0, 'trigger': 'reservation'})],
+        })
+        products = data['units'].filtered(
+            lambda p: p.is_apartment and p.apartment_id and p.apartment_state == 'disponible')
+        cls.order = generator.create_reservation(products[:1], generator.create_customer())
+        cls.order.payment_plan_id = plan
+        cls.order.action_confirm()
+        cls.invoice = cls.env['real.estate.payment.installment']._generate_due_invoices(
+            post=True, order_ids=cls.order.ids)
+        cls.journal = cls.env['account.journal'].search([
+            ('type', '=', 'bank'), ('company_id', '=', cls.env.company.id)], limit=1)
+
+    def _import(self, rows):
+        content = '\n'.join(['Date;Libellé;Montant'] + [';'.join(row) for row in rows])
+        statement = self.env['real.estate.bank.import'].create({
+            'name': 'releve.csv',
+            'journal_id': self.journal.id,
+            'data_file': base64.b64encode(content.encode('utf-8')),
+        })
+        statement.action_import()
+        return statement
+
+    def test_matched_and_to_review_rows(self):
+        date = fields.Date.context_today(self.invoice).strftime('%d/%m/%Y')
+        amount = ('%.2f' % self.invoice.amount_residual).replace('.', ',')
+        statement = self._import([
+            (date, 'VIR M. CLIENT %s' % self.order.name, amount),
+            (date, 'VIR SANS REFERENCE', amount),
+        ])
+
+        self.assertEqual(statement.state, 'done')
+        self.assertEqual((statement.matched_count, statement.review_count), (1, 1))
+        matched, to_review = statement.line_ids
+        self.assertEqual(matched.state, 'matched')
+        self.assertEqual(matched.move_id, self.invoice)
+        self.assertTrue(matched.payment_id)
+        self.assertIn(self.invoice.payment_state, ('in_payment', 'paid'))
+        self.assertEqual(to_review.state, 'to_review')
+        self.assertFalse(to_review.move_id or to_review.payment_id)
+        self.assertTrue(to_review.note)
@@ -0,0 +1,35 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+import os
+import tempfile
+
+from .benchmark import RealEstateBenchmark
+
+
+@tagged('perf', '-standard', 'post_install', '-at_install')
+class TestRealEstateBenchmark(TransactionCase):
+    """Benchmark the real estate hot paths, run with --test-tags perf
+
+    The portfolio size is read from WM_REAL_ESTATE_BENCHMARK_SIZE as
+    "projects x buildings x units" and the JSON report is written to
+    WM_REAL_ESTATE_BENCHMARK_OUTPUT.
+    """
+
+    def _get_size(self):
+        size = os.environ.get('WM_REAL_ESTATE_BENCHMARK_SIZE', '2x3x20')
+        projects, buildings, units = (int(part) for part in size.lower().split('x'))
+        return projects, buildings, units
+
+    def test_benchmark(self):
+        projects, buildings, units = self._get_size()
+        benchmark = RealEstateBenchmark(self.env, projects=projects, buildings=buildings, units=units)
+        report = benchmark.run()
+
+        output = os.environ.get('WM_REAL_ESTATE_BENCHMARK_OUTPUT') or os.path.join(
+            tempfile.gettempdir(), 'wm_real_estate_benchmark.json')
+        benchmark.write_json(report, output)
+
+        for result in report['results']:
+            with self.subTest(scenario=result['name']):
+                self.assertNotIn('error', result, result.get('error'))
+                self.assertGreater(result['queries'], 0)
@@ -0,0 +1,68 @@
+from odoo.tests import tagged
+from odoo.tests.common import SavepointCase
+
+from .common import RealEstateDataGenerator
+
+
+@tagged('post_install', '-at_install')
+class TestBulkActions(SavepointCase):
+    """Bulk actions run on units of many quotations at once"""
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestBulkActions, cls).setUpClass()
+        generator = RealEstateDataGenerator(cls.env)
+        cls.data = generator.generate(projects=1, buildings=1, units=10)
+        cls.customer = generator.create_customer()
+
+    def _available_apartments(self, count):
+        products = self.data['units'].filtered(
+            lambda p: p.is_apartment and p.apartment_id and p.apartment_state == 'disponible')
+        self.assertGreaterEqual(len(products), count, "The generated portfolio has too few available apartments")
+        return products[:count]
+
+    def _reserve(self, product):
+        order = self.env['sale.order'].create({
+            'partner_id': self.customer.id,
+            'is_real_estate': True,
+            'project_id': product.project_id.id,
+        })
+        self.env['sale.order.line'].create({
+            'order_id': order.id,
+            'product_id': product.product_variant_id.id,
+            'product_uom': product.uom_id.id,
+            'product_uom_qty': 1,
+            'price_unit': product.list_price,
+        })
+        return order
+
+    def _reserve_two_quotations(self):
+        products = self._available_apartments(2)
+        orders = self._reserve(products[0]) | self._reserve(products[1])
+        self.assertEqual(products.mapped('apartment_state'), ['prereserved', 'prereserved'])
+        self.assertEqual(products.mapped('apartment_id.locked_by_order_id'), orders)
+        return products, orders
+
+    def test_release_reservations_of_two_quotations(self):
+        products, orders = self._reserve_two_quotations()
+
+        products.action_bulk_release_reservation()
+
+        self.assertEqual(orders.mapped('state'), ['cancel', 'cancel'])
+        self.assertEqual(products.mapped('apartment_state'), ['disponible', 'disponible'])
+        self.assertFalse(any(products.mapped('apartment_id.is_locked')))
+        self.assertFalse(products.mapped('apartment_id.locked_by_order_id'))
+
+        # Each release is journaled with the quotation it cancelled
+        events = self.env['real.estate.state.event'].search([
+            ('product_id', 'in', products.ids), ('from_state', '=', 'prereserved'), ('to_state', '=', 'disponible')])
+        self.assertEqual({event.product_id.id: event.order_id for event in events},
+                         {products[0].id: orders[0], products[1].id: orders[1]})
+
+    def test_mark_available_units_of_two_quotations(self):
+        products, orders = self._reserve_two_quotations()
+
+        products.action_bulk_mark_available()
+
+        self.assertEqual(orders.mapped('state'), ['cancel', 'cancel'])
+        self.assertEqual(products.mapped('apartment_state'), ['disponible', 'disponible'])
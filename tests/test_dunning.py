@@ -0,0 +1,57 @@
+from odoo.tests import tagged
+from odoo.tests.common import SavepointCase
+from datetime import timedelta
+
+from .common import RealEstateDataGenerator
+
+
+@tagged('post_install', '-at_install')
+class TestDunning(SavepointCase):
+    """The dunning queue lists the posted real estate invoices past their due date, by age"""
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestDunning, cls).setUpClass()
+        if not cls.env.company.chart_template_id:
+            cls.skipTest(cls, "No chart of accounts found")
+        generator = RealEstateDataGenerator(cls.env)
+        cls.data = generator.generate(projects=1, buildings=1, units=10)
+        cls.project = cls.data['projects']
+        cls.plan = cls.env['real.estate.payment.plan'].create({
+            'name': 'Comptant',
+            'project_id': cls.project.id,
+            'line_ids': [(0, 0, {'name': 'Comptant', 'percentage': 100.0, 'trigger': 'reservation'})],
+        })
+        products = cls.data['units'].filtered(
+            lambda p: p.is_apartment and p.apartment_id and p.apartment_state == 'disponible')
+        cls.order = generator.create_reservation(products[:1], generator.create_customer())
+        cls.order.payment_plan_id = cls.plan
+        cls.order.action_confirm()
+        cls.invoice = cls.env['real.estate.payment.installment']._generate_due_invoices(
+            post=True, order_ids=cls.order.ids)
+        cls.due_date = cls.invoice.invoice_date_due
+
+    def test_invoice_not_overdue_yet(self):
+        self.env['real.estate.dunning']._compute_dunning_queue(date=self.due_date)
+        self.assertFalse(self.env['real.estate.dunning'].search([('move_id', '=', self.invoice.id)]))
+
+    def test_overdue_invoice_bucket_and_amount(self):
+        date = self.due_date + timedelta(days=45)
+        self.env['real.estate.dunning']._compute_dunning_queue(date=date)
+
+        dunning = self.env['real.estate.dunning'].search([('move_id', '=', self.invoice.id)])
+        self.assertEqual(len(dunning), 1)
+        self.assertEqual(dunning.order_id, self.order)
+        self.assertEqual(dunning.project_id, self.project)
+        self.assertEqual(dunning.kind, 'installment')
+        self.assertEqual(dunning.days_overdue, 45)
+        self.assertEqual(dunning.bucket, '31_60')
+        self.assertAlmostEqual(dunning.amount_residual, self.invoice.amount_residual, delta=0.01)
+
+        summary = self.env['real.estate.dunning.summary'].search([
+            ('project_id', '=', self.project.id), ('summary_date', '=', date)])
+        self.assertTrue(summary.is_latest)
+        self.assertEqual(summary.invoice_count, 1)
+        self.assertAlmostEqual(summary.amount_31_60, self.invoice.amount_residual, delta=0.01)
+        self.assertFalse(summary.amount_1_30 or summary.amount_61_90 or summary.amount_90_plus)
+        self.assertEqual(summary.oldest_due_date, self.due_date)
@@ -0,0 +1,52 @@
+from odoo.tests import tagged
+from odoo.tests.common import SavepointCase
+import json
+import os
+import shutil
+import tempfile
+
+from .common import RealEstateDataGenerator
+
+
+@tagged('post_install', '-at_install')
+class TestListingFeed(SavepointCase):
+    """The listing feed is generated by real estate managers, who may create feeds but not write them"""
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestListingFeed, cls).setUpClass()
+        cls.data = RealEstateDataGenerator(cls.env).generate(projects=1, buildings=1, units=10)
+        cls.manager = cls.env['res.users'].with_context(no_reset_password=True).create({
+            'name': 'Real Estate Feed Manager',
+            'login': 'real_estate_feed_manager',
+            'groups_id': [(6, 0, [cls.env.ref('base.group_user').id,
+                                  cls.env.ref('wm_real_estate.group_real_estate_manager').id])],
+        })
+
+    def setUp(self):
+        super(TestListingFeed, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.env['ir.config_parameter'].set_param('wm_real_estate.listing_feed_directory', self.directory)
+
+    def test_generate_feed_as_manager(self):
+        Feed = self.env['real.estate.listing.feed'].with_user(self.manager)
+        full = Feed.generate_feed(full=True)
+        self.assertEqual(full.feed_type, 'full')
+        self.assertTrue(full.name.startswith('full-'))
+
+        published = self.data['units'].filtered(lambda p: p.sale_ok and p.apartment_state == 'disponible')
+        with open(os.path.join(self.directory, full.name + '.json'), encoding='utf-8') as f:
+            payload = json.load(f)
+        self.assertEqual(payload['type'], 'full')
+        self.assertEqual(full.upsert_count, len(payload['listings']))
+        self.assertTrue(set(published.ids) <= {listing['id'] for listing in payload['listings']})
+
+        delta = Feed.generate_feed()
+        self.assertEqual(delta.feed_type, 'delta')
+        self.assertTrue(delta.name.startswith('delta-'))
+        self.assertNotEqual(delta.name, full.name)
+        with open(os.path.join(self.directory, 'index.json'), encoding='utf-8') as f:
+            index = json.load(f)
+        self.assertEqual(index['full']['json'], full.name + '.json')
+        self.assertEqual([d['json'] for d in index['deltas']], [delta.name + '.json'])
@@ -0,0 +1,101 @@
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tests.common import SavepointCase
+from datetime import timedelta
+
+from .common import RealEstateDataGenerator
+
+
+@tagged('post_install', '-at_install')
+class TestPaymentPlan(SavepointCase):
+    """Installments follow the current plan of confirmed orders and are invoiced once due"""
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestPaymentPlan, cls).setUpClass()
+        if not cls.env.company.chart_template_id:
+            cls.skipTest(cls, "No chart of accounts found")
+        cls.generator = RealEstateDataGenerator(cls.env)
+        cls.data = cls.generator.generate(projects=1, buildings=1, units=10)
+        cls.customer = cls.generator.create_customer()
+        cls.project = cls.data['projects']
+        cls.today = fields.Date.context_today(cls.env['real.estate.payment.installment'])
+        cls.milestone_date = cls.today + timedelta(days=30)
+        cls.plan = cls.env['real.estate.payment.plan'].create({
+            'name': 'Plan 30/50/20',
+            'project_id': cls.project.id,
+            'line_ids': [
+                (0, 0, {'sequence': 1, 'name': 'Réservation', 'percentage': 30.0, 'trigger': 'reservation'}),
+                (0, 0, {'sequence': 2, 'name': 'Gros œuvre', 'percentage': 50.0, 'trigger': 'milestone',
+                        'milestone_date': cls.milestone_date}),
+                (0, 0, {'sequence': 3, 'name': 'Livraison', 'percentage': 20.0, 'trigger': 'handover'}),
+            ],
+        })
+        cls.cash_plan = cls.env['real.estate.payment.plan'].create({
+            'name': 'Comptant',
+            'project_id': cls.project.id,
+            'line_ids': [(0, 0, {'name': 'Comptant', 'percentage': 100.0, 'trigger': 'reservation'})],
+        })
+
+    def _confirmed_order(self, plan):
+        products = self.data['units'].filtered(
+            lambda p: p.is_apartment and p.apartment_id and p.apartment_state == 'disponible')
+        order = self.generator.create_reservation(products[:1], self.customer)
+        order.payment_plan_id = plan
+        order.action_confirm()
+        return order
+
+    def test_installments_and_due_invoices(self):
+        order = self._confirmed_order(self.plan)
+        order.action_compute_installments()
+
+        installments = order.installment_ids
+        self.assertEqual(installments.mapped('name'), ['Réservation', 'Gros œuvre', 'Livraison'])
+        for installment, percentage in zip(installments, (30.0, 50.0, 20.0)):
+            self.assertAlmostEqual(installment.amount, order.amount_total * percentage / 100.0, delta=0.01)
+        reservation, milestone, handover = installments
+        self.assertEqual(reservation.due_date, fields.Date.to_date(order.date_order))
+        self.assertEqual(milestone.due_date, self.milestone_date)
+        self.assertFalse(handover.due_date, "Handover installments wait for the delivery")
+
+        Installment = self.env['real.estate.payment.installment']
+        invoices = Installment._generate_due_invoices(order_ids=order.ids)
+        self.assertEqual(len(invoices), 1)
+        self.assertEqual(reservation.invoice_id, invoices)
+        self.assertFalse(milestone.invoice_id | handover.invoice_id)
+        self.assertEqual(invoices.invoice_origin, order.name)
+        self.assertEqual(invoices.invoice_date_due, reservation.due_date)
+        self.assertAlmostEqual(invoices.amount_untaxed, order.amount_untaxed * 0.3, delta=0.01)
+
+        # Already invoiced installments are not billed twice
+        self.assertFalse(Installment._generate_due_invoices(order_ids=order.ids))
+        invoices = Installment._generate_due_invoices(date=self.milestone_date, order_ids=order.ids)
+        self.assertEqual(milestone.invoice_id, invoices)
+        self.assertAlmostEqual(invoices.amount_untaxed, order.amount_untaxed * 0.5, delta=0.01)
+        self.assertFalse(handover.invoice_id)
+
+    def test_new_plan_replaces_uninvoiced_installments(self):
+        order = self._confirmed_order(self.plan)
+        Installment = self.env['real.estate.payment.installment']
+        invoice = Installment._generate_due_invoices(order_ids=order.ids)
+        self.assertEqual(len(order.installment_ids), 3)
+
+        order.payment_plan_id = self.cash_plan
+        invoices = Installment._generate_due_invoices(date=self.milestone_date, order_ids=order.ids)
+
+        # The invoiced installment of the old plan stays, the others make way for the new plan
+        self.assertEqual(order.installment_ids.mapped('name'), ['Réservation', 'Comptant'])
+        self.assertEqual(order.installment_ids[0].invoice_id, invoice)
+        self.assertEqual(order.installment_ids[1].invoice_id, invoices)
+        self.assertAlmostEqual(invoices.amount_untaxed, order.amount_untaxed, delta=0.01)
+
+    def test_cancelled_order_is_not_billed(self):
+        order = self._confirmed_order(self.plan)
+        order.action_compute_installments()
+        self.assertEqual(len(order.installment_ids), 3)
+
+        order.with_context(disable_cancel_warning=True).action_cancel()
+        self.assertEqual(order.state, 'cancel')
+        self.assertFalse(order.installment_ids)
+        self.assertFalse(self.env['real.estate.payment.installment']._generate_due_invoices(
+            date=self.milestone_date, order_ids=order.ids))
@@ -0,0 +1,151 @@
+from odoo.tests import tagged
+from odoo.tests.common import SavepointCase
+import logging
+
+from .common import RealEstateDataGenerator
+
+_logger = logging.getLogger(__name__)
+
+# Query budget of each workflow step in the 10-unit project: its query count plus a
+# small margin. Lower a budget when a step gets cheaper, never raise it to let a
+# regression through.
+QUERY_BUDGETS = {
+    'project_form': 25,
+    'order_line_create': 110,
+    'order_confirm': 250,
+    'cancel_reservation': 120,
+    'mark_sold_on_invoice': 90,
+    'apartment_write': 60,
+}
+
+# Extra queries a step may run in the 1,000-unit project over the 10-unit one:
+# reads of more than 1,000 prefetched records are split in several queries
+SCALE_MARGIN = 2
+
+
+@tagged('post_install', '-at_install')
+class TestQueryCounts(SavepointCase):
+    """Each step runs in a 10-unit and a 1,000-unit project: its query count must not grow with the portfolio"""
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestQueryCounts, cls).setUpClass()
+        generator = RealEstateDataGenerator(cls.env)
+        cls.small = generator.generate(projects=1, buildings=2, units=5)
+        cls.large = generator.generate(projects=1, buildings=2, units=500)
+        cls.customer = generator.create_customer()
+
+    def setUp(self):
+        super(TestQueryCounts, self).setUp()
+        # Every run of a step gets its own units: a unit reused by a later run would take
+        # another path through the step (already prereserved, already sold...)
+        self.handed_out_ids = set()
+
+    def _available_apartments(self, data, count=1):
+        products = data['units'].filtered(
+            lambda p: p.is_apartment and p.apartment_id and p.apartment_state == 'disponible'
+            and p.id not in self.handed_out_ids)
+        self.assertGreaterEqual(len(products), count, "The generated portfolio has too few available apartments")
+        self.handed_out_ids.update(products[:count].ids)
+        return products[:count]
+
+    def _create_quotation(self, product):
+        return self.env['sale.order'].create({
+            'partner_id': self.customer.id,
+            'is_real_estate': True,
+            'project_id': product.project_id.id,
+        })
+
+    def _order_line_vals(self, order, product):
+        return {
+            'order_id': order.id,
+            'product_id': product.product_variant_id.id,
+            'product_uom': product.uom_id.id,
+            'product_uom_qty': 1,
+            'price_unit': product.list_price,
+        }
+
+    def _reserve(self, product):
+        order = self._create_quotation(product)
+        self.env['sale.order.line'].create(self._order_line_vals(order, product))
+        return order
+
+    def _count_queries(self, func):
+        self.env['base'].flush()
+        self.env['base'].invalidate_cache()
+        count = self.cr.sql_log_count
+        func()
+        self.env['base'].flush()
+        return self.cr.sql_log_count - count
+
+    def _check_step(self, step, prepare, run):
+        """Count the queries of run(prepared) in both projects
+
+        prepare(data) is called outside of the counts, on units no other run uses; a first
+        run in the large project warms the caches, so both counted runs start from the same state.
+        """
+        warmup = prepare(self.large)
+        self._count_queries(lambda: run(warmup))
+        small, large = prepare(self.small), prepare(self.large)
+        small_count = self._count_queries(lambda: run(small))
+        large_count = self._count_queries(lambda: run(large))
+        _logger.info("Query count of %s: %s for 10 units, %s for 1,000 (budget %s)",
+                     step, small_count, large_count, QUERY_BUDGETS[step])
+        self.assertLessEqual(small_count, QUERY_BUDGETS[step],
+                             "%s ran %s queries, budget %s" % (step, small_count, QUERY_BUDGETS[step]))
+        self.assertLessEqual(large_count, small_count + SCALE_MARGIN,
+                             "%s ran %s queries for 1,000 units but %s for 10: it scales with the portfolio"
+                             % (step, large_count, small_count))
+        return small, large
+
+    def test_project_form_counters(self):
+        counters = [name for name in self.env['real.estate.project']._fields if name.endswith('_count')]
+        self._check_step('project_form', lambda data: data['projects'][0],
+                         lambda project: project.read(['name', 'city'] + counters))
+
+    def test_order_line_create(self):
+        def prepare(data):
+            product = self._available_apartments(data)
+            return product, self._create_quotation(product)
+
+        small, large = self._check_step(
+            'order_line_create', prepare,
+            lambda args: self.env['sale.order.line'].create(self._order_line_vals(args[1], args[0])))
+        self.assertEqual(small[0].apartment_state, 'prereserved')
+        self.assertEqual(large[0].apartment_state, 'prereserved')
+
+    def test_order_confirm(self):
+        small, large = self._check_step(
+            'order_confirm', lambda data: self._reserve(self._available_apartments(data)),
+            lambda order: order.action_confirm())
+        self.assertEqual(small.state, 'sale')
+        self.assertEqual(large.state, 'sale')
+
+    def test_cancel_reservation(self):
+        def prepare(data):
+            product = self._available_apartments(data)
+            self._reserve(product)
+            return product
+
+        small, large = self._check_step('cancel_reservation', prepare,
+                                        lambda product: product.action_cancel_reservation())
+        self.assertEqual(small.apartment_state, 'disponible')
+        self.assertEqual(large.apartment_state, 'disponible')
+
+    def test_mark_sold_on_invoice(self):
+        def prepare(data):
+            product = self._available_apartments(data)
+            return product, self._reserve(product)
+
+        small, large = self._check_step(
+            'mark_sold_on_invoice', prepare,
+            lambda args: self.env['account.move']._mark_properties_as_sold_on_invoice_creation(args[1]))
+        self.assertEqual(small[0].apartment_id.state, 'sold')
+        self.assertEqual(large[0].apartment_id.state, 'sold')
+
+    def test_apartment_write(self):
+        small, large = self._check_step(
+            'apartment_write', lambda data: self._available_apartments(data),
+            lambda product: product.apartment_id.write({'price': product.apartment_id.price + 1000.0}))
+        self.assertEqual(small.list_price, small.apartment_id.price)
+        self.assertEqual(large.list_price, large.apartment_id.price)
@@ -1 +1 @@
-# This file is kept for compatibility
+from . import price_revision_wizard
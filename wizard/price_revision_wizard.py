@@ -0,0 +1,141 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class RealEstatePriceRevisionWizard(models.TransientModel):
+    _name = 'real.estate.price.revision.wizard'
+    _description = 'Real Estate Price Revision Wizard'
+
+    @api.model
+    def default_get(self, fields_list):
+        """Preselect the units when the wizard is opened from a list of properties"""
+        res = super(RealEstatePriceRevisionWizard, self).default_get(fields_list)
+        context = self.env.context
+        if context.get('active_model') == 'product.template' and context.get('active_ids'):
+            res['scope'] = 'selection'
+            res['product_ids'] = [(6, 0, context['active_ids'])]
+        elif context.get('active_model') == 'real.estate.building' and context.get('active_id'):
+            building = self.env['real.estate.building'].browse(context['active_id'])
+            res['scope'] = 'building'
+            res['building_id'] = building.id
+            res['project_id'] = building.project_id.id
+        elif context.get('active_model') == 'real.estate.project' and context.get('active_id'):
+            res['scope'] = 'project'
+            res['project_id'] = context['active_id']
+        return res
+
+    scope = fields.Selection([
+        ('project', 'Projet'),
+        ('building', 'Bâtiment'),
+        ('floor', 'Étages'),
+        ('selection', 'Sélection'),
+    ], string='Périmètre', required=True, default='building')
+    project_id = fields.Many2one('real.estate.project', string='Project')
+    building_id = fields.Many2one('real.estate.building', string='Bâtiment',
+                                  domain="[('project_id', '=', project_id)]")
+    floor_from = fields.Integer(string='De l\'étage', default=0)
+    floor_to = fields.Integer(string='À l\'étage', default=0)
+    product_ids = fields.Many2many('product.template', string='Biens')
+
+    include_apartments = fields.Boolean(string='Appartements', default=True)
+    include_stores = fields.Boolean(string='Magasins', default=True)
+    include_equipements = fields.Boolean(string='Équipements', default=False)
+
+    method = fields.Selection([
+        ('percent', 'Pourcentage'),
+        ('amount', 'Montant fixe'),
+        ('per_sqm', 'Prix au m²'),
+    ], string='Méthode', required=True, default='percent')
+    value = fields.Float(string='Variation',
+                         help="Pourcentage (ex. 5 pour +5 %) ou montant ajouté à chaque prix (négatif pour une baisse)")
+    price_per_sqm = fields.Float(string='Prix au m²')
+    floor_premium = fields.Float(string='Prime par étage (%)',
+                                 help="Pourcentage ajouté pour chaque étage au-dessus de l'étage de référence")
+    base_floor = fields.Integer(string='Étage de référence', default=0)
+    rounding = fields.Float(string='Arrondi', default=0.0,
+                            help="Arrondir les nouveaux prix à ce montant (ex. 1000), 0 pour ne pas arrondir")
+    reason = fields.Char(string='Motif')
+
+    unit_count = fields.Integer(string='Biens concernés', compute='_compute_preview')
+    total_before = fields.Float(string='Total actuel', compute='_compute_preview')
+    total_after = fields.Float(string='Nouveau total', compute='_compute_preview')
+
+    def _get_products(self):
+        """Units targeted by the wizard, frozen states are filtered later by the engine"""
+        self.ensure_one()
+        if self.scope == 'selection':
+            products = self.product_ids
+        else:
+            domain = []
+            if self.scope == 'project':
+                if not self.project_id:
+                    return self.env['product.template']
+                domain.append(('project_id', '=', self.project_id.id))
+            else:
+                if not self.building_id:
+                    return self.env['product.template']
+                domain.append(('building_id', '=', self.building_id.id))
+                if self.scope == 'floor':
+                    domain += [('floor', '>=', self.floor_from), ('floor', '<=', self.floor_to)]
+            products = self.env['product.template'].search(domain)
+
+        types = [flag for flag, included in (('is_apartment', self.include_apartments),
+                                             ('is_store', self.include_stores),
+                                             ('is_equipement', self.include_equipements)) if included]
+        return products.filtered(lambda p: any(p[flag] for flag in types))
+
+    def _get_revision_kwargs(self):
+        return {
+            'value': self.value,
+            'price_per_sqm': self.price_per_sqm,
+            'floor_premium': self.floor_premium,
+            'base_floor': self.base_floor,
+        }
+
+    @api.depends('scope', 'project_id', 'building_id', 'floor_from', 'floor_to', 'product_ids',
+                 'include_apartments', 'include_stores', 'include_equipements',
+                 'method', 'value', 'price_per_sqm', 'floor_premium', 'base_floor', 'rounding')
+    def _compute_preview(self):
+        Revision = self.env['real.estate.price.revision']
+        for wizard in self:
+            units = Revision._get_revisable_units(wizard._get_products())
+            new_prices = Revision._get_new_prices(units, wizard.method, wizard.rounding,
+                                                  **wizard._get_revision_kwargs())
+            wizard.unit_count = len(units)
+            wizard.total_before = sum(unit[2] for unit in units)
+            wizard.total_after = sum(new_prices.values())
+
+    @api.onchange('project_id')
+    def _onchange_project_id(self):
+        if self.building_id and self.building_id.project_id != self.project_id:
+            self.building_id = False
+
+    def action_apply(self):
+        self.ensure_one()
+        if self.scope == 'floor' and self.floor_from > self.floor_to:
+            raise UserError(_("L'étage de début doit être inférieur ou égal à l'étage de fin."))
+        if self.method == 'per_sqm' and self.price_per_sqm <= 0:
+            raise UserError(_("Veuillez saisir un prix au m² positif."))
+
+        products = self._get_products()
+        if not products:
+            raise UserError(_("Aucun bien ne correspond au périmètre choisi."))
+
+        revision = self.env['real.estate.price.revision'].revise_prices(
+            products.ids, self.method, rounding=self.rounding, reason=self.reason,
+            **self._get_revision_kwargs())
+        if not revision:
+            raise UserError(_("Aucun prix n'a changé : les biens vendus et préréservés ne sont pas révisés."))
+
+        return {
+            'name': _('Révision de prix'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'real.estate.price.revision',
+            'res_id': revision.id,
+            'view_mode': 'form',
+            'views': [(False, 'form')],
+            'target': 'current',
+        }